@@ -1,48 +1,183 @@
 ﻿import os
 import re
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-import easyocr
-import numpy as np
-from PIL import ImageEnhance, ImageFilter
-
-# Inicializar OCR una vez (global para reutilizar)
-try:
-    reader_ocr = easyocr.Reader(['es', 'en'])
-    OCR_AVAILABLE = True
-except Exception as e:
-    print(f"Warning: EasyOCR no disponible - {e}")
-    reader_ocr = None
-    OCR_AVAILABLE = False
-
-def mejorar_imagen_para_ocr(imagen_pil):
-    """Mejora la imagen para obtener mejor resultado en OCR"""
-    if imagen_pil.mode != 'L':
-        imagen_pil = imagen_pil.convert('L')
-    
-    enhancer = ImageEnhance.Contrast(imagen_pil)
-    imagen_pil = enhancer.enhance(2.0)
-    
-    imagen_pil = imagen_pil.filter(ImageFilter.SHARPEN)
-    
-    return imagen_pil
+import logging
+import threading
+import importlib.util
+from documento import DocumentoPDF, OCR_DPI
+from campos import Campo, Calculado, Coincidencia, especificacion, extraer_campos, valores, etiquetas
+from espacial import PaginaOCR, Etiquetado
+from ocr_lotes import AgrupadorOCR
+from plantillas_cfe import detectar_plantilla, lineas_ocr, PLANTILLAS_CFE
+from cache_ocr import obtener_cache_ocr
+from tiempos import etapa
+from registro import artefactos_activos, guardar_artefacto
+from recibo import FALTANTE, VALORES_FALTANTES
+
+log = logging.getLogger(__name__)
+
+# Versión de la lógica de extracción: subirla invalida la cache de resultados
+VERSION_EXTRACTOR = "2.4"
+
+# OCR perezoso: easyocr, el renderizador de PDF y numpy solo se importan cuando un
+# recibo CFE necesita OCR. Gas/JAPAM y el arranque del servidor ya no pagan
+# la carga del modelo (segundos y cientos de MB por proceso).
+OCR_IDIOMAS = ['es', 'en']
+OCR_AVAILABLE = importlib.util.find_spec("easyocr") is not None
+
+_reader_ocr = None
+_reader_ocr_lock = threading.Lock()
+
+def obtener_lector_ocr():
+    """Devuelve el lector EasyOCR del proceso, creándolo en la primera llamada"""
+    global _reader_ocr, OCR_AVAILABLE
+
+    if _reader_ocr is not None or not OCR_AVAILABLE:
+        return _reader_ocr
+
+    with _reader_ocr_lock:
+        if _reader_ocr is None and OCR_AVAILABLE:
+            try:
+                import easyocr
+                _reader_ocr = easyocr.Reader(OCR_IDIOMAS)
+            except Exception as e:
+                log.warning("EasyOCR no disponible - %s", e)
+                OCR_AVAILABLE = False
+
+    return _reader_ocr
+
+def precargar_ocr():
+    """Carga el modelo OCR por adelantado (hook de arranque del servidor/workers)"""
+    return obtener_lector_ocr() is not None
+
+def ocr_cargado():
+    """Indica si el modelo OCR ya está en memoria en este proceso"""
+    return _reader_ocr is not None
+
+# OCR por lotes: las páginas de recibos que se procesan a la vez (hilos de
+# Flask, grupos del motor de lotes) pasan juntas por EasyOCR
+OCR_LOTE_TAMANO = int(os.environ.get("OCR_LOTE_TAMANO", "4"))            # imágenes por lote
+OCR_LOTE_ESPERA = float(os.environ.get("OCR_LOTE_ESPERA_MS", "250")) / 1000  # espera máx. para llenar el lote
+OCR_LOTE_RECONOCEDOR = int(os.environ.get("OCR_LOTE_RECONOCEDOR", "8"))  # recortes por lote del reconocedor
+
+_agrupador_ocr = None
+_agrupador_ocr_pid = None    # un proceso hijo no hereda el hilo del agrupador
+_agrupador_ocr_lock = threading.Lock()
+
+def obtener_agrupador_ocr():
+    """Devuelve el agrupador de OCR del proceso (un solo hilo usa el lector)"""
+    global _agrupador_ocr, _agrupador_ocr_pid
+
+    with _agrupador_ocr_lock:
+        if _agrupador_ocr is None or _agrupador_ocr_pid != os.getpid():
+            _agrupador_ocr = AgrupadorOCR(obtener_lector_ocr, OCR_LOTE_TAMANO,
+                                          OCR_LOTE_ESPERA, OCR_LOTE_RECONOCEDOR)
+            _agrupador_ocr_pid = os.getpid()
+        return _agrupador_ocr
+
+# Re-extracción: las lecturas OCR solo salen de la cache (cache_ocr.py), sin
+# rasterizar ni cargar el modelo; ver `python ingesta.py --reextraer`
+OCR_SOLO_CACHE = os.environ.get("OCR_SOLO_CACHE", "0") == "1"
+
+def _leer_ocr(imagenes):
+    """OCR de imágenes preprocesadas pasando por la cache de lecturas.
+
+    Devuelve (resultados como readtext, claves de la cache o None): solo las
+    imágenes que no están en la cache van al agrupador.
+    """
+    cache = obtener_cache_ocr()
+    if cache is None:
+        return obtener_agrupador_ocr().leer_varias(imagenes), [None] * len(imagenes)
+
+    claves = [cache.clave_imagen(imagen, OCR_IDIOMAS) for imagen in imagenes]
+    resultados = [cache.obtener_imagen(clave) for clave in claves]
+    faltantes = [i for i, resultado in enumerate(resultados) if resultado is None]
+    if faltantes:
+        leidos = obtener_agrupador_ocr().leer_varias([imagenes[i] for i in faltantes])
+        for i, resultado in zip(faltantes, leidos):
+            resultados[i] = resultado
+            cache.guardar_imagen(claves[i], resultado)
+    return resultados, claves
+
+# ================================
+# RASTERIZACIÓN PARA OCR
+# ================================
+# Páginas (1 = primera) que necesita cada extractor con OCR
+PAGINAS_CFE_OCR = (1,)
+
+def _leer_recorte(valor):
+    """Convierte "x0,y0,x1,y1" (fracciones de la página) en tupla o None"""
+    if not valor:
+        return None
+    x0, y0, x1, y1 = (float(v) for v in valor.split(','))
+    return (x0, y0, x1, y1)
+
+# Recorte opcional de la zona útil del recibo CFE, p.ej. "0,0,1,0.6"
+OCR_RECORTE_CFE = _leer_recorte(os.environ.get("OCR_RECORTE_CFE"))
+
+# Plantillas de regiones por diseño de recibo (plantillas_cfe.py); 0 = siempre página completa
+OCR_PLANTILLAS = os.environ.get("OCR_PLANTILLAS", "1") != "0"
+
+def mejorar_imagen_para_ocr(imagen):
+    """Mejora la imagen para obtener mejor resultado en OCR.
+
+    Usa el pipeline de preprocesamiento.py (OCR_PREPROCESO) y devuelve el
+    arreglo uint8 en grises que recibe EasyOCR, sin copias intermedias.
+    """
+    from preprocesamiento import preprocesar
+    with etapa("preproceso"):
+        return preprocesar(imagen)
 
 # ================================
 # EXTRACTOR CFE (VERSIÓN CON OCR MEJORADO)
 # ================================
+# Modo CFE: "hibrido" (texto primero, OCR solo si faltan campos), "ocr" o "texto"
+CFE_MODO = os.environ.get("CFE_MODO", "hibrido")
+
+# Campos sin los cuales un recibo CFE no sirve; si faltan se recurre al OCR
+CAMPOS_REQUERIDOS_CFE = ['total', 'no_servicio', 'titular', 'periodo']
+
+# Claves de los resultados que no son campos del recibo
+CLAVES_NO_CAMPO = {'service_type', 'archivo', 'error', 'fuente_campos'}
+
+def es_no_extraido(valor):
+    return valor is None or valor in VALORES_FALTANTES
+
+_PLANTILLAS_POR_NOMBRE = {plantilla.nombre: plantilla for plantilla in PLANTILLAS_CFE}
+
+def _clave_lectura(doc):
+    """Clave de la lectura OCR del documento en la cache (PDF + configuración del OCR)"""
+    from preprocesamiento import configuracion
+    return obtener_cache_ocr().clave_documento(
+        doc.contenido,
+        f"{PAGINAS_CFE_OCR}|{OCR_DPI}|{OCR_RECORTE_CFE}|{OCR_PLANTILLAS}|{configuracion()}"
+    )
+
+def _lectura_en_cache(doc):
+    cache = obtener_cache_ocr()
+    return cache.obtener_documento(_clave_lectura(doc)) if cache is not None else None
+
+def _ocr_disponible(doc):
+    """Hay lectura OCR del documento en la cache (no hace falta el modelo) o lector OCR"""
+    if _lectura_en_cache(doc) is not None:
+        return True
+    return not OCR_SOLO_CACHE and obtener_lector_ocr() is not None
+
 def extraer_info_recibo_cfe(pdf_path):
-    """Extrae información de recibos CFE usando OCR mejorado"""
-    print(f"\nProcesando CFE con OCR: {os.path.basename(pdf_path)}")
-    
+    """Extrae información de recibos CFE: capa de texto primero, OCR como respaldo.
+
+    `pdf_path` puede ser una ruta o un DocumentoPDF ya parseado.
+    """
     try:
-        # Intentar primero con OCR si está disponible
-        if OCR_AVAILABLE and reader_ocr:
-            return extraer_info_cfe_con_ocr(pdf_path)
-        else:
-            # Fallback a PyPDF2
-            return extraer_info_cfe_pypdf2(pdf_path)
+        doc = DocumentoPDF.abrir(pdf_path)
+        log.debug("Procesando CFE (%s): %s", CFE_MODO, doc.nombre)
+
+        if CFE_MODO == "texto":
+            return extraer_info_cfe_hibrido(doc, usar_ocr=False)
+        if CFE_MODO == "ocr" and _ocr_disponible(doc):
+            return extraer_info_cfe_con_ocr(doc)
+        return extraer_info_cfe_hibrido(doc)
     except Exception as e:
-        print(f"Error en extracción CFE: {e}")
+        log.exception("Error en extracción CFE")
         return {
             "service_type": "cfe",
             "error": str(e),
@@ -52,695 +187,665 @@ def extraer_info_recibo_cfe(pdf_path):
             "total": "ERROR"
         }
 
+def extraer_info_cfe_hibrido(pdf_path, usar_ocr=True):
+    """Extracción híbrida CFE.
+
+    Los recibos generados digitalmente traen capa de texto: se extrae con
+    PyPDF2 (milisegundos) y solo si falta algún campo requerido se paga el
+    render + OCR, que únicamente rellena los campos que faltaron. El
+    resultado indica en 'fuente_campos' qué ruta aportó cada campo.
+    """
+    doc = DocumentoPDF.abrir(pdf_path)
+    datos = extraer_info_cfe_pypdf2(doc)
+    fuente = {
+        campo: ('texto' if not es_no_extraido(valor) else 'ninguna')
+        for campo, valor in datos.items() if campo not in CLAVES_NO_CAMPO
+    }
+
+    faltantes = [c for c in CAMPOS_REQUERIDOS_CFE if es_no_extraido(datos.get(c))]
+    if faltantes and usar_ocr and _ocr_disponible(doc):
+        log.info("%s: campos requeridos sin extraer por texto: %s -> OCR",
+                 doc.nombre, ", ".join(faltantes), extra={"archivo": doc.nombre})
+        try:
+            datos_ocr = extraer_info_cfe_con_ocr(doc)
+        except Exception as e:
+            # Un fallo del OCR no descarta lo que ya dio la capa de texto
+            log.warning("%s: OCR de respaldo fallido, se conservan los campos de texto: %s",
+                        doc.nombre, e, extra={"archivo": doc.nombre})
+            datos_ocr = {}
+        for campo, valor in datos_ocr.items():
+            if campo in CLAVES_NO_CAMPO or es_no_extraido(valor):
+                continue
+            if es_no_extraido(datos.get(campo)):
+                datos[campo] = valor
+                fuente[campo] = 'ocr'
+        # Si el OCR cubrió lo que el texto no pudo, el error de texto ya no aplica
+        if not any(es_no_extraido(datos.get(c)) for c in CAMPOS_REQUERIDOS_CFE):
+            datos.pop('error', None)
+
+    datos['service_type'] = 'cfe'
+    datos['fuente_campos'] = fuente
+    return datos
+
+# Secciones que se vuelcan en el artefacto de debug del OCR
+_DEBUG_TOTAL = re.compile(r"(TOTAL A PAGAR.{0,200})", re.I | re.DOTALL)
+_DEBUG_ANTES_TOTAL = re.compile(r"(.{100}TOTAL A PAGAR)", re.I | re.DOTALL)
+
 def extraer_info_cfe_con_ocr(pdf_path):
-    """Extracción con OCR usando EasyOCR"""
-    print("Usando OCR mejorado (EasyOCR)...")
-    
-    # Ruta de poppler (ajustar según tu sistema)
-    poppler_path = r"C:\Users\DON\OneDrive\Escritorio\Visual\Ing.Software Proyecto\Release-25.11.0-0\poppler-25.11.0\Library\bin"
-    
-    # Convertir PDF a imagen
-    pages = convert_from_path(pdf_path, dpi=300, poppler_path=poppler_path)
+    """Extracción con OCR usando EasyOCR.
+
+    Si la página corresponde a una plantilla conocida (plantillas_cfe.py) solo
+    se leen sus regiones; si no, o si faltan campos clave, se lee la página
+    completa como antes. Si el documento ya se leyó con la misma
+    configuración, los campos salen de la lectura guardada en la cache OCR,
+    sin rasterizar ni llamar al modelo.
+    """
+    log.debug("Usando OCR mejorado (EasyOCR)...")
+    doc = DocumentoPDF.abrir(pdf_path)
+
+    lectura = _lectura_en_cache(doc)
+    if lectura is not None:
+        datos = _datos_de_lectura(lectura, doc.nombre)
+        if datos is not None:
+            log.debug("%s: campos desde la lectura OCR en cache", doc.nombre)
+            return datos
+    if OCR_SOLO_CACHE:
+        raise Exception("Sin lectura OCR en cache (OCR_SOLO_CACHE)")
+    lectura = {"plantilla": None, "regiones": {}, "pagina": None}
+    
+    # Convertir a imagen solo la página que usa el extractor
+    pages = doc.imagenes(PAGINAS_CFE_OCR, dpi=OCR_DPI, recorte=OCR_RECORTE_CFE)
     
     if not pages:
         raise Exception("No se pudieron convertir las páginas del PDF")
     
-    # Tomar primera página
     page = pages[0]
-    
-    # Mejorar imagen para OCR
-    page_mejorada = mejorar_imagen_para_ocr(page)
-    
-    # Aplicar OCR
-    img_array = np.array(page_mejorada)
-    result = reader_ocr.readtext(img_array, detail=1, paragraph=False)
-    texto = "\n".join([line[1] for line in result])
-    
-    # Guardar texto extraído para debugging
-    txt_path = pdf_path.replace('.pdf', '_debug_ocr.txt')
-    with open(txt_path, 'w', encoding='utf-8') as f:
-        f.write(texto)
-        f.write("\n\n" + "="*80 + "\n")
-        f.write("ANÁLISIS DE PATRONES:\n")
-        f.write("="*80 + "\n\n")
-        
-        # Mostrar sección de TOTAL A PAGAR
-        total_seccion = re.search(r"(TOTAL A PAGAR.{0,200})", texto, re.I | re.DOTALL)
-        if total_seccion:
-            f.write("SECCIÓN TOTAL A PAGAR:\n")
-            f.write(total_seccion.group(1))
-            f.write("\n\n")
-        
-        # Mostrar sección de dirección (antes de TOTAL)
-        dir_antes = re.search(r"(.{100}TOTAL A PAGAR)", texto, re.I | re.DOTALL)
-        if dir_antes:
-            f.write("ANTES DE TOTAL A PAGAR:\n")
-            f.write(dir_antes.group(1))
-            f.write("\n\n")
-    
-    print(f"Texto OCR extraído ({len(texto)} caracteres)")
-    print(f"Debug guardado en: {txt_path}")
-    
-    # Extraer información usando tu lógica mejorada
-    return extraer_datos_cfe_del_texto(texto, os.path.basename(pdf_path))
 
-def extraer_datos_cfe_del_texto(texto, nombre_archivo):
-    """Extrae datos específicos de CFE del texto (tu lógica mejorada)"""
-    datos = {'service_type': 'cfe', 'archivo': nombre_archivo}
-
-    # TITULAR - Después de RFC hasta TOTAL A PAGAR
-    titular = re.search(r"RFC:\s*CFE\d+[^\n]*\n([A-Z][A-Z\s]+?)\s+TOTAL A PAGAR", texto, re.I)
-    if not titular:
-        # Capturar toda la línea después de RFC (puede tener múltiples palabras)
-        titular = re.search(r"RFC:\s*CFE\d+[^\n]*\n([A-Z][A-Z\s]{5,100}?)(?=\n)", texto, re.I)
-    if not titular:
-        # Buscar entre RFC y siguiente elemento conocido
-        titular = re.search(r"RFC:\s*CFE\d+[^\n]*\n([A-Z\s]+?)(?=\s*(?:AV|CALLE|COL|TOTAL|\d))", texto, re.I)
-    if not titular:
-        # Última alternativa: línea completa después de RFC
-        titular = re.search(r"RFC:[^\n]*\n([A-Z][^\n]{10,}?)\n", texto, re.I)
-    
-    if titular:
-        titular_text = titular.group(1).strip()
-        # Limpiar múltiples espacios
-        titular_text = ' '.join(titular_text.split())
-        datos['titular'] = titular_text
-    else:
-        datos['titular'] = "NO EXTRAIDO"
-
-    # TOTAL A PAGAR - Buscar el número con símbolo $ o palabra "Total"
-    # El total está al final del documento con formato: $X,XXX o Total X,XXX
-    total_con_simbolo = re.findall(r"\$\s*([\d,]+)", texto, re.I)
-    
-    # También buscar "Total" seguido de número (más común en algunos recibos)
-    total_con_palabra = re.findall(r"^Total\s+([\d,]+(?:\.\d{2})?)", texto, re.I | re.MULTILINE)
-    
-    # Combinar ambos resultados y tomar el último (el más confiable)
-    todos_candidatos = total_con_simbolo + total_con_palabra
-    
-    if todos_candidatos:
-        # Tomar el último que sea un número razonable
-        for candidato in reversed(todos_candidatos):
-            num_limpio = candidato.replace(',', '').split('.')[0]  # Quitar decimales
-            try:
-                if 50 <= int(num_limpio) <= 100000:
-                    datos['total'] = num_limpio
-                    break
-            except:
-                continue
-    
-    if 'total' not in datos:
-        datos['total'] = "NO EXTRAIDO"
+    # Las cajas de las plantillas son de la página completa, no de un recorte
+    plantilla = detectar_plantilla(page) if OCR_PLANTILLAS and not OCR_RECORTE_CFE else None
+    if plantilla:
+        datos, texto = extraer_cfe_por_regiones(page, plantilla, doc.nombre, lectura)
+        faltantes = [c for c in CAMPOS_REQUERIDOS_CFE if es_no_extraido(datos.get(c))]
+        if not faltantes:
+            _guardar_debug_ocr(doc, texto)
+            _guardar_lectura(doc, lectura)
+            return datos
+        log.info("%s: plantilla %s sin %s -> OCR de página completa",
+                 doc.nombre, plantilla.nombre, ", ".join(faltantes), extra={"archivo": doc.nombre})
+    
+    # Mejorar imagen y aplicar OCR (en lote con los demás recibos que esperan OCR)
+    imagen = mejorar_imagen_para_ocr(page)
+    with etapa("ocr"):
+        (result,), (lectura["pagina"],) = _leer_ocr([imagen])
+    pagina = PaginaOCR(result, ETIQUETAS_CFE_OCR)
+    _guardar_debug_ocr(doc, pagina.texto())
+    _guardar_lectura(doc, lectura)
+
+    return extraer_datos_cfe_del_texto(pagina.texto(), doc.nombre, pagina)
+
+def extraer_cfe_por_regiones(page, plantilla, nombre_archivo, lectura=None):
+    """OCR solo de las regiones de la plantilla; devuelve (datos, texto leído).
+
+    Si se pasa `lectura`, anota en ella la plantilla y la clave en la cache
+    OCR de cada región.
+    """
+    recortes = plantilla.recortes(page)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("OCR por regiones (plantilla %s, %.0f%% de la página)",
+                  plantilla.nombre, plantilla.fraccion_pixeles() * 100)
+    imagenes = [mejorar_imagen_para_ocr(recorte) for _, recorte in recortes]
+    with etapa("ocr"):
+        resultados, claves = _leer_ocr(imagenes)
+    if lectura is not None:
+        lectura["plantilla"] = plantilla.nombre
+        lectura["regiones"] = {region.nombre: clave for (region, _), clave in zip(recortes, claves)}
+
+    lineas = {region.nombre: lineas_ocr(resultado)
+              for (region, _), resultado in zip(recortes, resultados)}
+    texto = "\n\n".join(f"[{nombre}]\n" + "\n".join(l) for nombre, l in lineas.items())
+    return datos_cfe_de_regiones(plantilla, lineas, nombre_archivo), texto
+
+def datos_cfe_de_regiones(plantilla, lineas, nombre_archivo):
+    """Arma los datos a partir de las líneas leídas en cada región.
+
+    Las regiones con lector (titular, total...) dan sus campos sin buscar
+    patrones; si el lector no los encuentra quedan sin extraer. El texto del
+    resto de regiones pasa por CAMPOS_CFE_OCR.
+    """
+    textos = ["\n".join(lineas.get(r.nombre, [])) for r in plantilla.regiones if not r.lector]
+    datos = extraer_datos_cfe_del_texto("\n".join(textos), nombre_archivo)
+    for region in plantilla.regiones:
+        if region.lector:
+            leidos = region.lector(lineas.get(region.nombre, []))
+            for campo in region.campos:
+                datos[campo] = leidos.get(campo, FALTANTE)
+    return datos
 
-    # ========== DIRECCIÓN - SIMPLIFICADO DRÁSTICAMENTE ==========
-    # Estrategia: Buscar entre "RFC" y "TOTAL A PAGAR", luego entre "PAGAR:" y CP
-    
-    # Buscar ANTES de TOTAL A PAGAR (después del RFC y titular)
-    patron_direccion = r"RFC:[^\n]+\n[^\n]+\n(.*?)TOTAL A PAGAR"
-    match_dir = re.search(patron_direccion, texto, re.I | re.DOTALL)
-    
+def _guardar_lectura(doc, lectura):
+    """Registra qué imágenes se leyeron del documento, si todas quedaron en la cache"""
+    cache = obtener_cache_ocr()
+    claves = list(lectura["regiones"].values()) + [lectura["pagina"]]
+    if cache is not None and any(claves) and None not in claves[:-1]:
+        cache.guardar_documento(_clave_lectura(doc), lectura)
+
+def _datos_de_lectura(lectura, nombre_archivo):
+    """Vuelve a extraer los campos de una lectura guardada, o None si le faltan imágenes.
+
+    Repite el camino de extraer_info_cfe_con_ocr: regiones de la plantilla
+    y, si faltan campos requeridos, la página completa.
+    """
+    cache = obtener_cache_ocr()
+    plantilla = _PLANTILLAS_POR_NOMBRE.get(lectura.get("plantilla"))
+    if plantilla is not None:
+        resultados = {nombre: cache.obtener_imagen(clave) for nombre, clave in lectura["regiones"].items()}
+        if None not in resultados.values():
+            lineas = {nombre: lineas_ocr(resultado) for nombre, resultado in resultados.items()}
+            datos = datos_cfe_de_regiones(plantilla, lineas, nombre_archivo)
+            faltantes = [c for c in CAMPOS_REQUERIDOS_CFE if es_no_extraido(datos.get(c))]
+            # Sin página completa guardada: re-extrayendo no hay OCR que la lea
+            if not faltantes or (OCR_SOLO_CACHE and not lectura.get("pagina")):
+                return datos
+
+    if lectura.get("pagina"):
+        resultado = cache.obtener_imagen(lectura["pagina"])
+        if resultado is not None:
+            return extraer_datos_cfe_ocr(resultado, nombre_archivo)
+    return None
+
+def _guardar_debug_ocr(doc, texto):
+    """Artefacto <archivo>_debug_ocr.txt con el texto OCR y las secciones clave.
+
+    Solo con DEBUG_ARTEFACTOS=1 (ver registro.py): si no, ni se buscan las
+    secciones. Lo escribe el hilo del registro en DEBUG_DIR.
+    """
+    log.debug("Texto OCR extraído de %s (%d caracteres)", doc.nombre, len(texto))
+    if not artefactos_activos():
+        return
+    partes = [texto, "\n\n" + "="*80 + "\n", "ANÁLISIS DE PATRONES:\n", "="*80 + "\n\n"]
+
+    # Mostrar sección de TOTAL A PAGAR
+    total_seccion = _DEBUG_TOTAL.search(texto)
+    if total_seccion:
+        partes += ["SECCIÓN TOTAL A PAGAR:\n", total_seccion.group(1), "\n\n"]
+
+    # Mostrar sección de dirección (antes de TOTAL)
+    dir_antes = _DEBUG_ANTES_TOTAL.search(texto)
+    if dir_antes:
+        partes += ["ANTES DE TOTAL A PAGAR:\n", dir_antes.group(1), "\n\n"]
+
+    guardar_artefacto(doc.nombre.replace('.pdf', '_debug_ocr.txt'), "".join(partes))
+
+# --------------------------
+# CAMPOS CFE (TEXTO OCR)
+# --------------------------
+# Las especificaciones se compilan una vez al importar el módulo; ver campos.py
+_CFE_TOTAL_SIMBOLO = re.compile(r"\$\s*([\d,]+)", re.I)
+_CFE_TOTAL_PALABRA = re.compile(r"^Total\s+([\d,]+(?:\.\d{2})?)", re.I | re.MULTILINE)
+_CFE_DIR_ANTES = re.compile(r"RFC:[^\n]+\n[^\n]+\n(.*?)TOTAL A PAGAR", re.I | re.DOTALL)
+_CFE_DIR_DESPUES = re.compile(r"TOTAL A PAGAR:[^\n]*\n(.*?)(?:C\.P|G\.P)", re.I | re.DOTALL)
+_CFE_DIR_NUMERO_MILES = re.compile(r'^\d{1,3},\d{3}$')   # 82,108
+_CFE_DIR_NUMERO_LARGO = re.compile(r'^\d{4,}$')          # 8149
+_CFE_DIR_MANUFACTURA_1 = re.compile(r'MANUFACTURA\s+1\s+', re.I)
+_CFE_DIR_MANUFACTURA = re.compile(r'(MANUFACTURA)', re.I)
+_CFE_DIR_RESIDUOS = re.compile(r'\s+\d{3,5}\s+')
+_CFE_CP = re.compile(r"(?:C\.P|G\.P)[\.\s]*(\d{5})", re.I)
+_CFE_BLOQUES = re.compile(r"(Basico|Intermedio|Excedente)\s+([\d,]+)", re.I)
+_CFE_DIFERENCIA = re.compile(r"Diferencia[^\d]*(\d+)", re.I)
+_CFE_KWH = re.compile(r"kWh[^\d]+\d+[^\d]+\d+[^\d]+(\d+)", re.I)
+_CFE_DIR_PARADAS = ('QUERETARO', 'QRO', 'SERVICIO', 'RMU', 'PESOS', 'MN:')
+
+def _linea_descartable(linea):
+    return (linea.startswith('$') or
+            linea.startswith('(') or
+            _CFE_DIR_NUMERO_MILES.match(linea) or
+            _CFE_DIR_NUMERO_LARGO.match(linea))
+
+def _total_cfe_ocr(ctx, resultados):
+    """Último monto razonable con símbolo $ o tras "Total" (el más confiable)"""
+    candidatos = ([(m.group(1), m.start(1)) for m in _CFE_TOTAL_SIMBOLO.finditer(ctx.texto)] +
+                  [(m.group(1), m.start(1)) for m in ctx.buscar_todas(_CFE_TOTAL_PALABRA, anclas=('TOTAL',))])
+    for candidato, posicion in reversed(candidatos):
+        num_limpio = candidato.replace(',', '').split('.')[0]  # Quitar decimales
+        try:
+            if 50 <= int(num_limpio) <= 100000:
+                return Coincidencia(num_limpio, posicion)
+        except ValueError:
+            continue
+    return None
+
+def _direccion_cfe_ocr(ctx, resultados):
+    """Líneas entre RFC y TOTAL A PAGAR, más las que siguen hasta el CP"""
     partes_direccion = []
-    
+    posicion = None
+
+    match_dir = ctx.buscar(_CFE_DIR_ANTES, anclas=('RFC:',))
     if match_dir:
-        contenido = match_dir.group(1).strip()
-        lineas = [l.strip() for l in contenido.split('\n') if l.strip()]
-        
-        for linea in lineas:
-            # Saltar líneas inválidas
-            if (len(linea) < 3 or 
-                linea.startswith('$') or 
-                linea.startswith('(') or
-                re.match(r'^\d{1,3},\d{3}$', linea) or  # 82,108
-                re.match(r'^\d{4,}$', linea)):  # 8149
+        posicion = match_dir.start(1)
+        for linea in (l.strip() for l in match_dir.group(1).strip().split('\n')):
+            if not linea or len(linea) < 3 or _linea_descartable(linea):
                 continue
             partes_direccion.append(linea)
-    
-    # Buscar DESPUÉS de TOTAL A PAGAR hasta CP
-    patron_despues = r"TOTAL A PAGAR:[^\n]*\n(.*?)(?:C\.P|G\.P)"
-    match_despues = re.search(patron_despues, texto, re.I | re.DOTALL)
-    
+
+    match_despues = ctx.buscar(_CFE_DIR_DESPUES, anclas=('TOTAL A PAGAR:',))
     if match_despues:
-        contenido_desp = match_despues.group(1).strip()
-        lineas_desp = [l.strip() for l in contenido_desp.split('\n') if l.strip()]
-        
-        for linea in lineas_desp:
+        if posicion is None:
+            posicion = match_despues.start(1)
+        for linea in (l.strip() for l in match_despues.group(1).strip().split('\n')):
+            if not linea:
+                continue
             # Detener si encontramos palabras clave del recibo
-            if any(kw in linea.upper() for kw in ['QUERETARO', 'QRO', 'SERVICIO', 'RMU', 'PESOS', 'MN:']):
+            if any(kw in linea.upper() for kw in _CFE_DIR_PARADAS):
                 break
-            
-            # Saltar inválidos
-            if (linea.startswith('$') or 
-                linea.startswith('(') or 
-                re.match(r'^\d{1,3},\d{3}$', linea) or 
-                re.match(r'^\d{4,}$', linea)):
+            if _linea_descartable(linea):
                 continue
-            
             partes_direccion.append(linea)
-    
-    # Unir y limpiar
+
     direccion_texto = ' '.join(partes_direccion)
-    
+
     # Auto-corrección: AV MANUFACTURA siempre debe tener "1" después
     if 'MANUFACTURA' in direccion_texto.upper():
-        # Si no tiene " 1 " después de MANUFACTURA, agregarlo
-        if not re.search(r'MANUFACTURA\s+1\s+', direccion_texto, re.I):
-            direccion_texto = re.sub(r'(MANUFACTURA)', r'\1 1', direccion_texto, flags=re.I)
-    
+        if not _CFE_DIR_MANUFACTURA_1.search(direccion_texto):
+            direccion_texto = _CFE_DIR_MANUFACTURA.sub(r'\1 1', direccion_texto)
+
     # Limpiar números residuales (ej: "1 120" -> "1")
-    direccion_texto = re.sub(r'\s+\d{3,5}\s+', ' ', direccion_texto)
-    direccion_texto = ' '.join(direccion_texto.split())  # Limpiar espacios múltiples
-    
-    # CP
-    cp_match = re.search(r"(?:C\.P|G\.P)[\.\s]*(\d{5})", texto, re.I)
+    direccion_texto = _CFE_DIR_RESIDUOS.sub(' ', direccion_texto)
+    direccion_texto = ' '.join(direccion_texto.split())
+
+    cp_match = ctx.buscar(_CFE_CP, anclas=('C.P', 'G.P'))
     cp = cp_match.group(1) if cp_match else "76168"
-    
-    datos['direccion'] = f"{direccion_texto} C.P.{cp}" if direccion_texto else f"C.P.{cp}"
-
-    # No. DE SERVICIO
-    no_servicio = re.search(r"NO\.\s*DE\s*SERVICIO[:\-\s]+(0\d{11})", texto, re.I)
-    if not no_servicio:
-        no_servicio = re.search(r"SERVICIO[:\-\s]+(0\d{11})", texto, re.I)
-    datos['no_servicio'] = no_servicio.group(1) if no_servicio else "NO EXTRAIDO"
-
-    # TARIFA
-    tarifa = re.search(r"TARIFA[:\s]*([A-Z0-9]{2,6})(?:\s|NO|\n)", texto, re.I)
-    if not tarifa:
-        tarifa = re.search(r"TARIFA([A-Z0-9]{2,6})", texto, re.I)
-    datos['tarifa'] = tarifa.group(1) if tarifa else "NO EXTRAIDO"
-
-    # CUENTA - Corregir confusiones de OCR
-    cuenta = re.search(r"CUENTA[:\s]*([A-Z0-9\s]{10,25})", texto, re.I)
-    if cuenta:
-        cuenta_raw = cuenta.group(1).strip().replace(' ', '')
-        # Corregir confusiones comunes de OCR: Z->2, I->1, O->0 al inicio
-        if cuenta_raw.startswith('Z'):
-            cuenta_raw = '2' + cuenta_raw[1:]
-        cuenta_raw = cuenta_raw.replace('ZIDP', '21DP').replace('ZI', '21').replace('I', '1').replace('O', '0')
-        datos['cuenta'] = cuenta_raw
-    else:
-        datos['cuenta'] = "NO EXTRAIDO"
-
-    # MEDIDOR
-    medidor = re.search(r"NO\.\s*MEDIDOR[:\-;\s]+([A-Z0-9]{4,15})", texto, re.I)
-    if not medidor:
-        medidor = re.search(r"MEDIDOR[:\-;\s]+([A-Z0-9]{4,15})", texto, re.I)
-    datos['no_medidor'] = medidor.group(1) if medidor else "NO EXTRAIDO"
-
-    # PERIODO
-    periodo = re.search(r"PERIODO\s*FACTURADO[:\s]*(\d{1,2}\s+[A-Z]{3,4}\s+\d{2}\s*[-–]\s*\d{1,2}\s+[A-Z]{3,4}\s+\d{2})", texto, re.I)
-    if not periodo:
-        periodo = re.search(r"FACTURADO[:\s]*(\d{1,2}\s+[A-Z]+\s+\d{2}[-–]\d{1,2}\s+[A-Z]+\s+\d{2})", texto, re.I)
-    datos['periodo'] = periodo.group(1) if periodo else "NO EXTRAIDO"
 
-    # LÍMITE DE PAGO - Múltiples variantes
-    limite_pago = re.search(r"(?:LIMITE|FECHA\s*LIMITE)\s*(?:DE\s*)?PAGO[:\-\s]*(\d{1,2}[O0]?)[-\s]+([A-Z]{3,4})[-\s]+(\d{2})", texto, re.I)
-    if not limite_pago:
-        limite_pago = re.search(r"LIMITE\s*PAGO[:\-\s]*(\d{1,2}[O0]?)\s+([A-Z]{3,4})\s+(\d{2})", texto, re.I)
-    if not limite_pago:
-        # Buscar solo "LIMITE" o "PAGO" seguido de fecha
-        limite_pago = re.search(r"(?:LIMITE|PAGO)[^\d]*(\d{1,2})\s+([A-Z]{3})\s+(\d{2})", texto, re.I)
-    
-    if limite_pago:
-        dia = limite_pago.group(1).replace('O', '0').replace('o', '0')
-        mes = limite_pago.group(2)[:3].upper()
-        datos['fecha_pago'] = f"{dia} {mes} {limite_pago.group(3)}"
-    else:
-        datos['fecha_pago'] = "NO EXTRAIDO"
-
-    # ========== CONSUMO KWH - SIMPLIFICADO ==========
-    # Prioridad: 1) Suma bloques, 2) Diferencia, 3) Última columna kWh
-    bloques = re.findall(r"(Basico|Intermedio|Excedente)\s+([\d,]+)", texto, re.I)
+    valor = f"{direccion_texto} C.P.{cp}" if direccion_texto else f"C.P.{cp}"
+    return Coincidencia(valor, posicion)
+
+def _monto_cfe_ocr(m):
+    """Monto entero (sin centavos) en un rango razonable para un recibo CFE, o None"""
+    numero = m.group(1).replace(',', '').split('.')[0]
+    return numero if numero.isdigit() and 50 <= int(numero) <= 100000 else None
+
+def _cuenta_cfe_ocr(m):
+    """Corrige confusiones comunes de OCR: Z->2, I->1, O->0"""
+    cuenta_raw = m.group(1).strip().replace(' ', '')
+    if cuenta_raw.startswith('Z'):
+        cuenta_raw = '2' + cuenta_raw[1:]
+    return cuenta_raw.replace('ZIDP', '21DP').replace('ZI', '21').replace('I', '1').replace('O', '0')
+
+def _fecha_ocr(m, rellenar=False):
+    dia = m.group(1).replace('O', '0').replace('o', '0')
+    if rellenar:
+        dia = dia.zfill(2)
+    return f"{dia} {m.group(2)[:3].upper()} {m.group(3)}"
+
+def _consumo_cfe_ocr(ctx, resultados):
+    """1) Suma de bloques, 2) Diferencia, 3) última columna de la tabla kWh"""
+    bloques = [(m.group(2), m.start())
+               for m in ctx.buscar_todas(_CFE_BLOQUES, anclas=('BASICO', 'INTERMEDIO', 'EXCEDENTE'))]
     if bloques:
-        suma = sum(int(b[1].replace(',', '')) for b in bloques)
-        datos['consumo'] = str(suma)
-    else:
-        # Buscar "Diferencia"
-        dif = re.search(r"Diferencia[^\d]*(\d+)", texto, re.I)
-        if dif:
-            datos['consumo'] = dif.group(1)
-        else:
-            # Buscar tabla kWh (última columna = diferencia)
-            kwh = re.search(r"kWh[^\d]+\d+[^\d]+\d+[^\d]+(\d+)", texto, re.I)
-            datos['consumo'] = kwh.group(1) if kwh else "NO EXTRAIDO"
-
-    # TIPO LECTURA
-    if re.search(r"Estimada\s+X", texto, re.I):
-        datos['calidad'] = "Estimada"
-    elif re.search(r"Medida\s+Estimada\s+X", texto, re.I):
-        datos['calidad'] = "Estimada"
-    elif re.search(r"X.*?Medida\s+Estimada", texto, re.I):
-        datos['calidad'] = "Medida"
-    else:
-        datos['calidad'] = "Medida"
-
-    # RMU
-    rmu = re.search(r"RMU[:\s]*(\d{5})", texto, re.I)
-    datos['rmu'] = rmu.group(1) if rmu else "NO EXTRAIDO"
-
-    # ========== FECHA DE CORTE - SIMPLIFICADO ==========
-    # Limpiar texto: eliminar saltos de línea para encontrar patrones
-    texto_limpio = re.sub(r'\s+', ' ', texto)
-    
-    # Buscar "PARTIR" seguido de fecha (ignorar todo entre CORTE y PARTIR)
-    corte = re.search(r"PARTIR[:\-\s]*([O0o]?\d{1,2})\s+([A-Z]{3,4})\s+(\d{2})", texto_limpio, re.I)
-    if not corte:
-        # Buscar "CORTE" ignorando números intermedios
-        corte = re.search(r"CORTE[^\d]*(\d{1,2}[O0o]?)\s+([A-Z]{3,4})\s+(\d{2})", texto_limpio, re.I)
-    
-    if corte:
-        dia = corte.group(1).replace('O', '0').replace('o', '0')
-        mes = corte.group(2)[:3].upper()
-        datos['fecha_corte'] = f"{dia.zfill(2)} {mes} {corte.group(3)}"
-    else:
-        datos['fecha_corte'] = "NO EXTRAIDO"
+        suma = sum(int(valor.replace(',', '')) for valor, _ in bloques)
+        return Coincidencia(str(suma), bloques[0][1])
+    for patron, ancla in ((_CFE_DIFERENCIA, 'DIFERENCIA'), (_CFE_KWH, 'KWH')):
+        m = ctx.buscar(patron, anclas=(ancla,))
+        if m:
+            return Coincidencia(m.group(1), m.start(1))
+    return None
+
+# Con las cajas del OCR (página completa) cada campo busca primero su valor
+# junto a la etiqueta (espacial.Etiquetado): en el mismo token, a la derecha
+# o debajo. Las regex sobre el texto unido quedan para lo que no aparece así.
+CAMPOS_CFE_OCR = especificacion(
+    # TITULAR - Después de RFC hasta TOTAL A PAGAR
+    Campo('titular', [
+        r"RFC:\s*CFE\d+[^\n]*\n([A-Z][A-Z\s]+?)\s+TOTAL A PAGAR",
+        r"RFC:\s*CFE\d+[^\n]*\n([A-Z][A-Z\s]{5,100}?)(?=\n)",
+        r"RFC:\s*CFE\d+[^\n]*\n([A-Z\s]+?)(?=\s*(?:AV|CALLE|COL|TOTAL|\d))",
+        r"RFC:[^\n]*\n([A-Z][^\n]{10,}?)\n",
+    ], formato=lambda m: ' '.join(m.group(1).split()), ancla='RFC',
+       espacial=Etiquetado('RFC', r"([A-Z][A-Z\s\.]{5,100})$", formato=lambda m: ' '.join(m.group(1).split()),
+                           derecha=0)),
+
+    Campo('total', respaldo=_total_cfe_ocr,
+          espacial=Etiquetado('TOTAL A PAGAR', r"[:\s]*\$\s*([\d,]+)", formato=_monto_cfe_ocr,
+                              derecha=2, debajo=3)),
+    Campo('direccion', respaldo=_direccion_cfe_ocr),
+
+    Campo('no_servicio', [
+        r"NO\.\s*DE\s*SERVICIO[:\-\s]+(0\d{11})",
+        r"SERVICIO[:\-\s]+(0\d{11})",
+    ], ancla=('NO.', 'SERVICIO'),
+       espacial=Etiquetado(('NO. DE SERVICIO', 'NO DE SERVICIO'), r"[:\-\s]*(0\d{11})")),
+
+    Campo('tarifa', [
+        r"TARIFA[:\s]*([A-Z0-9]{2,6})(?:\s|NO|\n)",
+        r"TARIFA([A-Z0-9]{2,6})",
+    ], ancla='TARIFA',
+       espacial=Etiquetado('TARIFA', r"[:\s]*([A-Z0-9]{2,6})(?:\s|NO|$)")),
+
+    Campo('cuenta', [r"CUENTA[:\s]*([A-Z0-9\s]{10,25})"], formato=_cuenta_cfe_ocr, ancla='CUENTA',
+          espacial=Etiquetado('CUENTA', r"[:\s]*([A-Z0-9\s]{10,25})", formato=_cuenta_cfe_ocr)),
+
+    # Solo pegado a la etiqueta: junto al "No. medidor" de la tabla de consumo hay otros encabezados
+    Campo('no_medidor', [
+        r"NO\.\s*MEDIDOR[:\-;\s]+([A-Z0-9]{4,15})",
+        r"MEDIDOR[:\-;\s]+([A-Z0-9]{4,15})",
+    ], ancla=('NO.', 'MEDIDOR'),
+       espacial=Etiquetado('MEDIDOR', r"[:\-;\s]+([A-Z0-9]{4,15})", derecha=0, debajo=0)),
+
+    Campo('periodo', [
+        r"PERIODO\s*FACTURADO[:\s]*(\d{1,2}\s+[A-Z]{3,4}\s+\d{2}\s*[-–]\s*\d{1,2}\s+[A-Z]{3,4}\s+\d{2})",
+        r"FACTURADO[:\s]*(\d{1,2}\s+[A-Z]+\s+\d{2}[-–]\d{1,2}\s+[A-Z]+\s+\d{2})",
+    ], ancla=('PERIODO', 'FACTURADO'),
+       espacial=Etiquetado('PERIODO FACTURADO',
+                           r"[:\s]*(\d{1,2}\s+[A-Z]{3,4}\s+\d{2}\s*[-–]\s*\d{1,2}\s+[A-Z]{3,4}\s+\d{2})")),
 
+    # LÍMITE DE PAGO - Múltiples variantes
+    Campo('fecha_pago', [
+        r"(?:LIMITE|FECHA\s*LIMITE)\s*(?:DE\s*)?PAGO[:\-\s]*(\d{1,2}[O0]?)[-\s]+([A-Z]{3,4})[-\s]+(\d{2})",
+        r"LIMITE\s*PAGO[:\-\s]*(\d{1,2}[O0]?)\s+([A-Z]{3,4})\s+(\d{2})",
+        r"(?:LIMITE|PAGO)[^\d]*(\d{1,2})\s+([A-Z]{3})\s+(\d{2})",
+    ], formato=_fecha_ocr, ancla=('LIMITE', 'FECHA', 'PAGO'),
+       espacial=Etiquetado(('LIMITE DE PAGO', 'LIMITE PAGO'),
+                           r"[:\-\s]*(\d{1,2}[O0]?)[-\s]+([A-Z]{3,4})[-\s]+(\d{2})", formato=_fecha_ocr)),
+
+    Campo('consumo', respaldo=_consumo_cfe_ocr),
+
+    # TIPO LECTURA: "Estimada X" marca la casilla de lectura estimada
+    Campo('calidad', [r"Estimada\s+X"], formato=lambda m: "Estimada", ancla='ESTIMADA', defecto="Medida"),
+
+    Campo('rmu', [r"RMU[:\s]*(\d{5})"], ancla='RMU', espacial=Etiquetado('RMU', r"[:\s]*(\d{5})")),
+
+    # FECHA DE CORTE - sobre el texto sin saltos de línea
+    Campo('fecha_corte', [
+        r"PARTIR[:\-\s]*([O0o]?\d{1,2})\s+([A-Z]{3,4})\s+(\d{2})",
+        r"CORTE[^\d]*(\d{1,2}[O0o]?)\s+([A-Z]{3,4})\s+(\d{2})",
+    ], formato=lambda m: _fecha_ocr(m, rellenar=True), fuente="limpio", ancla=('PARTIR', 'CORTE'),
+       espacial=Etiquetado('PARTIR', r"[:\-\s]*([O0o]?\d{1,2})\s+([A-Z]{3,4})\s+(\d{2})",
+                           formato=lambda m: _fecha_ocr(m, rellenar=True))),
+)
+
+ETIQUETAS_CFE_OCR = etiquetas(CAMPOS_CFE_OCR)
+
+def extraer_datos_cfe_del_texto(texto, nombre_archivo, pagina=None):
+    """Extrae datos específicos de CFE del texto OCR (y de sus cajas, si se pasa la PaginaOCR)"""
+    datos = {'service_type': 'cfe', 'archivo': nombre_archivo}
+    datos.update(valores(extraer_campos(texto, CAMPOS_CFE_OCR, pagina)))
+    return datos
+
+def extraer_datos_cfe_ocr(resultado, nombre_archivo):
+    """Datos CFE de la lectura de una página completa (readtext con detail=1)"""
+    pagina = PaginaOCR(resultado, ETIQUETAS_CFE_OCR)
+    return extraer_datos_cfe_del_texto(pagina.texto(), nombre_archivo, pagina)
+
+# --------------------------
+# CAMPOS CFE (CAPA DE TEXTO)
+# --------------------------
+_CFE_TEXTO_LINEA_TITULAR = re.compile(r'^[A-Z][A-Z\s\.]+$')
+_CFE_TEXTO_NO_TITULAR = re.compile(r'(AV\.|CALLE|COL\.|C\.P\.|NO\.|#|\d)')
+_CFE_TEXTO_DINERO = re.compile(r"\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2})")
+
+def _titular_cfe_texto(ctx, resultados):
+    """Primera línea en mayúsculas (sin datos de dirección) tras el encabezado de CFE"""
+    lineas = ctx.texto.split('\n')
+    inicios = []
+    posicion = 0
+    for linea in lineas:
+        inicios.append(posicion)
+        posicion += len(linea) + 1
+
+    for i, linea in enumerate(lineas):
+        if 'COMISIÓN FEDERAL DE ELECTRICIDAD' in linea.upper() or 'CFE' in linea.upper():
+            for j in range(i + 1, min(i + 5, len(lineas))):
+                siguiente = lineas[j].strip()
+                if (len(siguiente) > 5 and
+                        _CFE_TEXTO_LINEA_TITULAR.match(siguiente) and
+                        not _CFE_TEXTO_NO_TITULAR.search(siguiente)):
+                    return Coincidencia(siguiente, inicios[j] + lineas[j].index(siguiente))
+    return None
+
+def _direccion_cfe_texto(ctx, resultados):
+    """Hasta cuatro líneas después del titular"""
+    titular = resultados['titular'].valor
+    if titular == FALTANTE:
+        return None
+    # Depende del titular de cada recibo: es la única regex que se compila por recibo
+    m = re.search(rf"{re.escape(titular)}\s*\n([^\n]+(?:\n[^\n]+){{0,3}})", ctx.texto, re.IGNORECASE)
+    if not m:
+        return None
+    return Coincidencia(' '.join(m.group(1).strip().split('\n')), m.start(1))
+
+def _total_cfe_texto(ctx, resultados):
+    """Último monto con centavos en un rango razonable para recibos CFE"""
+    posibles_totales = [m for m in _CFE_TEXTO_DINERO.finditer(ctx.texto)
+                        if 50 <= float(m.group(1).replace(',', '')) <= 5000]
+    if not posibles_totales:
+        return None
+    m = posibles_totales[-1]
+    return Coincidencia(m.group(1).replace(',', ''), m.start(1))
+
+def _consumo_grande(m):
+    numero = int(m.group(1).replace(',', ''))
+    return str(numero) if 1000 <= numero <= 100000 else None
+
+def _tipo_lectura_cfe_texto(ctx, resultados):
+    if "Estim" in ctx.texto:
+        return Coincidencia("Estimada", ctx.texto.index("Estim"))
+    if "Medida" in ctx.texto:
+        return Coincidencia("Medida", ctx.texto.index("Medida"))
+    return None
+
+_CALIDAD_POR_LECTURA = {"Estimada": "ESTIMADA", "Medida": "MEDIDA"}
+
+def _sin_comas(m):
+    return m.group(1).replace(',', '')
+
+def _fecha_texto(m):
+    return f"{m.group(1)} {m.group(2)} {m.group(3)}"
+
+CAMPOS_CFE_TEXTO = especificacion(
+    # Formato específico: titular después de "Comisión Federal de Electricidad®"
+    Campo('titular', [r"Comisi[óo]n Federal de Electricidad[®\s]+\n([A-Z\s\.]+?)\n"],
+          formato=lambda m: m.group(1).strip(), respaldo=_titular_cfe_texto,
+          ancla=('COMISIÓN', 'COMISION'), defecto=FALTANTE),
+    Calculado('direccion', _direccion_cfe_texto, defecto=FALTANTE),
+
+    Campo('no_servicio', [r"NO\.\s*DE\s*SERVICIO[:\-\s]+(\d{10,14})"], ancla='NO.', defecto=FALTANTE),
+
+    # TOTAL A PAGAR con centavos (ej: $271.00)
+    Campo('total', [
+        r"TOTAL\s+A\s+PAGAR[:\s]+\$?\s*([\d,]+\.\d{2})",
+        r"TOTAL[^:\n]*[:\s]+\$?\s*([\d,]+\.\d{2})",
+    ], formato=_sin_comas, respaldo=_total_cfe_texto, ancla='TOTAL', defecto=FALTANTE),
+
+    # CONSUMO KWH: tabla "Energía (kWh)", columnas de lectura o número grande
+    Campo('consumo_kwh', [
+        re.compile(r"Energ[íi]a\s*\(kWh\).*?(\d{1,3}(?:,\d{3})+).*?(\d{1,3}(?:,\d{3})+)?", re.I | re.DOTALL),
+        re.compile(r"(\d{1,3},\d{3})\s+\d{1,3}\s+\d{1,3}"),
+        (re.compile(r"(\d{2,3},\d{3})"), _consumo_grande),
+    ], formato=_sin_comas, defecto=FALTANTE),
+    Calculado('consumo', lambda ctx, r: r['consumo_kwh'], defecto=FALTANTE),
+
+    Campo('periodo', [
+        r"PERIODO\s*FACTURADO[:\-\s]*([^\n]{15,50})",
+        r"(\d{1,2}\s+[A-Z]{3}\s+\d{2}\s*[-–]\s*\d{1,2}\s+[A-Z]{3}\s+\d{2})",
+    ], formato=lambda m: m.group(1).strip(), defecto=FALTANTE),
+
+    Campo('no_medidor', [r"NO\.\s*MEDIDOR[:\-\s]+([A-Z0-9]{4,12})"], ancla='NO.', defecto=FALTANTE),
+    Campo('cuenta', [r"CUENTA[:\s]*([A-Z0-9]{8,20})"],
+          formato=lambda m: m.group(1).strip().split('Repartir')[0].strip(), ancla='CUENTA', defecto=FALTANTE),
+    Campo('tarifa', [r"TARIFA[:\s]*([0-9A-Z]{2,6})"], formato=lambda m: m.group(1).strip(),
+          ancla='TARIFA', defecto=FALTANTE),
+    Campo('rmu', [r"RMU[:\s]*(\d{5})"], ancla='RMU', defecto=FALTANTE),
+
+    Campo('fecha_pago', [r"L[ÍI]MITE\s*DE\s*PAGO[:\-\s]*(\d{1,2})\s+([A-Z]{3})\s+(\d{2,4})"],
+          formato=_fecha_texto, ancla=('LÍMITE', 'LIMITE'), defecto=FALTANTE),
+    Campo('fecha_corte', [r"CORTE\s*A\s*PARTIR[:\-\s]*(\d{1,2})\s+([A-Z]{3})\s+(\d{2,4})"],
+          formato=_fecha_texto, ancla='CORTE', defecto=FALTANTE),
+
+    Campo('tipo_lectura', respaldo=_tipo_lectura_cfe_texto, defecto="NO DETECTADO"),
+    Calculado('calidad', lambda ctx, r: Coincidencia(_CALIDAD_POR_LECTURA[r['tipo_lectura'].valor], None)
+              if r['tipo_lectura'].valor in _CALIDAD_POR_LECTURA else None, defecto="BÁSICO"),
+)
+
+def extraer_datos_cfe_pypdf2_del_texto(text):
+    """Campos de CFE desde la capa de texto del PDF"""
+    datos = {'service_type': 'cfe'}
+    datos.update(valores(extraer_campos(text, CAMPOS_CFE_TEXTO)))
     return datos
 
 def extraer_info_cfe_pypdf2(pdf_path):
     """Extrae información de recibos CFE - Compatible con múltiples formatos, incluyendo tu formato específico"""
-    print(f"\nProcesando CFE: {os.path.basename(pdf_path)}")
-    
     try:
-        # Leer texto del PDF
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        # Leer texto del PDF (ya parseado si viene como DocumentoPDF)
+        doc = DocumentoPDF.abrir(pdf_path)
+        log.debug("Extrayendo CFE por texto: %s", doc.nombre)
+        text = doc.texto
         
         if not text.strip():
             return {
                 "service_type": "cfe",
                 "error": "No se pudo extraer texto",
-                "titular": "NO EXTRAÍDO",
-                "direccion": "NO EXTRAÍDO",
-                "no_servicio": "NO EXTRAÍDO",
-                "total": "NO EXTRAÍDO"
+                "titular": FALTANTE,
+                "direccion": FALTANTE,
+                "no_servicio": FALTANTE,
+                "total": FALTANTE
             }
         
-        datos = {}
-        datos['service_type'] = 'cfe'
-        
-        print("Texto extraído (primeras 800 chars):")
-        print(text[:800])
-        print("-" * 80)
-        
-        # ANÁLISIS ESPECÍFICO PARA TU ESTRUCTURA DE CFE
-        # -------------------------------------------------
-        
-        # 1. TITULAR - BÚSQUEDA ESPECÍFICA PARA TU FORMATO
-        print("\nBuscando titular...")
-        
-        # FORMATO ESPECÍFICO de tu recibo: Después de "Comisión Federal de Electricidad®"
-        patron_titular = r"Comisi[óo]n Federal de Electricidad[®\s]+\n([A-Z\s\.]+?)\n"
-        titular_match = re.search(patron_titular, text, re.IGNORECASE)
-        
-        if titular_match:
-            datos['titular'] = titular_match.group(1).strip()
-            print(f"Titular encontrado: {datos['titular']}")
-        else:
-            # Búsqueda alternativa
-            lineas = text.split('\n')
-            for i, linea in enumerate(lineas):
-                if 'COMISIÓN FEDERAL DE ELECTRICIDAD' in linea.upper() or 'CFE' in linea.upper():
-                    for j in range(i+1, min(i+5, len(lineas))):
-                        siguiente = lineas[j].strip()
-                        if (len(siguiente) > 5 and 
-                            re.match(r'^[A-Z][A-Z\s\.]+$', siguiente) and
-                            not re.search(r'(AV\.|CALLE|COL\.|C\.P\.|NO\.|#|\d)', siguiente)):
-                            datos['titular'] = siguiente
-                            break
-                    if 'titular' in datos:
-                        break
-            
-            if 'titular' not in datos:
-                datos['titular'] = "NO EXTRAÍDO"
-                print("Titular no encontrado")
-        
-        # 2. DIRECCIÓN DEL TITULAR
-        print("\nBuscando dirección del titular...")
-        
-        if datos['titular'] != "NO EXTRAÍDO":
-            # Buscar dirección después del titular
-            patron_direccion = rf"{re.escape(datos['titular'])}\s*\n([^\n]+(?:\n[^\n]+){{0,3}})"
-            direccion_match = re.search(patron_direccion, text, re.IGNORECASE)
-            
-            if direccion_match:
-                direccion_text = direccion_match.group(1).strip()
-                direccion_text = ' '.join(direccion_text.split('\n'))
-                datos['direccion'] = direccion_text
-                print(f"Dirección encontrada: {datos['direccion'][:80]}...")
-            else:
-                datos['direccion'] = "NO EXTRAÍDO"
-                print("Dirección no encontrada")
-        else:
-            datos['direccion'] = "NO EXTRAÍDO"
-        
-        # 3. No. DE SERVICIO
-        print("\nBuscando número de servicio...")
-        no_servicio_match = re.search(r"NO\.\s*DE\s*SERVICIO[:\-\s]+(\d{10,14})", text, re.IGNORECASE)
-        datos['no_servicio'] = no_servicio_match.group(1) if no_servicio_match else "NO EXTRAÍDO"
-        print(f"   No. Servicio: {datos['no_servicio']}")
-        
-        # 4. TOTAL A PAGAR - VERSIÓN CORREGIDA CON CENTAVOS (como en GAS)
-        print("\nBuscando total a pagar CON CENTAVOS...")
-        
-        # PATRÓN MEJORADO: Captura tanto pesos como centavos (ej: $271.00, $271.15, etc.)
-        # Busca patrones como: "TOTAL A PAGAR: $271.00" o "TOTAL A PAGAR $271.00"
-        patron_total = r"TOTAL\s+A\s+PAGAR[:\s]+\$?\s*([\d,]+\.\d{2})"
-        total_match = re.search(patron_total, text, re.IGNORECASE)
-        
-        if total_match:
-            # Eliminar comas y mantener el punto decimal para centavos
-            total_text = total_match.group(1)
-            total_limpio = total_text.replace(',', '')
-            datos['total'] = total_limpio
-            print(f"Total con centavos encontrado: ${datos['total']}")
-        else:
-            # Búsqueda alternativa: Cualquier número con centavos cerca de "TOTAL"
-            patron_alternativo = r"TOTAL[^:\n]*[:\s]+\$?\s*([\d,]+\.\d{2})"
-            alt_match = re.search(patron_alternativo, text, re.IGNORECASE)
-            
-            if alt_match:
-                total_text = alt_match.group(1)
-                total_limpio = total_text.replace(',', '')
-                datos['total'] = total_limpio
-                print(f"Total alternativo encontrado: ${datos['total']}")
-            else:
-                # Último intento: Buscar cualquier número con formato de dinero (con centavos)
-                patron_dinero = r"\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2})"
-                # Tomar el primer número que tenga centavos y sea razonable (no demasiado grande)
-                dinero_matches = re.findall(patron_dinero, text)
-                if dinero_matches:
-                    # Filtrar números muy pequeños o muy grandes que probablemente no sean el total
-                    posibles_totales = []
-                    for dinero in dinero_matches:
-                        valor = float(dinero.replace(',', ''))
-                        if 50 <= valor <= 5000:  # Rango razonable para recibos CFE
-                            posibles_totales.append(dinero)
-                    
-                    if posibles_totales:
-                        # Usar el último (generalmente el total está al final del recibo)
-                        total_text = posibles_totales[-1]
-                        total_limpio = total_text.replace(',', '')
-                        datos['total'] = total_limpio
-                        print(f"Total por formato dinero encontrado: ${datos['total']}")
-                    else:
-                        datos['total'] = "NO EXTRAÍDO"
-                        print("Total no encontrado (con centavos)")
-                else:
-                    datos['total'] = "NO EXTRAÍDO"
-                    print("Total no encontrado (con centavos)")
-        
-        # 5. CONSUMO KWH - BUSCAR ESPECÍFICAMENTE EL FORMATO DE TU RECIBO
-        print("\nBuscando consumo (kWh) en tu formato específico...")
-        
-        consumo_encontrado = None
-        
-        # FORMATO ESPECÍFICO DE TU RECIBO: La tabla tiene "Energía (kWh)" y luego "63,075" en la columna "Total período"
-        # Primero busquemos la tabla completa
-        tabla_match = re.search(r"Energ[íi]a\s*\(kWh\).*?(\d{1,3}(?:,\d{3})+).*?(\d{1,3}(?:,\d{3})+)?", text, re.IGNORECASE | re.DOTALL)
-        
-        if tabla_match:
-            # El primer número grande es probablemente el consumo
-            consumo_encontrado = tabla_match.group(1).replace(',', '')
-            print(f"Consumo encontrado en tabla: {consumo_encontrado} kWh")
-        
-        # Si no se encuentra así, buscar específicamente "63,075" que está en tu recibo
-        if not consumo_encontrado:
-            # Buscar el patrón específico: número con coma seguido de espacios
-            patron_consumo_especifico = r"(\d{1,3},\d{3})\s+\d{1,3}\s+\d{1,3}"
-            consumo_especifico_match = re.search(patron_consumo_especifico, text)
-            
-            if consumo_especifico_match:
-                consumo_encontrado = consumo_especifico_match.group(1).replace(',', '')
-                print(f"Consumo encontrado (patrón específico): {consumo_encontrado} kWh")
-        
-        # Si aún no, buscar cualquier número grande (como 63,075)
-        if not consumo_encontrado:
-            patron_numero_grande = r"(\d{2,3},\d{3})"
-            numero_grande_match = re.search(patron_numero_grande, text)
-            
-            if numero_grande_match:
-                # Verificar que sea un número razonable para consumo de energía
-                numero = int(numero_grande_match.group(1).replace(',', ''))
-                if 1000 <= numero <= 100000:  # Rango razonable para kWh
-                    consumo_encontrado = str(numero)
-                    print(f"Consumo encontrado (número grande): {consumo_encontrado} kWh")
-        
-        datos['consumo_kwh'] = consumo_encontrado if consumo_encontrado else "NO EXTRAÍDO"
-        datos['consumo'] = datos['consumo_kwh']
-        print(f"   Consumo final: {datos['consumo']} kWh")
-        
-        # 6. PERIODO FACTURADO
-        print("\nBuscando período facturado...")
-        periodo_match = re.search(r"PERIODO\s*FACTURADO[:\-\s]*([^\n]{15,50})", text, re.IGNORECASE)
-        if periodo_match:
-            periodo_text = periodo_match.group(1).strip()
-            datos['periodo'] = periodo_text
-        else:
-            # En tu recibo: "25 AGO 25-28 OCT 25"
-            patron_fechas = r"(\d{1,2}\s+[A-Z]{3}\s+\d{2}\s*[-–]\s*\d{1,2}\s+[A-Z]{3}\s+\d{2})"
-            fechas_match = re.search(patron_fechas, text, re.IGNORECASE)
-            datos['periodo'] = fechas_match.group(1).strip() if fechas_match else "NO EXTRAÍDO"
-        
-        print(f"   Período: {datos['periodo']}")
-        
-        # 7. NÚMERO DE MEDIDOR
-        print("\nBuscando medidor...")
-        medidor_match = re.search(r"NO\.\s*MEDIDOR[:\-\s]+([A-Z0-9]{4,12})", text, re.IGNORECASE)
-        datos['no_medidor'] = medidor_match.group(1) if medidor_match else "NO EXTRAÍDO"
-        print(f"   Medidor: {datos['no_medidor']}")
-        
-        # 8. CUENTA
-        print("\nBuscando cuenta...")
-        cuenta_match = re.search(r"CUENTA[:\s]*([A-Z0-9]{8,20})", text, re.IGNORECASE)
-        if cuenta_match:
-            cuenta_text = cuenta_match.group(1).strip()
-            if 'Repartir' in cuenta_text:
-                cuenta_text = cuenta_text.split('Repartir')[0].strip()
-            datos['cuenta'] = cuenta_text
-        else:
-            datos['cuenta'] = "NO EXTRAÍDO"
-        
-        print(f"   Cuenta: {datos['cuenta']}")
-        
-        # 9. TARIFA
-        print("\nBuscando tarifa...")
-        tarifa_match = re.search(r"TARIFA[:\s]*([0-9A-Z]{2,6})", text, re.IGNORECASE)
-        datos['tarifa'] = tarifa_match.group(1).strip() if tarifa_match else "NO EXTRAÍDO"
-        print(f"   Tarifa: {datos['tarifa']}")
-        
-        # 10. RMU
-        print("\nBuscando RMU...")
-        rmu_match = re.search(r"RMU[:\s]*(\d{5})", text, re.IGNORECASE)
-        datos['rmu'] = rmu_match.group(1) if rmu_match else "NO EXTRAÍDO"
-        print(f"   RMU: {datos['rmu']}")
-        
-        # 11. FECHAS
-        print("\nBuscando fechas...")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Texto extraído de %s (primeras 800 chars):\n%s", doc.nombre, text[:800])
         
-        # Fecha límite de pago
-        fecha_pago_match = re.search(r"L[ÍI]MITE\s*DE\s*PAGO[:\-\s]*(\d{1,2})\s+([A-Z]{3})\s+(\d{2,4})", text, re.IGNORECASE)
-        if fecha_pago_match:
-            datos['fecha_pago'] = f"{fecha_pago_match.group(1)} {fecha_pago_match.group(2)} {fecha_pago_match.group(3)}"
-        else:
-            datos['fecha_pago'] = "NO EXTRAÍDO"
+        datos = extraer_datos_cfe_pypdf2_del_texto(text)
         
-        print(f"   Fecha Pago: {datos['fecha_pago']}")
-        
-        # Fecha de corte
-        fecha_corte_match = re.search(r"CORTE\s*A\s*PARTIR[:\-\s]*(\d{1,2})\s+([A-Z]{3})\s+(\d{2,4})", text, re.IGNORECASE)
-        if fecha_corte_match:
-            datos['fecha_corte'] = f"{fecha_corte_match.group(1)} {fecha_corte_match.group(2)} {fecha_corte_match.group(3)}"
-        else:
-            datos['fecha_corte'] = "NO EXTRAÍDO"
-        
-        print(f"   Fecha Corte: {datos['fecha_corte']}")
-        
-        # 12. TIPO LECTURA Y CALIDAD
-        print("\nDeterminando tipo de lectura...")
-        if "Estim" in text or "Estimada" in text:
-            datos['tipo_lectura'] = "Estimada"
-            datos['calidad'] = "ESTIMADA"
-        elif "Medida" in text:
-            datos['tipo_lectura'] = "Medida"
-            datos['calidad'] = "MEDIDA"
-        else:
-            datos['tipo_lectura'] = "NO DETECTADO"
-            datos['calidad'] = "BÁSICO"
-        
-        print(f"   Calidad: {datos['calidad']}")
-        
-        print(f"\nExtracción CFE completada para {os.path.basename(pdf_path)}")
-        print(f"   Titular: {datos['titular']}")
-        print(f"   Consumo: {datos['consumo']} kWh")
-        print(f"   Total con centavos: ${datos['total']}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Extracción CFE por texto de %s: titular=%s no_servicio=%s medidor=%s cuenta=%s "
+                      "periodo=%s tarifa=%s rmu=%s fecha_pago=%s fecha_corte=%s consumo=%s total=%s",
+                      doc.nombre, *(datos[c] for c in ('titular', 'no_servicio', 'no_medidor', 'cuenta',
+                                                       'periodo', 'tarifa', 'rmu', 'fecha_pago',
+                                                       'fecha_corte', 'consumo', 'total')))
         
         return datos
         
     except Exception as e:
-        print(f"Error en extracción CFE: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error en extracción CFE por texto")
         return {
             "service_type": "cfe",
             "error": f"Error: {str(e)}",
-            "titular": "NO EXTRAÍDO",
-            "direccion": "NO EXTRAÍDO",
-            "no_servicio": "NO EXTRAÍDO",
-            "total": "NO EXTRAÍDO"
+            "titular": FALTANTE,
+            "direccion": FALTANTE,
+            "no_servicio": FALTANTE,
+            "total": FALTANTE
         }
 
 # ================================
 # EXTRACTOR GAS ENGIE (VERSIÓN CORREGIDA PARA MONTO CORRECTO)
 # ================================
-def extraer_info_recibo_gas(pdf_path):
-    import re
-    import os
-    from PyPDF2 import PdfReader
+# Los patrones de gas se aplican al texto en mayúsculas y sin re.I
+_GAS_SERVICIO_CUENTA = re.compile(r"\b(\d{8,12})\s+(\d{8,12})\b")
+_GAS_MEDIDOR = re.compile(r"\b(\d{7,10})\b")
 
-    print(f"\nProcesando GAS ENGIE: {os.path.basename(pdf_path)}")
+def _medidor_gas(m):
+    """Último número de 7-10 dígitos después de CONSUMO CORREGIDO"""
+    posibles = _GAS_MEDIDOR.findall(m.group(1))
+    return posibles[-1] if posibles else None
 
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        txt = page.extract_text()
-        if txt:
-            text += txt + "\n"
+def _campo_gas(nombre, patrones, **opciones):
+    return Campo(nombre, patrones, fuente="mayus", flags=0, defecto=FALTANTE, **opciones)
 
-    texto = text.upper()
-
-    datos = {"service_type": "gas"}
-
-    # ============================================================
+CAMPOS_GAS = especificacion(
     # 1. TITULAR (línea antes de una calle reconocible)
-    # ============================================================
-    tit = re.search(
-        r"\n([A-ZÁÉÍÓÚÑ ]{10,50})\n[A-Z ]*(?:CALLE|AVENIDA|PRIMAVERA|UNIVERSIDAD)",
-        texto
-    )
-    datos["titular"] = tit.group(1).strip().title() if tit else "NO EXTRAÍDO"
+    _campo_gas('titular', [r"\n([A-ZÁÉÍÓÚÑ ]{10,50})\n[A-Z ]*(?:CALLE|AVENIDA|PRIMAVERA|UNIVERSIDAD)"],
+               formato=lambda m: m.group(1).strip().title(), ancla='\n'),
 
-    # ============================================================
     # 2. DIRECCIÓN (varias líneas antes del CP)
-    # ============================================================
-    direccion = re.search(
-        r"([A-Z0-9 ,\.-]+\n[A-Z0-9 ,\.-]+\n[A-Z0-9 ,\.-]+)\nC\.P\.",
-        texto
-    )
-    datos["direccion"] = (
-        direccion.group(1).replace("\n"," ").title()
-        if direccion else "NO EXTRAÍDO"
-    )
+    _campo_gas('direccion', [r"([A-Z0-9 ,\.-]+\n[A-Z0-9 ,\.-]+\n[A-Z0-9 ,\.-]+)\nC\.P\."],
+               formato=lambda m: m.group(1).replace("\n", " ").title(), requiere='C.P.'),
 
-    # ============================================================
-    # 3. N° SERVICIO Y CUENTA (dos números largos juntos)
-    # ============================================================
-    match = re.search(r"\b(\d{8,12})\s+(\d{8,12})\b", texto)
-    if match:
-        datos["no_servicio"] = match.group(1)
-        datos["cuenta"] = match.group(2)
-    else:
-        datos["no_servicio"] = "NO EXTRAÍDO"
-        datos["cuenta"] = "NO EXTRAÍDO"
-
-    # ============================================================
-    # 4. MEDIDOR (número de 7-10 dígitos después de CONSUMO CORREGIDO)
-    # ============================================================
-    bloque_consumo = re.search(
-        r"CONSUMO CORREGIDO(.{0,200})",
-        texto,
-        re.DOTALL
-    )
-    if bloque_consumo:
-        posibles = re.findall(r"\b(\d{7,10})\b", bloque_consumo.group(1))
-        datos["no_medidor"] = posibles[-1] if posibles else "NO EXTRAÍDO"
-    else:
-        datos["no_medidor"] = "NO EXTRAÍDO"
+    # 3. N° SERVICIO Y CUENTA (dos números largos juntos: una sola búsqueda)
+    _campo_gas('no_servicio', [_GAS_SERVICIO_CUENTA], grupo=1),
+    _campo_gas('cuenta', [_GAS_SERVICIO_CUENTA], grupo=2),
+
+    # 4. MEDIDOR
+    _campo_gas('no_medidor', [re.compile(r"CONSUMO CORREGIDO(.{0,200})", re.DOTALL)],
+               formato=_medidor_gas, ancla='CONSUMO CORREGIDO'),
 
-    # ============================================================
     # 5. PERIODO
-    # ============================================================
-    periodo = re.search(
-        r"DE (\d{2}\.\d{2}\.\d{4}) A (\d{2}\.\d{2}\.\d{4})",
-        texto
-    )
-    datos["periodo"] = (
-        f"{periodo.group(1)} a {periodo.group(2)}"
-        if periodo else "NO EXTRAÍDO"
-    )
+    _campo_gas('periodo', [r"DE (\d{2}\.\d{2}\.\d{4}) A (\d{2}\.\d{2}\.\d{4})"],
+               formato=lambda m: f"{m.group(1)} a {m.group(2)}", ancla='DE '),
 
-    # ============================================================
     # 6. CONSUMO REAL
-    # ============================================================
-    consumo = re.search(r"REAL\s*([0-9]+\.[0-9]+)", texto)
-    datos["consumo"] = consumo.group(1) if consumo else "NO EXTRAÍDO"
-    datos["consumo_kwh"] = datos["consumo"]
+    _campo_gas('consumo', [r"REAL\s*([0-9]+\.[0-9]+)"], ancla='REAL'),
+    Calculado('consumo_kwh', lambda ctx, r: r['consumo'], defecto=FALTANTE),
 
-    # ============================================================
     # 7. TOTAL (MONTO A PAGAR robusto)
-    # ============================================================
-    total = re.search(
-        r"MONTO\s*A\s*PAGAR(?:\s*[:])?\s*\n?\s*([0-9,]+\.[0-9]+)",
-        texto
-    )
-    datos["total"] = (
-        total.group(1).replace(",", "") if total else "NO EXTRAÍDO"
-    )
+    _campo_gas('total', [r"MONTO\s*A\s*PAGAR(?:\s*[:])?\s*\n?\s*([0-9,]+\.[0-9]+)"],
+               formato=_sin_comas, ancla='MONTO'),
+)
 
-    # ============================================================
-    # 8. Campos fijos
-    # ============================================================
+def extraer_datos_gas_del_texto(text):
+    """Campos de un recibo de gas a partir del texto del PDF"""
+    datos = {"service_type": "gas"}
+    datos.update(valores(extraer_campos(text, CAMPOS_GAS)))
+
+    # Campos fijos
     datos["calidad"] = "BÁSICO"
     datos["tipo_lectura"] = "CORREGIDO"
-
     return datos
 
+def extraer_info_recibo_gas(pdf_path):
+    doc = DocumentoPDF.abrir(pdf_path)
+    log.debug("Procesando GAS ENGIE: %s", doc.nombre)
+
+    text = ""
+    for txt in doc.textos_paginas:
+        if txt:
+            text += txt + "\n"
+
+    return extraer_datos_gas_del_texto(text)
+
 # ================================
 # EXTRACTOR JAPAM (MANTENER VERSIÓN ANTERIOR)
 # ================================
+CAMPOS_JAPAM = especificacion(
+    Campo('titular', [r'Titular[: ]*(.+?)(?:\n|$)'], formato=lambda m: m.group(1).strip(),
+          ancla='TITULAR', defecto=FALTANTE),
+    Campo('no_servicio', [r'No\.?\s*Servicio[: ]*([A-Z0-9\-]+)'], ancla='NO', defecto=FALTANTE),
+    Campo('consumo', [r'Consumo[: ]*(\d+)\s*m3'], ancla='CONSUMO', defecto=FALTANTE),
+    Campo('total', [
+        r'Total[\s\$\:]*([\d,]+\.?\d*)',
+        re.compile(r'[\$\s](\d{1,3}(?:,\d{3})*\.\d{2})'),
+    ], formato=_sin_comas, defecto=FALTANTE),
+)
+
+def extraer_datos_japam_del_texto(text):
+    """Campos de un recibo JAPAM a partir del texto del PDF"""
+    campos = valores(extraer_campos(text, CAMPOS_JAPAM))
+    return {
+        "service_type": "japam",
+        "titular": campos['titular'],
+        "no_servicio": campos['no_servicio'],
+        "consumo_m3": campos['consumo'],
+        "total": campos['total'],
+        "consumo": campos['consumo'],
+        "direccion": FALTANTE,
+        "cuenta": FALTANTE,
+        "no_medidor": FALTANTE,
+        "periodo": FALTANTE,
+        "tarifa": FALTANTE,
+        "fecha_pago": FALTANTE,
+        "fecha_corte": FALTANTE,
+        "rmu": FALTANTE,
+        "calidad": "BÁSICO",
+        "tipo_lectura": "BÁSICO",
+        "consumo_kwh": campos['consumo']
+    }
+
 def extraer_info_recibo_japam(pdf_path):
     """Extrae información de recibos JAPAM (agua)"""
-    print(f"\nProcesando JAPAM: {os.path.basename(pdf_path)}")
-    
     try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-
-        # Búsquedas básicas
-        no_servicio = re.search(r'No\.?\s*Servicio[: ]*([A-Z0-9\-]+)', text, re.IGNORECASE)
-        titular = re.search(r'Titular[: ]*(.+?)(?:\n|$)', text, re.IGNORECASE)
-        consumo = re.search(r'Consumo[: ]*(\d+)\s*m3', text, re.IGNORECASE)
-        total = re.search(r'Total[\s\$\:]*([\d,]+\.?\d*)', text, re.IGNORECASE)
-
-        if not total:
-            total = re.search(r'[\$\s](\d{1,3}(?:,\d{3})*\.\d{2})', text)
-
-        resultado = {
-            "service_type": "japam",
-            "titular": titular.group(1).strip() if titular else "NO EXTRAÍDO",
-            "no_servicio": no_servicio.group(1) if no_servicio else "NO EXTRAÍDO",
-            "consumo_m3": consumo.group(1) if consumo else "NO EXTRAÍDO",
-            "total": total.group(1).replace(',', '') if total else "NO EXTRAÍDO",
-            "consumo": consumo.group(1) if consumo else "NO EXTRAÍDO",
-            "direccion": "NO EXTRAÍDO",
-            "cuenta": "NO EXTRAÍDO",
-            "no_medidor": "NO EXTRAÍDO",
-            "periodo": "NO EXTRAÍDO",
-            "tarifa": "NO EXTRAÍDO",
-            "fecha_pago": "NO EXTRAÍDO",
-            "fecha_corte": "NO EXTRAÍDO",
-            "rmu": "NO EXTRAÍDO",
-            "calidad": "BÁSICO",
-            "tipo_lectura": "BÁSICO",
-            "consumo_kwh": consumo.group(1) if consumo else "NO EXTRAÍDO"
-        }
+        doc = DocumentoPDF.abrir(pdf_path)
+        log.debug("Procesando JAPAM: %s", doc.nombre)
+        resultado = extraer_datos_japam_del_texto(doc.texto)
         
-        print(f"JAPAM extraído: {resultado['no_servicio']}")
+        log.debug("JAPAM extraído: %s", resultado['no_servicio'])
         return resultado
         
     except Exception as e:
-        print(f"Error en extracción JAPAM: {str(e)}")
-        return {"service_type": "japam", "error": f"Error en extracción: {str(e)}"}
\ No newline at end of file
+        log.exception("Error en extracción JAPAM")
+        return {"service_type": "japam", "error": f"Error en extracción: {str(e)}"}
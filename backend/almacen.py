@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from decimal import Decimal
+
+from recibo import Recibo
+
+log = logging.getLogger(__name__)
+
+# Configuración del almacén de recibos
+ALMACEN_MOTOR = os.environ.get("ALMACEN_MOTOR", "sqlite")          # sqlite | mysql
+ALMACEN_RUTA = os.environ.get("ALMACEN_RUTA", "recibos.db")        # solo SQLite
+ALMACEN_FILAS_POR_LECTURA = int(os.environ.get("ALMACEN_FILAS_POR_LECTURA", "500"))
+ALMACEN_MAX_POR_PAGINA = 200
+
+# MySQL (opcional, requiere mysql-connector-python)
+MYSQL_HOST = os.environ.get("MYSQL_HOST", "localhost")
+MYSQL_PORT = int(os.environ.get("MYSQL_PORT", "3306"))
+MYSQL_USER = os.environ.get("MYSQL_USER", "root")
+MYSQL_PASSWORD = os.environ.get("MYSQL_PASSWORD", "")
+MYSQL_DATABASE = os.environ.get("MYSQL_DATABASE", "recibos")
+MYSQL_POOL = int(os.environ.get("MYSQL_POOL", "5"))
+
+# --------------------------
+# COLUMNAS DERIVADAS
+# --------------------------
+# Además del JSON completo se guardan columnas indexadas para filtrar y
+# agregar en SQL: mes de facturación, total y consumo numéricos, lectura.
+# Los valores salen del Recibo (recibo.py), que ya convirtió cada campo.
+# sha256 es el del contenido del PDF (único): volver a subir el mismo
+# archivo actualiza su fila en vez de contarlo dos veces.
+def _texto(valor, largo):
+    return None if valor is None else str(valor)[:largo]
+
+def _real(valor):
+    """Decimal/int -> float para la columna; None si el campo quedó como texto"""
+    return float(valor) if isinstance(valor, (Decimal, int)) else None
+
+def columnas_recibo(recibo, lote, creado, sha256=None):
+    """Valores de la fila para un resultado de extracción (Recibo o dict)"""
+    recibo = Recibo.desde_datos(recibo)
+    return {
+        'sha256': sha256,
+        'creado': creado,
+        'archivo': _texto(recibo.filename, 255),
+        'service_type': _texto(recibo.service_type, 16),
+        'lote': lote,
+        'no_servicio': _texto(recibo.no_servicio, 32),
+        'titular': _texto(recibo.titular, 255),
+        'periodo': _texto(recibo.periodo, 64),
+        'mes': recibo.mes(creado),
+        'total': _real(recibo.total),
+        'consumo': _real(recibo.consumo_total),
+        'lectura': recibo.lectura,
+        'datos': json.dumps(recibo.a_dict(), ensure_ascii=False),
+    }
+
+COLUMNAS = ['sha256', 'creado', 'archivo', 'service_type', 'lote', 'no_servicio', 'titular',
+            'periodo', 'mes', 'total', 'consumo', 'lectura', 'datos']
+
+# --------------------------
+# REPOSITORIO
+# --------------------------
+class RepositorioRecibos:
+    """Interfaz del almacén de recibos; el SQL es común a SQLite y MySQL.
+
+    Las subclases solo dan la conexión, el esquema, el marcador de
+    parámetros y la cláusula de upsert por sha256. Cada operación usa su
+    propia conexión: las lecturas en streaming se consumen fuera del hilo
+    que las creó.
+
+    Filtros aceptados por iterar/listar/resúmenes: service_type, lote,
+    no_servicio, titular (prefijo), periodo, mes (AAAA-MM), desde y hasta
+    (timestamps de subida).
+    """
+
+    marcador = "?"
+
+    def _conectar(self):
+        raise NotImplementedError
+
+    def _al_repetir(self, columnas):
+        """Cláusula que actualiza `columnas` si ya hay una fila con el mismo sha256"""
+        raise NotImplementedError
+
+    def _crear_esquema(self):
+        raise NotImplementedError
+
+    def guardar(self, datos, lote=None, sha256=None):
+        """Guarda un resultado (Recibo o dict); los resultados con error no se guardan.
+
+        Con `sha256` (el del contenido del PDF) un archivo ya guardado
+        actualiza su fila con la última extracción y subida.
+        """
+        recibo = Recibo.desde_datos(datos)
+        if recibo.error is not None:
+            return
+        fila = columnas_recibo(recibo, lote, time.time(), sha256)
+        sql = (f"INSERT INTO recibos ({', '.join(COLUMNAS)}) "
+               f"VALUES ({', '.join([self.marcador] * len(COLUMNAS))})")
+        if sha256 is not None:
+            sql += " " + self._al_repetir([c for c in COLUMNAS if c != 'sha256'])
+        try:
+            conexion = self._conectar()
+            try:
+                cursor = conexion.cursor()
+                cursor.execute(sql, [fila[c] for c in COLUMNAS])
+                conexion.commit()
+            finally:
+                conexion.close()
+        except Exception as e:
+            log.error("No se pudo guardar el recibo %s: %s", recibo.filename, e,
+                      extra={"archivo": recibo.filename})
+
+    def _where(self, filtros):
+        condiciones, parametros = [], []
+        m = self.marcador
+        for campo in ('service_type', 'lote', 'no_servicio', 'periodo', 'mes'):
+            if filtros.get(campo):
+                condiciones.append(f"{campo} = {m}")
+                parametros.append(filtros[campo])
+        if filtros.get('titular'):
+            # Prefijo: puede usar el índice de titular
+            condiciones.append(f"titular LIKE {m}")
+            parametros.append(filtros['titular'] + '%')
+        if filtros.get('desde') is not None:
+            condiciones.append(f"creado >= {m}")
+            parametros.append(filtros['desde'])
+        if filtros.get('hasta') is not None:
+            condiciones.append(f"creado < {m}")
+            parametros.append(filtros['hasta'])
+        where = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return where, parametros
+
+    @staticmethod
+    def _registro(id_recibo, creado, lote, datos):
+        registro = json.loads(datos)
+        registro['id'] = id_recibo
+        registro['fecha_registro'] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(creado))
+        registro['job_id'] = lote
+        return registro
+
+    def iterar(self, **filtros):
+        """Genera los recibos (dicts) en orden de registro, por bloques de filas"""
+        where, parametros = self._where(filtros)
+        conexion = self._conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(f"SELECT id, creado, lote, datos FROM recibos{where} ORDER BY id", parametros)
+            while True:
+                filas = cursor.fetchmany(ALMACEN_FILAS_POR_LECTURA)
+                if not filas:
+                    break
+                for fila in filas:
+                    yield self._registro(*fila)
+        finally:
+            conexion.close()
+
+    def listar(self, pagina=1, por_pagina=50, **filtros):
+        """Una página de recibos (más recientes primero) y el total que cumple los filtros"""
+        por_pagina = max(1, min(por_pagina, ALMACEN_MAX_POR_PAGINA))
+        pagina = max(1, pagina)
+        where, parametros = self._where(filtros)
+        m = self.marcador
+        conexion = self._conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM recibos{where}", parametros)
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT id, creado, lote, datos FROM recibos{where} ORDER BY id DESC LIMIT {m} OFFSET {m}",
+                parametros + [por_pagina, (pagina - 1) * por_pagina]
+            )
+            registros = [self._registro(*fila) for fila in cursor.fetchall()]
+        finally:
+            conexion.close()
+        return registros, total
+
+    def resumen_mensual(self, **filtros):
+        """Gasto y consumo por servicio y mes de facturación"""
+        where, parametros = self._where(filtros)
+        conexion = self._conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(
+                "SELECT mes, service_type, COUNT(*), COALESCE(SUM(total), 0), COALESCE(SUM(consumo), 0) "
+                f"FROM recibos{where} GROUP BY mes, service_type ORDER BY mes, service_type",
+                parametros
+            )
+            filas = cursor.fetchall()
+        finally:
+            conexion.close()
+        return [
+            {"mes": mes, "service_type": servicio, "recibos": recibos,
+             "total": round(total, 2), "consumo": round(consumo, 2)}
+            for mes, servicio, recibos, total, consumo in filas
+        ]
+
+    def resumen(self, recientes=5, **filtros):
+        """Totales para el dashboard: por servicio, tipo de lectura y últimos recibos"""
+        where, parametros = self._where(filtros)
+        m = self.marcador
+        conexion = self._conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(
+                "SELECT service_type, COUNT(*), COALESCE(SUM(total), 0), COALESCE(SUM(consumo), 0), "
+                "SUM(CASE WHEN lectura = 'ESTIMADA' THEN 1 ELSE 0 END), "
+                "SUM(CASE WHEN lectura = 'MEDIDA' THEN 1 ELSE 0 END) "
+                f"FROM recibos{where} GROUP BY service_type",
+                parametros
+            )
+            por_servicio = cursor.fetchall()
+            cursor.execute(
+                f"SELECT archivo, service_type, creado, total FROM recibos{where} ORDER BY id DESC LIMIT {m}",
+                parametros + [recientes]
+            )
+            ultimos = cursor.fetchall()
+        finally:
+            conexion.close()
+
+        return {
+            "recibos": sum(fila[1] for fila in por_servicio),
+            "por_servicio": {
+                servicio: {"recibos": recibos, "total": round(total, 2), "consumo": round(consumo, 2)}
+                for servicio, recibos, total, consumo, _, _ in por_servicio
+            },
+            "lecturas": {
+                "estimadas": int(sum(fila[4] or 0 for fila in por_servicio)),
+                "medidas": int(sum(fila[5] or 0 for fila in por_servicio)),
+            },
+            "recientes": [
+                {"filename": archivo, "service_type": servicio, "total": total,
+                 "fecha_registro": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(creado))}
+                for archivo, servicio, creado, total in ultimos
+            ],
+        }
+
+class RepositorioSQLite(RepositorioRecibos):
+    """Almacén por defecto: un archivo SQLite (ALMACEN_RUTA)"""
+
+    marcador = "?"
+
+    def __init__(self, ruta=ALMACEN_RUTA):
+        self.ruta = ruta
+        self._crear_esquema()
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def _al_repetir(self, columnas):
+        asignaciones = ', '.join(f"{c} = excluded.{c}" for c in columnas)
+        return f"ON CONFLICT(sha256) DO UPDATE SET {asignaciones}"
+
+    def _crear_esquema(self):
+        conexion = self._conectar()
+        try:
+            # WAL: las exportaciones leen mientras se siguen guardando recibos
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS recibos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sha256 TEXT,
+                    creado REAL NOT NULL,
+                    archivo TEXT,
+                    service_type TEXT,
+                    lote TEXT,
+                    no_servicio TEXT,
+                    titular TEXT COLLATE NOCASE,
+                    periodo TEXT,
+                    mes TEXT,
+                    total REAL,
+                    consumo REAL,
+                    lectura TEXT,
+                    datos TEXT NOT NULL
+                )
+            """)
+            self._migrar(conexion)
+            for columnas in ('creado', 'lote', 'no_servicio', 'service_type, mes', 'periodo', 'titular'):
+                nombre = "idx_recibos_" + columnas.replace(', ', '_')
+                conexion.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON recibos({columnas})")
+            conexion.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_recibos_sha256 ON recibos(sha256)")
+            conexion.commit()
+        finally:
+            conexion.close()
+
+    def _migrar(self, conexion):
+        """Agrega las columnas indexadas a una tabla de una versión anterior.
+
+        Las derivadas se recalculan del JSON; sha256 queda vacío en las filas
+        viejas (no se guardaba el contenido) y se llena al volver a subirlas.
+        """
+        existentes = {fila[1] for fila in conexion.execute("PRAGMA table_info(recibos)")}
+        faltantes = [c for c in COLUMNAS if c not in existentes]
+        if not faltantes:
+            return
+        tipos = {'total': 'REAL', 'consumo': 'REAL', 'titular': 'TEXT COLLATE NOCASE'}
+        for columna in faltantes:
+            conexion.execute(f"ALTER TABLE recibos ADD COLUMN {columna} {tipos.get(columna, 'TEXT')}")
+
+        faltantes = [c for c in faltantes if c != 'sha256']
+        if not faltantes:
+            log.info("Almacén migrado: columna sha256")
+            return
+        filas = conexion.execute("SELECT id, creado, lote, datos FROM recibos").fetchall()
+        for id_recibo, creado, lote, datos in filas:
+            fila = columnas_recibo(json.loads(datos), lote, creado)
+            conexion.execute(
+                f"UPDATE recibos SET {', '.join(c + ' = ?' for c in faltantes)} WHERE id = ?",
+                [fila[c] for c in faltantes] + [id_recibo]
+            )
+        log.info("Almacén migrado: %d recibos con columnas %s", len(filas), ", ".join(faltantes))
+
+class RepositorioMySQL(RepositorioRecibos):
+    """Almacén en MySQL (ALMACEN_MOTOR=mysql, variables MYSQL_*)"""
+
+    marcador = "%s"
+
+    def __init__(self, host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER,
+                 password=MYSQL_PASSWORD, database=MYSQL_DATABASE, pool=MYSQL_POOL):
+        try:
+            from mysql.connector import pooling
+        except ImportError as e:
+            raise RuntimeError("ALMACEN_MOTOR=mysql requiere mysql-connector-python") from e
+
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name="recibos", pool_size=pool, host=host, port=port, user=user,
+            password=password, database=database, charset="utf8mb4"
+        )
+        self._crear_esquema()
+
+    def _conectar(self):
+        return self._pool.get_connection()
+
+    def _al_repetir(self, columnas):
+        return "ON DUPLICATE KEY UPDATE " + ', '.join(f"{c} = VALUES({c})" for c in columnas)
+
+    def _crear_esquema(self):
+        conexion = self._conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS recibos (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    sha256 CHAR(64),
+                    creado DOUBLE NOT NULL,
+                    archivo VARCHAR(255),
+                    service_type VARCHAR(16),
+                    lote VARCHAR(64),
+                    no_servicio VARCHAR(32),
+                    titular VARCHAR(255),
+                    periodo VARCHAR(64),
+                    mes CHAR(7),
+                    total DOUBLE,
+                    consumo DOUBLE,
+                    lectura VARCHAR(16),
+                    datos LONGTEXT NOT NULL,
+                    UNIQUE INDEX idx_recibos_sha256 (sha256),
+                    INDEX idx_recibos_creado (creado),
+                    INDEX idx_recibos_lote (lote),
+                    INDEX idx_recibos_no_servicio (no_servicio),
+                    INDEX idx_recibos_service_type_mes (service_type, mes),
+                    INDEX idx_recibos_periodo (periodo),
+                    INDEX idx_recibos_titular (titular)
+                ) CHARACTER SET utf8mb4
+            """)
+            conexion.commit()
+        finally:
+            conexion.close()
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+def obtener_almacen():
+    """Almacén de recibos compartido por todo el proceso (según ALMACEN_MOTOR)"""
+    global _almacen
+    with _almacen_lock:
+        if _almacen is None:
+            if ALMACEN_MOTOR == "mysql":
+                _almacen = RepositorioMySQL()
+            else:
+                _almacen = RepositorioSQLite()
+        return _almacen
@@ -0,0 +1,64 @@
+"""
+Benchmark de arranque en frío del módulo de extracción.
+
+Compara, en procesos Python nuevos:
+  - PyPDF2:  solo importar PyPDF2 (piso teórico de las rutas sin OCR)
+  - antes:   importar Ing_Soft_P2 y cargar EasyOCR (comportamiento anterior,
+             cuando el Reader se creaba al importar el módulo)
+  - despues: importar Ing_Soft_P2 con el OCR perezoso (Gas/JAPAM/servidor)
+
+Uso:
+    python benchmarks/bench_arranque.py [repeticiones]
+"""
+import os
+import subprocess
+import sys
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ESCENARIOS = {
+    "PyPDF2": "import PyPDF2",
+    "antes": "import Ing_Soft_P2; Ing_Soft_P2.precargar_ocr()",
+    "despues": "import Ing_Soft_P2",
+}
+
+PLANTILLA = """
+import time
+t0 = time.perf_counter()
+{codigo}
+t1 = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+except ImportError:
+    rss = 0.0
+print(f"{{t1 - t0:.4f}} {{rss:.1f}}")
+"""
+
+def medir(codigo):
+    """Ejecuta el código en un intérprete nuevo y devuelve (segundos, RSS MB)"""
+    salida = subprocess.run(
+        [sys.executable, "-c", PLANTILLA.format(codigo=codigo)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    segundos, rss = salida.stdout.strip().splitlines()[-1].split()
+    return float(segundos), float(rss)
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"{'escenario':10} {'mediana (s)':>12} {'min (s)':>10} {'RSS (MB)':>10}")
+    print("-" * 46)
+    for nombre, codigo in ESCENARIOS.items():
+        try:
+            muestras = [medir(codigo) for _ in range(repeticiones)]
+        except subprocess.CalledProcessError as e:
+            print(f"{nombre:10} error: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        tiempos = [m[0] for m in muestras]
+        rss = max(m[1] for m in muestras)
+        print(f"{nombre:10} {statistics.median(tiempos):12.4f} {min(tiempos):10.4f} {rss:10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Micro-benchmark del motor de campos (campos.py).
+
+Mide el tiempo de parseo por recibo, sin OCR ni lectura del PDF:
+- CFE (texto OCR): extraer_datos_cfe_del_texto sobre los *_texto.txt y
+  *_debug*.txt guardados en uploads/ y test1/.
+- CFE, Gas y JAPAM (capa de texto): el parser de cada servicio sobre el
+  texto ya extraído de los PDFs de muestra.
+
+Con --campos muestra además cuánto cuesta cada campo de la especificación CFE.
+
+Uso:
+    python benchmarks/bench_campos.py [--repeticiones 200] [--campos]
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import Ing_Soft_P2
+from campos import ContextoTexto
+from documento import DocumentoPDF
+from procesamiento import detect_service_type
+
+def corpus_textos():
+    patrones = [
+        os.path.join(BACKEND_DIR, "uploads", "*.txt"),
+        os.path.join(BACKEND_DIR, "debug_*.txt"),
+        os.path.join(REPO_DIR, "test1", "*_texto.txt"),
+        os.path.join(REPO_DIR, "test1", "*_debug*.txt"),
+    ]
+    rutas = sorted({r for patron in patrones for r in glob.glob(patron)})
+    return [(os.path.basename(r), open(r, encoding="utf-8", errors="replace").read()) for r in rutas]
+
+def corpus_pdfs():
+    """(servicio, nombre, texto) de cada PDF con capa de texto"""
+    muestras = []
+    for ruta in sorted(glob.glob(os.path.join(REPO_DIR, "**", "*.pdf"), recursive=True)):
+        try:
+            doc = DocumentoPDF.desde_ruta(ruta)
+            texto = doc.texto
+        except Exception:
+            continue
+        servicio = detect_service_type(texto)
+        if texto.strip() and servicio:
+            if servicio == "gas":
+                texto = "".join(t + "\n" for t in doc.textos_paginas if t)
+            muestras.append((servicio, doc.nombre, texto))
+    return muestras
+
+def medir(funcion, texto, repeticiones):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(texto)
+    return (time.perf_counter() - t0) / repeticiones
+
+def resumen(titulo, tiempos):
+    if not tiempos:
+        print(f"{titulo}: sin muestras")
+        return
+    us = sorted(t * 1e6 for t in tiempos)
+    print(f"{titulo:28} n={len(us):3d}  media {statistics.mean(us):8.1f} us  "
+          f"mediana {statistics.median(us):8.1f} us  máx {us[-1]:8.1f} us")
+
+def costo_por_campo(textos, repeticiones):
+    acumulado = {campo.nombre: 0.0 for campo in Ing_Soft_P2.CAMPOS_CFE_OCR}
+    for _, texto in textos:
+        for _ in range(repeticiones):
+            ctx = ContextoTexto(texto)
+            resultados = {}
+            for campo in Ing_Soft_P2.CAMPOS_CFE_OCR:
+                t0 = time.perf_counter()
+                resultados[campo.nombre] = campo.extraer(ctx, resultados)
+                acumulado[campo.nombre] += time.perf_counter() - t0
+
+    total = len(textos) * repeticiones
+    print("\nCosto por campo (CFE texto OCR, promedio por recibo)")
+    for nombre, segundos in sorted(acumulado.items(), key=lambda x: -x[1]):
+        print(f"  {nombre:14} {segundos / total * 1e6:8.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--campos", action="store_true", help="desglose por campo")
+    args = parser.parse_args()
+
+    textos = corpus_textos()
+    tiempos = []
+    for nombre, texto in textos:
+        tiempos.append(medir(lambda t: Ing_Soft_P2.extraer_datos_cfe_del_texto(t, nombre), texto, args.repeticiones))
+    resumen("CFE (texto OCR)", tiempos)
+
+    parsers = {
+        "cfe": Ing_Soft_P2.extraer_datos_cfe_pypdf2_del_texto,
+        "gas": Ing_Soft_P2.extraer_datos_gas_del_texto,
+        "japam": Ing_Soft_P2.extraer_datos_japam_del_texto,
+    }
+    por_servicio = {servicio: [] for servicio in parsers}
+    for servicio, _, texto in corpus_pdfs():
+        por_servicio[servicio].append(medir(parsers[servicio], texto, args.repeticiones))
+    for servicio, tiempos_servicio in por_servicio.items():
+        resumen(f"{servicio.upper()} (capa de texto)", tiempos_servicio)
+
+    if args.campos:
+        costo_por_campo(textos, max(1, args.repeticiones // 4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark del clasificador de servicio (clasificador.py).
+
+Compara, sobre las capturas de texto y los PDFs de muestra, el clasificador
+por palabras clave con la cascada de `in` que usaba detect_service_type
+antes (copiada abajo): tiempo por texto y recibos en los que difieren.
+
+Uso:
+    python benchmarks/bench_clasificador.py [--repeticiones 200]
+"""
+import os
+import sys
+import time
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extractores import obtener_registro_extractores
+from bench_campos import corpus_textos, corpus_pdfs, resumen
+
+def detectar_anterior(text):
+    """detect_service_type antes de clasificador.py (referencia)"""
+    t = text.upper()
+    if 'CFE' in t or 'COMISIÓN FEDERAL DE ELECTRICIDAD' in t or 'ELECTRICIDAD' in t or 'ELECTRICA' in t \
+            or 'KWH' in t or 'KILOWATT' in t or 'SUMINISTRO ELÉCTRICO' in t:
+        return "cfe"
+    if 'JAPAM' in t or 'JUNTA DE AGUA' in t or 'AGUA POTABLE' in t or 'SERVICIO DE AGUA' in t \
+            or ('M3' in t and 'AGUA' in t) or ('METROS CÚBICOS' in t and 'CONSUMO' in t):
+        return "japam"
+    if ('GAS' in t and ('NATURAL' in t or 'LP' in t or 'PROPANO' in t)) or 'ENGIE' in t \
+            or 'TRACTEBEL' in t or 'COMBUSTIBLE' in t:
+        return "gas"
+    for line in t.split('\n'):
+        if 'CFE' in line:
+            return "cfe"
+        elif 'JAPAM' in line:
+            return "japam"
+        elif 'GAS' in line:
+            return "gas"
+    cuentas = {
+        "cfe": sum(k in t for k in ['CFE', 'ELECTRICIDAD', 'KWH', 'TARIFA', 'MEDIDOR']),
+        "japam": sum(k in t for k in ['JAPAM', 'AGUA', 'M3', 'CAUDAL', 'HIDRANTE']),
+        "gas": sum(k in t for k in ['GAS', 'ENGIE', 'PROPANO', 'BUTANO', 'COMBUSTIBLE']),
+    }
+    mejor = max(cuentas, key=cuentas.get)
+    if sorted(cuentas.values())[-2] == cuentas[mejor]:
+        return "unknown"
+    return mejor
+
+def medir(funcion, texto, repeticiones):
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(texto)
+    return (time.perf_counter() - t0) / repeticiones
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    clasificador = obtener_registro_extractores().clasificador
+    textos = corpus_textos() + [(nombre, texto) for _, nombre, texto in corpus_pdfs()]
+    print(f"{len(textos)} textos, {sum(len(t) for _, t in textos) / len(textos):.0f} caracteres de media\n")
+
+    anterior, nuevo = [], []
+    for nombre, texto in textos:
+        anterior.append(medir(detectar_anterior, texto, args.repeticiones))
+        nuevo.append(medir(clasificador.clasificar, texto, args.repeticiones))
+        c = clasificador.clasificar(texto)
+        antes = detectar_anterior(texto)
+        marca = "" if antes == c.servicio else f"   <- antes {antes}"
+        print(f"  {nombre[:44]:44} {c.servicio:8} confianza {c.confianza:5.2f}{marca}")
+
+    print()
+    resumen("cascada anterior", anterior)
+    resumen("clasificador", nuevo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Regresión y rendimiento sobre el corpus de recibos del repositorio.
+
+Corre los extractores sobre:
+- modo texto: las capturas guardadas (test1/*_texto.txt, uploads/*_texto.txt,
+  *_debug*.txt), solo la etapa de campos, sin PDF ni OCR.
+- modo pdf: cada PDF de test1/ y Recibos/ por el pipeline completo
+  (procesar_recibo: detección + extractor), igual que /api/upload.
+
+Por documento registra el tiempo de cada etapa (tiempos.py: parseo,
+rasterizado, preproceso, ocr, campos), el pico de RSS y qué campos coinciden
+con benchmarks/corpus_golden.json. El reporte (--salida) es JSON con claves
+ordenadas para compararlo entre commits con git diff o con --comparar, que
+termina con código 1 si algún campo perdió aciertos o alguna etapa se hizo
+más lenta que el umbral.
+
+--actualizar-golden agrega al golden los documentos que aún no tiene (con
+lo que extrae el código actual, sin errores); los que ya están no se tocan,
+así se pueden corregir a mano. Para regenerar uno, borrar su entrada.
+
+Uso:
+    python benchmarks/bench_corpus.py [carpetas_pdfs ...] [--modo texto|pdf|todos] [--salida reporte.json]
+    python benchmarks/bench_corpus.py --salida nuevo.json --comparar base.json [--umbral 0.25]
+    python benchmarks/bench_corpus.py --actualizar-golden
+    python benchmarks/bench_corpus.py --servicio gas     # un solo extractor
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+import contextlib
+import io
+import platform
+import resource
+import statistics
+import subprocess
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import Ing_Soft_P2
+from documento import DocumentoPDF
+from procesamiento import procesar_recibo, detect_service_type, detect_service_type_by_filename, REQUIRED_FIELDS
+from tiempos import ETAPAS, medir_etapas
+from extractores import obtener_registro_extractores
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_golden.json")
+
+# Capturas de texto y de dónde salió el texto: "ocr" (EasyOCR) o "texto" (capa de texto PyPDF2)
+CAPTURAS = [
+    ("test1/*_texto.txt", "ocr"),
+    ("backend/uploads/*_debug_ocr.txt", "ocr"),
+    ("backend/uploads/*_texto.txt", "texto"),
+    ("backend/uploads/*_debug.txt", "texto"),
+    ("backend/debug_*.txt", "texto"),
+]
+CARPETAS_PDF = ["test1", "Recibos"]
+
+# Parser de cada (servicio, origen de la captura)
+PARSERS_TEXTO = {
+    ("cfe", "ocr"): lambda texto, nombre: Ing_Soft_P2.extraer_datos_cfe_del_texto(texto, nombre),
+    ("cfe", "texto"): lambda texto, nombre: Ing_Soft_P2.extraer_datos_cfe_pypdf2_del_texto(texto),
+    ("gas", "ocr"): lambda texto, nombre: Ing_Soft_P2.extraer_datos_gas_del_texto(texto),
+    ("gas", "texto"): lambda texto, nombre: Ing_Soft_P2.extraer_datos_gas_del_texto(texto),
+    ("japam", "ocr"): lambda texto, nombre: Ing_Soft_P2.extraer_datos_japam_del_texto(texto),
+    ("japam", "texto"): lambda texto, nombre: Ing_Soft_P2.extraer_datos_japam_del_texto(texto),
+}
+
+# Campos que se comparan contra el golden
+CAMPOS_EVALUADOS = REQUIRED_FIELDS
+
+# Diferencias de tiempo menores a esto (ms) se consideran ruido al comparar
+RUIDO_MS = 1.0
+
+def ruta_relativa(ruta):
+    return os.path.relpath(ruta, REPO_DIR).replace(os.sep, "/")
+
+# --------------------------
+# MEMORIA
+# --------------------------
+def _rss_kb(campo):
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith(campo):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reiniciar_pico():
+    """Reinicia VmHWM (Linux); sin /proc el pico por documento no se mide"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def rss_max_mb():
+    """Pico de RSS de todo el proceso (ru_maxrss está en KB en Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# --------------------------
+# CORPUS
+# --------------------------
+def capturas_texto():
+    """(ruta, origen) de cada captura de texto del repositorio"""
+    vistas = {}
+    for patron, origen in CAPTURAS:
+        for ruta in glob.glob(os.path.join(REPO_DIR, patron)):
+            vistas.setdefault(ruta, origen)
+    return sorted(vistas.items())
+
+def leer_captura(ruta):
+    texto = open(ruta, encoding="utf-8", errors="replace").read()
+    # _guardar_debug_ocr agrega un análisis de patrones después del texto OCR
+    return texto.split("\n\n" + "=" * 80)[0]
+
+def pdfs_corpus(carpetas):
+    rutas = {r for carpeta in carpetas for r in glob.glob(os.path.join(carpeta, "**", "*.pdf"), recursive=True)}
+    return sorted(rutas)
+
+# --------------------------
+# EJECUCIÓN
+# --------------------------
+def correr(funcion, repeticiones):
+    """Corre `funcion()` y devuelve (resultado, ms por etapa, ms totales, pico MB).
+
+    Con varias repeticiones los tiempos son la mediana; el pico, el de la
+    primera. El pico es aproximado: la memoria que el proceso ya había pedido
+    y liberado se reutiliza sin subir el RSS (el máximo del proceso queda en
+    meta.rss_max_mb).
+    """
+    por_etapa = {e: [] for e in ETAPAS}
+    totales = []
+    pico = None
+    for i in range(repeticiones):
+        medir_pico = i == 0 and _reiniciar_pico()
+        base = _rss_kb("VmHWM") if medir_pico else None
+        with contextlib.redirect_stdout(io.StringIO()), medir_etapas() as tiempos:
+            inicio = time.perf_counter()
+            resultado = funcion()
+            totales.append((time.perf_counter() - inicio) * 1000)
+        if medir_pico and base is not None:
+            pico = round(max(0, _rss_kb("VmHWM") - base) / 1024, 1)
+        for e in ETAPAS:
+            por_etapa[e].append(tiempos.get(e, 0.0) * 1000)
+    etapas = {e: round(statistics.median(v), 3) for e, v in por_etapa.items()}
+    return resultado, etapas, round(statistics.median(totales), 3), pico
+
+def comparar_campos(datos, esperado):
+    """{campo: (esperado, obtenido)} de los campos del golden que no coinciden"""
+    return {campo: (valor, datos.get(campo)) for campo, valor in esperado.items()
+            if str(datos.get(campo)) != str(valor)}
+
+def correr_texto(repeticiones, solo=None):
+    documentos = {}
+    for ruta, origen in capturas_texto():
+        texto = leer_captura(ruta)
+        nombre = os.path.basename(ruta)
+        servicio = detect_service_type(texto)
+        if servicio == "unknown":
+            servicio = detect_service_type_by_filename(nombre)
+        parser = PARSERS_TEXTO.get((servicio, origen))
+        if parser is None or (solo and servicio != solo):
+            continue
+        datos, etapas, total, pico = correr(lambda: parser(texto, nombre), repeticiones)
+        documentos[ruta_relativa(ruta)] = {"servicio": servicio, "origen": origen, "datos": datos,
+                                           "etapas_ms": etapas, "total_ms": total, "pico_mb": pico}
+    return documentos
+
+def correr_pdf(carpetas, repeticiones, solo=None):
+    documentos = {}
+    for ruta in pdfs_corpus(carpetas):
+        contenido = open(ruta, "rb").read()
+        nombre = os.path.basename(ruta)
+        if solo:
+            # Detección fuera de la medición, con un documento aparte
+            extractor, _ = obtener_registro_extractores().detectar(DocumentoPDF(contenido, nombre).texto, nombre)
+            if extractor is None or extractor.servicio != solo:
+                continue
+
+        def procesar():
+            # Documento nuevo en cada repetición: sin texto ni imágenes cacheadas
+            try:
+                return procesar_recibo(DocumentoPDF(contenido, nombre, ruta=ruta))
+            except Exception as e:
+                return {"service_type": "error", "error": str(e)}
+
+        datos, etapas, total, pico = correr(procesar, repeticiones)
+        documentos[ruta_relativa(ruta)] = {"servicio": datos.get("service_type"), "datos": datos,
+                                           "etapas_ms": etapas, "total_ms": total, "pico_mb": pico}
+    return documentos
+
+# --------------------------
+# REPORTE
+# --------------------------
+def evaluar(documentos, golden):
+    """Agrega a cada documento sus aciertos contra el golden y arma el resumen del modo"""
+    por_campo = {}
+    for ruta, doc in documentos.items():
+        esperado = golden.get(ruta)
+        datos = doc.pop("datos")
+        doc["error"] = datos.get("error")
+        if esperado is None:
+            doc["golden"] = False
+            continue
+        fallos = comparar_campos(datos, esperado)
+        doc["golden"] = True
+        doc["aciertos"] = len(esperado) - len(fallos)
+        doc["campos"] = len(esperado)
+        doc["fallos"] = {c: {"esperado": e, "obtenido": o} for c, (e, o) in fallos.items()}
+        for campo in esperado:
+            stats = por_campo.setdefault(campo, {"aciertos": 0, "total": 0})
+            stats["total"] += 1
+            stats["aciertos"] += campo not in fallos
+
+    totales = [doc["total_ms"] for doc in documentos.values()]
+    picos = [doc["pico_mb"] for doc in documentos.values() if doc["pico_mb"] is not None]
+    aciertos = sum(s["aciertos"] for s in por_campo.values())
+    campos = sum(s["total"] for s in por_campo.values())
+    resumen = {
+        "documentos": len(documentos),
+        "con_golden": sum(doc["golden"] for doc in documentos.values()),
+        "errores": sum(bool(doc["error"]) for doc in documentos.values()),
+        "etapas_ms": {e: round(sum(doc["etapas_ms"][e] for doc in documentos.values()), 3) for e in ETAPAS},
+        "total_ms": round(sum(totales), 3),
+        "mediana_ms": round(statistics.median(totales), 3) if totales else 0.0,
+        "pico_mb_max": max(picos) if picos else None,
+        "precision": round(aciertos / campos, 4) if campos else None,
+        "campos": dict(sorted(por_campo.items())),
+    }
+    return {"documentos": documentos, "resumen": resumen}
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def meta(args):
+    return {
+        "commit": _commit(),
+        "version_extractor": Ing_Soft_P2.VERSION_EXTRACTOR,
+        "python": platform.python_version(),
+        "cfe_modo": Ing_Soft_P2.CFE_MODO,
+        "ocr_disponible": Ing_Soft_P2.OCR_AVAILABLE,
+        "repeticiones": args.repeticiones,
+        "servicio": args.servicio,
+    }
+
+def imprimir(modo, reporte):
+    resumen = reporte["resumen"]
+    precision = "-" if resumen["precision"] is None else f"{resumen['precision']:.1%}"
+    pico = "-" if resumen["pico_mb_max"] is None else f"{resumen['pico_mb_max']:.1f} MB"
+    print(f"[{modo}] {resumen['documentos']} documentos ({resumen['con_golden']} con golden, "
+          f"{resumen['errores']} con error)  total {resumen['total_ms']:.1f} ms  "
+          f"mediana {resumen['mediana_ms']:.2f} ms  pico {pico}  precisión {precision}")
+    print("  etapas: " + "  ".join(f"{e} {ms:.1f} ms" for e, ms in resumen["etapas_ms"].items()))
+    for ruta, doc in reporte["documentos"].items():
+        for campo, fallo in doc.get("fallos", {}).items():
+            print(f"  {ruta}: {campo} esperado {fallo['esperado']!r}, obtenido {fallo['obtenido']!r}")
+
+# --------------------------
+# COMPARACIÓN ENTRE COMMITS
+# --------------------------
+def comparar(base, nuevo, umbral):
+    """Lista de regresiones (textos) de `nuevo` respecto de `base`"""
+    regresiones = []
+    for modo in ("texto", "pdf"):
+        if modo not in base or modo not in nuevo:
+            continue
+        r_base, r_nuevo = base[modo]["resumen"], nuevo[modo]["resumen"]
+        for campo, stats in r_base["campos"].items():
+            actual = r_nuevo["campos"].get(campo, {"aciertos": 0})
+            if actual["aciertos"] < stats["aciertos"]:
+                regresiones.append(f"[{modo}] {campo}: {stats['aciertos']} -> {actual['aciertos']} aciertos")
+        for ruta, doc in nuevo[modo]["documentos"].items():
+            anterior = base[modo]["documentos"].get(ruta)
+            if anterior and not anterior.get("error") and doc.get("error"):
+                regresiones.append(f"[{modo}] {ruta}: error nuevo: {doc['error']}")
+        for etapa, ms in r_nuevo["etapas_ms"].items():
+            antes = r_base["etapas_ms"].get(etapa, 0.0)
+            if ms - antes > RUIDO_MS and ms > antes * (1 + umbral):
+                regresiones.append(f"[{modo}] etapa {etapa}: {antes:.1f} -> {ms:.1f} ms")
+        if r_nuevo["total_ms"] - r_base["total_ms"] > RUIDO_MS and r_nuevo["total_ms"] > r_base["total_ms"] * (1 + umbral):
+            regresiones.append(f"[{modo}] total: {r_base['total_ms']:.1f} -> {r_nuevo['total_ms']:.1f} ms")
+    return regresiones
+
+# --------------------------
+# GOLDEN
+# --------------------------
+def cargar_golden():
+    if not os.path.exists(GOLDEN):
+        return {}
+    with open(GOLDEN, encoding="utf-8") as f:
+        return json.load(f)
+
+def actualizar_golden(golden, modo, documentos):
+    """Agrega los documentos sin golden y sin error; devuelve cuántos.
+
+    Solo se guardan los campos extraídos: un campo que hoy falta no cuenta
+    como esperado (si el OCR no está disponible, por ejemplo).
+    """
+    entradas = golden.setdefault(modo, {})
+    nuevos = 0
+    for ruta, doc in documentos.items():
+        datos = doc["datos"]
+        if ruta in entradas or datos.get("error"):
+            continue
+        entradas[ruta] = {c: datos[c] for c in CAMPOS_EVALUADOS
+                          if c in datos and not Ing_Soft_P2.es_no_extraido(datos[c])}
+        nuevos += 1
+    return nuevos
+
+def guardar_json(ruta, datos):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=1, sort_keys=True, default=str)
+        f.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=["texto", "pdf", "todos"], default="todos")
+    parser.add_argument("carpetas", nargs="*", default=[os.path.join(REPO_DIR, c) for c in CARPETAS_PDF],
+                        help="carpetas con PDFs para el modo pdf (se recorren recursivamente)")
+    parser.add_argument("--repeticiones", type=int, default=3, help="tiempos = mediana de N corridas")
+    parser.add_argument("--cfe-modo", choices=["hibrido", "ocr", "texto"], help="CFE_MODO para el modo pdf")
+    parser.add_argument("--salida", help="ruta del reporte JSON")
+    parser.add_argument("--comparar", help="reporte base contra el que buscar regresiones")
+    parser.add_argument("--umbral", type=float, default=0.25, help="aumento de tiempo tolerado (0.25 = 25%%)")
+    parser.add_argument("--servicio", choices=[e.servicio for e in obtener_registro_extractores().extractores()],
+                        help="medir solo los documentos de un extractor (extractores.py)")
+    parser.add_argument("--actualizar-golden", action="store_true")
+    args = parser.parse_args()
+
+    if args.cfe_modo:
+        Ing_Soft_P2.CFE_MODO = args.cfe_modo
+    modos = ["texto", "pdf"] if args.modo == "todos" else [args.modo]
+    golden = cargar_golden()
+
+    reporte = {"meta": meta(args)}
+    for modo in modos:
+        if modo == "texto":
+            documentos = correr_texto(args.repeticiones, args.servicio)
+        else:
+            documentos = correr_pdf(args.carpetas, args.repeticiones, args.servicio)
+        if args.actualizar_golden:
+            print(f"[{modo}] {actualizar_golden(golden, modo, documentos)} documentos nuevos en el golden")
+        reporte[modo] = evaluar(documentos, golden.get(modo, {}))
+        imprimir(modo, reporte[modo])
+    reporte["meta"]["rss_max_mb"] = round(rss_max_mb(), 1)
+
+    if args.actualizar_golden:
+        guardar_json(GOLDEN, golden)
+    if args.salida:
+        guardar_json(args.salida, reporte)
+        print(f"Reporte: {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(base, reporte, args.umbral)
+        for r in regresiones:
+            print(f"REGRESIÓN {r}")
+        if regresiones:
+            sys.exit(1)
+        print(f"Sin regresiones contra {args.comparar} ({base['meta'].get('commit')})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Barrido de DPI para el OCR de recibos CFE.
+
+Para cada PDF de muestra y cada DPI mide el render, el OCR y cuántos campos
+coinciden con la referencia a 300 DPI. Recomienda el DPI más bajo que
+conserva todos los campos clave, que es el valor a poner en OCR_DPI.
+
+También compara el render anterior (todas las páginas, a color) contra el
+actual (solo las páginas que pide el extractor, en grises).
+
+Uso:
+    python benchmarks/bench_dpi.py [carpeta_pdfs ...] [--dpis 150,200,250,300] [--solo-render]
+"""
+import os
+import sys
+import time
+import glob
+import argparse
+import contextlib
+import io
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import Ing_Soft_P2
+from Ing_Soft_P2 import mejorar_imagen_para_ocr, extraer_datos_cfe_ocr, obtener_lector_ocr, PAGINAS_CFE_OCR
+from documento import rasterizar_paginas, POPPLER_PATH
+
+CAMPOS_CLAVE = ['titular', 'total', 'no_servicio', 'periodo', 'consumo', 'cuenta', 'no_medidor', 'tarifa']
+DPI_REFERENCIA = 300
+
+def bytes_imagenes(imagenes):
+    """Bytes de píxeles de imágenes PIL (render anterior) o arreglos numpy"""
+    return sum(img.nbytes if hasattr(img, "nbytes") else img.width * img.height * len(img.getbands())
+               for img in imagenes)
+
+def render_anterior(pdf_path):
+    """Render como lo hacía extraer_info_cfe_con_ocr antes: todo el PDF a color"""
+    from pdf2image import convert_from_path
+    return convert_from_path(pdf_path, dpi=DPI_REFERENCIA, poppler_path=POPPLER_PATH)
+
+def ocr_campos(imagen, nombre):
+    lector = obtener_lector_ocr()
+    t0 = time.perf_counter()
+    resultado = lector.readtext(mejorar_imagen_para_ocr(imagen), detail=1, paragraph=False)
+    t_ocr = time.perf_counter() - t0
+    with contextlib.redirect_stdout(io.StringIO()):
+        datos = extraer_datos_cfe_ocr(resultado, nombre)
+    return t_ocr, {campo: datos.get(campo) for campo in CAMPOS_CLAVE}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpetas", nargs="*", default=[os.path.join(REPO_DIR, "test1"),
+                                                         os.path.join(REPO_DIR, "Recibos", "CFE")])
+    parser.add_argument("--dpis", default="150,200,250,300")
+    parser.add_argument("--solo-render", action="store_true", help="no ejecutar OCR")
+    args = parser.parse_args()
+
+    dpis = sorted({int(d) for d in args.dpis.split(',')} | {DPI_REFERENCIA})
+    pdfs = sorted(p for carpeta in args.carpetas for p in glob.glob(os.path.join(carpeta, "*.pdf")))
+    con_ocr = not args.solo_render and Ing_Soft_P2.OCR_AVAILABLE
+    if not pdfs:
+        print("No se encontraron PDFs")
+        return
+
+    # Render anterior vs actual
+    t_antes = t_despues = mem_antes = mem_despues = 0.0
+    for pdf in pdfs:
+        t0 = time.perf_counter()
+        mem_antes += bytes_imagenes(render_anterior(pdf))
+        t_antes += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        mem_despues += bytes_imagenes(rasterizar_paginas(pdf, PAGINAS_CFE_OCR, dpi=DPI_REFERENCIA))
+        t_despues += time.perf_counter() - t0
+
+    n = len(pdfs)
+    print(f"Render a {DPI_REFERENCIA} DPI sobre {n} PDFs (promedio por recibo)")
+    print(f"  antes   (todas las páginas, RGB): {t_antes / n * 1000:8.1f} ms  {mem_antes / n / 2**20:7.1f} MB")
+    print(f"  después (páginas {PAGINAS_CFE_OCR}, grises): {t_despues / n * 1000:8.1f} ms  {mem_despues / n / 2**20:7.1f} MB")
+    print()
+
+    # Barrido de DPI
+    referencia = {}
+    filas = []
+    for dpi in sorted(dpis, reverse=True):
+        t_render = t_ocr = memoria = 0.0
+        coincidencias = total_campos = 0
+        for pdf in pdfs:
+            t0 = time.perf_counter()
+            imagenes = rasterizar_paginas(pdf, PAGINAS_CFE_OCR, dpi=dpi)
+            t_render += time.perf_counter() - t0
+            memoria += bytes_imagenes(imagenes)
+
+            if con_ocr:
+                segundos, campos = ocr_campos(imagenes[0], os.path.basename(pdf))
+                t_ocr += segundos
+                if dpi == DPI_REFERENCIA:
+                    referencia[pdf] = campos
+                for campo, valor in referencia[pdf].items():
+                    total_campos += 1
+                    coincidencias += campos[campo] == valor
+
+        precision = coincidencias / total_campos if total_campos else None
+        filas.append((dpi, t_render / n, t_ocr / n, memoria / n, precision))
+
+    print(f"{'DPI':>5} {'render ms':>10} {'OCR ms':>10} {'MB':>8} {'coinciden':>10}")
+    for dpi, render, ocr, memoria, precision in sorted(filas):
+        texto_precision = f"{precision * 100:9.1f}%" if precision is not None else "       n/a"
+        print(f"{dpi:5d} {render * 1000:10.1f} {ocr * 1000:10.1f} {memoria / 2**20:8.1f} {texto_precision}")
+
+    if con_ocr:
+        aprobados = [dpi for dpi, _, _, _, precision in filas if precision == 1.0]
+        print(f"\nDPI más bajo sin perder campos: {min(aprobados)} (exportar OCR_DPI={min(aprobados)})")
+    else:
+        print("\nOCR no disponible o --solo-render: solo se midió el render")
+
+if __name__ == "__main__":
+    main()
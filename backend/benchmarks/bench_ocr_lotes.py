@@ -0,0 +1,84 @@
+"""
+Throughput del OCR por lotes (ocr_lotes.py) en CPU.
+
+Rasteriza una vez la página CFE de cada PDF de muestra y la pasa por el
+AgrupadorOCR con distintos tamaños de lote, enviando todas las imágenes a la
+vez desde hilos (como el motor de lotes). Reporta imágenes por segundo y el
+texto de cada imagen se compara contra el de readtext individual.
+
+Uso:
+    python benchmarks/bench_ocr_lotes.py [carpeta_pdfs ...] [--tamanos 1,2,4,8] [--reconocedor 8] [--hilos N]
+"""
+import os
+import sys
+import time
+import glob
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import Ing_Soft_P2
+from Ing_Soft_P2 import mejorar_imagen_para_ocr, obtener_lector_ocr, PAGINAS_CFE_OCR, OCR_RECORTE_CFE
+from documento import rasterizar_paginas, OCR_DPI
+from ocr_lotes import AgrupadorOCR
+
+def preparar_imagenes(pdfs):
+    imagenes = []
+    for pdf in pdfs:
+        paginas = rasterizar_paginas(pdf, PAGINAS_CFE_OCR, dpi=OCR_DPI, recorte=OCR_RECORTE_CFE)
+        if paginas:
+            imagenes.append(mejorar_imagen_para_ocr(paginas[0]))
+    return imagenes
+
+def textos(resultado):
+    return [linea[1] for linea in resultado]
+
+def medir(imagenes, tamano, reconocedor, hilos):
+    agrupador = AgrupadorOCR(obtener_lector_ocr, tamano, espera=0.5, batch_reconocedor=reconocedor)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(agrupador.leer, imagenes))
+    return time.perf_counter() - t0, resultados, agrupador.lotes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpetas", nargs="*", default=[os.path.join(REPO_DIR, "test1"),
+                                                         os.path.join(REPO_DIR, "Recibos", "CFE")])
+    parser.add_argument("--tamanos", default="1,2,4,8")
+    parser.add_argument("--reconocedor", type=int, default=Ing_Soft_P2.OCR_LOTE_RECONOCEDOR,
+                        help="recortes por lote del reconocedor")
+    parser.add_argument("--hilos", type=int, default=0, help="hilos que piden OCR (0 = uno por imagen)")
+    args = parser.parse_args()
+
+    if not Ing_Soft_P2.OCR_AVAILABLE or not Ing_Soft_P2.precargar_ocr():
+        print("EasyOCR no está disponible: no hay nada que medir")
+        return
+
+    pdfs = sorted(p for carpeta in args.carpetas for p in glob.glob(os.path.join(carpeta, "*.pdf")))
+    imagenes = preparar_imagenes(pdfs)
+    if not imagenes:
+        print("No se encontraron PDFs")
+        return
+    hilos = args.hilos or len(imagenes)
+
+    # Referencia: una llamada a readtext por imagen, como antes del agrupador
+    lector = obtener_lector_ocr()
+    t0 = time.perf_counter()
+    referencia = [textos(lector.readtext(img, detail=1, paragraph=False)) for img in imagenes]
+    t_ref = time.perf_counter() - t0
+    n = len(imagenes)
+    print(f"{n} imágenes, {os.cpu_count()} CPUs")
+    print(f"  readtext uno por uno          {t_ref:7.2f} s  {n / t_ref:6.2f} img/s")
+
+    for tamano in sorted({int(t) for t in args.tamanos.split(',')}):
+        segundos, resultados, lotes = medir(imagenes, tamano, args.reconocedor, hilos)
+        distintos = sum(textos(r) != ref for r, ref in zip(resultados, referencia))
+        print(f"  lote {tamano:2d} (reconocedor {args.reconocedor:2d})  {segundos:7.2f} s  "
+              f"{n / segundos:6.2f} img/s  x{t_ref / segundos:4.2f}  "
+              f"{lotes} lotes  {distintos} textos distintos")
+
+if __name__ == "__main__":
+    main()
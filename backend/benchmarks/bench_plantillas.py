@@ -0,0 +1,91 @@
+"""
+OCR por regiones (plantillas_cfe.py) contra OCR de página completa.
+
+Para cada PDF CFE de muestra: qué plantilla se detecta, cuánto tarda la
+detección y qué parte de la página se manda al OCR. Con EasyOCR disponible
+mide además el tiempo de OCR de ambas rutas y compara los campos clave con
+los de la capa de texto (cuando el PDF la tiene).
+
+Uso:
+    python benchmarks/bench_plantillas.py [carpeta_pdfs ...] [--sin-ocr]
+"""
+import os
+import sys
+import time
+import glob
+import argparse
+import contextlib
+import io
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import Ing_Soft_P2
+from Ing_Soft_P2 import (mejorar_imagen_para_ocr, extraer_datos_cfe_ocr, extraer_cfe_por_regiones,
+                         extraer_info_cfe_pypdf2, obtener_agrupador_ocr, es_no_extraido, PAGINAS_CFE_OCR)
+from documento import DocumentoPDF, OCR_DPI
+from plantillas_cfe import detectar_plantilla
+
+CAMPOS_CLAVE = ['titular', 'total', 'no_servicio', 'periodo', 'consumo', 'tarifa', 'no_medidor']
+
+def ocr_pagina(imagen, nombre):
+    resultado = obtener_agrupador_ocr().leer(mejorar_imagen_para_ocr(imagen))
+    return extraer_datos_cfe_ocr(resultado, nombre)
+
+def medir(funcion, *args):
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = funcion(*args)
+    return time.perf_counter() - t0, resultado
+
+def normalizar(campo, valor):
+    # El OCR lee el importe grande, sin centavos
+    valor = str(valor)
+    return valor.replace(',', '').split('.')[0] if campo == 'total' else valor
+
+def aciertos(datos, referencia):
+    campos = [c for c in CAMPOS_CLAVE if not es_no_extraido(referencia.get(c))]
+    iguales = sum(normalizar(c, datos.get(c)) == normalizar(c, referencia.get(c)) for c in campos)
+    return f"{iguales}/{len(campos)}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpetas", nargs="*", default=[os.path.join(REPO_DIR, "test1"),
+                                                         os.path.join(REPO_DIR, "Recibos", "CFE")])
+    parser.add_argument("--sin-ocr", action="store_true", help="solo detección y píxeles")
+    args = parser.parse_args()
+
+    pdfs = sorted(p for carpeta in args.carpetas for p in glob.glob(os.path.join(carpeta, "*.pdf")))
+    con_ocr = not args.sin_ocr and Ing_Soft_P2.precargar_ocr()
+    if not pdfs:
+        print("No se encontraron PDFs")
+        return
+
+    t_pagina = t_regiones = 0.0
+    for pdf in pdfs:
+        doc = DocumentoPDF.desde_ruta(pdf)
+        pagina = doc.imagenes(PAGINAS_CFE_OCR, dpi=OCR_DPI)[0]
+        t0 = time.perf_counter()
+        plantilla = detectar_plantilla(pagina)
+        t_deteccion = time.perf_counter() - t0
+
+        linea = f"{doc.nombre[:34]:34} {plantilla.nombre if plantilla else '-':10} {t_deteccion * 1000:6.1f} ms"
+        if plantilla:
+            linea += f"  píxeles {plantilla.fraccion_pixeles():4.0%}"
+        if con_ocr and plantilla:
+            _, referencia = medir(extraer_info_cfe_pypdf2, doc)
+            t_p, datos_pagina = medir(ocr_pagina, pagina, doc.nombre)
+            t_r, (datos_regiones, _) = medir(extraer_cfe_por_regiones, pagina, plantilla, doc.nombre)
+            t_pagina += t_p
+            t_regiones += t_r
+            linea += (f"  página {t_p:6.2f} s ({aciertos(datos_pagina, referencia)})"
+                      f"  regiones {t_r:6.2f} s ({aciertos(datos_regiones, referencia)})")
+        print(linea)
+
+    if t_regiones:
+        print(f"\nOCR total: página completa {t_pagina:.1f} s, regiones {t_regiones:.1f} s "
+              f"(x{t_pagina / t_regiones:.2f})")
+
+if __name__ == "__main__":
+    main()
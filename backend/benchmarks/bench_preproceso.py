@@ -0,0 +1,151 @@
+"""
+Preprocesamiento para OCR: cadena PIL anterior contra preprocesamiento.py.
+
+Por cada página a 300 DPI de los PDFs de muestra mide tiempo y memoria pico
+(RSS por encima de la página ya renderizada) de:
+- anterior: ImageEnhance.Contrast(2.0) + ImageFilter.SHARPEN + np.array
+- cada combinación de etapas pedida con --etapas (por defecto la configurada)
+Indica si el resultado es idéntico al anterior y, con EasyOCR disponible,
+cuántos campos clave coinciden con la capa de texto del PDF.
+
+Uso:
+    python benchmarks/bench_preproceso.py [carpeta_pdfs ...] [--etapas contraste,nitidez --etapas enderezar,contraste,nitidez,umbral] [--sin-ocr]
+"""
+import os
+import sys
+import time
+import glob
+import argparse
+import contextlib
+import io
+import statistics
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import numpy as np
+import Ing_Soft_P2
+from Ing_Soft_P2 import extraer_datos_cfe_ocr, extraer_info_cfe_pypdf2, obtener_lector_ocr, es_no_extraido, PAGINAS_CFE_OCR
+from documento import DocumentoPDF
+from preprocesamiento import preprocesar, _leer_etapas, OCR_PREPROCESO
+
+CAMPOS_CLAVE = ['titular', 'total', 'no_servicio', 'periodo', 'consumo', 'cuenta', 'no_medidor', 'tarifa']
+DPI = 300
+
+def preproceso_anterior(imagen_pil):
+    """mejorar_imagen_para_ocr antes de preprocesamiento.py, más la copia a numpy"""
+    from PIL import Image, ImageEnhance, ImageFilter
+    if isinstance(imagen_pil, np.ndarray):
+        imagen_pil = Image.fromarray(imagen_pil)
+    if imagen_pil.mode != 'L':
+        imagen_pil = imagen_pil.convert('L')
+    imagen_pil = ImageEnhance.Contrast(imagen_pil).enhance(2.0)
+    imagen_pil = imagen_pil.filter(ImageFilter.SHARPEN)
+    return np.array(imagen_pil)
+
+def _rss_pico_kb():
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith("VmHWM"):
+                return int(linea.split()[1])
+    return None
+
+def _reiniciar_pico():
+    """Reinicia VmHWM (Linux); si no se puede se usa tracemalloc (solo ve numpy)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _medir_en_proceso(etapas, pagina):
+    """Se ejecuta en un proceso nuevo: el pico no se confunde con memoria ya liberada"""
+    funcion = preproceso_anterior if etapas is None else (lambda imagen: preprocesar(imagen, etapas))
+    if _reiniciar_pico():
+        base = _rss_pico_kb()
+        funcion(pagina)
+        return (_rss_pico_kb() - base) / 1024
+    tracemalloc.start()
+    funcion(pagina)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 2**20
+
+def memoria_pico(etapas, pagina):
+    """MB de pico por encima de la página ya renderizada (etapas=None: cadena anterior)"""
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+        return pool.submit(_medir_en_proceso, etapas, pagina).result()
+
+def tiempo(funcion, imagen, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(imagen)
+        tiempos.append(time.perf_counter() - t0)
+    return statistics.median(tiempos)
+
+def campos_ocr(arreglo, nombre):
+    resultado = obtener_lector_ocr().readtext(arreglo, detail=1, paragraph=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        datos = extraer_datos_cfe_ocr(resultado, nombre)
+    return datos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpetas", nargs="*", default=[os.path.join(REPO_DIR, "test1"),
+                                                         os.path.join(REPO_DIR, "Recibos", "CFE")])
+    parser.add_argument("--etapas", action="append", help="combinación de etapas (se puede repetir)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--sin-ocr", action="store_true", help="no medir precisión con OCR")
+    args = parser.parse_args()
+
+    # nombre -> etapas (None = cadena PIL anterior)
+    variantes = {"anterior": None}
+    for etapas in (args.etapas or [",".join(OCR_PREPROCESO)]):
+        etapas = _leer_etapas(etapas)
+        variantes["+".join(etapas) or "solo gris"] = etapas
+
+    pdfs = sorted(p for carpeta in args.carpetas for p in glob.glob(os.path.join(carpeta, "*.pdf")))
+    con_ocr = not args.sin_ocr and Ing_Soft_P2.precargar_ocr()
+    if not pdfs:
+        print("No se encontraron PDFs")
+        return
+
+    acumulado = {nombre: {"ms": [], "mb": [], "identicas": 0, "aciertos": 0, "campos": 0} for nombre in variantes}
+    for pdf in pdfs:
+        doc = DocumentoPDF.desde_ruta(pdf)
+        pagina = doc.imagenes(PAGINAS_CFE_OCR, dpi=DPI)[0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            referencia = extraer_info_cfe_pypdf2(doc)
+        campos = [c for c in CAMPOS_CLAVE if not es_no_extraido(referencia.get(c))]
+
+        salida_anterior = preproceso_anterior(pagina)
+        for nombre, etapas in variantes.items():
+            funcion = preproceso_anterior if etapas is None else (lambda imagen: preprocesar(imagen, etapas))
+            salida = funcion(pagina)
+            stats = acumulado[nombre]
+            stats["ms"].append(tiempo(funcion, pagina, args.repeticiones) * 1000)
+            stats["mb"].append(memoria_pico(etapas, pagina))
+            stats["identicas"] += int(salida.shape == salida_anterior.shape and (salida == salida_anterior).all())
+            if con_ocr and campos:
+                datos = campos_ocr(salida, doc.nombre)
+                stats["aciertos"] += sum(str(datos.get(c)) == str(referencia.get(c)) for c in campos)
+                stats["campos"] += len(campos)
+
+    n = len(pdfs)
+    print(f"{n} páginas a {DPI} DPI (mediana por página)")
+    for nombre, stats in acumulado.items():
+        linea = (f"  {nombre:40} {statistics.median(stats['ms']):7.1f} ms  "
+                 f"pico {statistics.median(stats['mb']):6.1f} MB  idénticas {stats['identicas']}/{n}")
+        if stats["campos"]:
+            linea += f"  campos OCR {stats['aciertos']}/{stats['campos']}"
+        print(linea)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark de Recibo (recibo.py) frente a los dicts de texto de los extractores.
+
+Con los resultados de extraer_datos_cfe_del_texto sobre los textos guardados
+en uploads/ y test1/ (repetidos hasta --recibos), mide:
+- Memoria (tracemalloc) de tener todos los resultados en memoria, como los
+  guarda un trabajo: dicts de texto contra Recibo.
+- Agregar total y consumo por servicio: convirtiendo los textos en cada
+  pasada contra sumar los valores ya convertidos.
+- Serializar a JSON: dict contra Recibo.a_dict().
+
+Cada resultado se copia con json (textos nuevos, como llegan de un worker)
+para no compartir cadenas entre copias.
+
+Uso:
+    python benchmarks/bench_recibos.py [--recibos 20000] [--repeticiones 5]
+"""
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import Ing_Soft_P2
+from procesamiento import REQUIRED_FIELDS
+from recibo import Recibo, FALTANTE
+
+def numero(valor):
+    """Conversión que hacía cada consumidor sobre el texto"""
+    try:
+        return float(str(valor).replace(',', '').replace('$', '').strip())
+    except ValueError:
+        return None
+
+def resultados_base():
+    patrones = [
+        os.path.join(BACKEND_DIR, "uploads", "*.txt"),
+        os.path.join(REPO_DIR, "test1", "*_texto.txt"),
+        os.path.join(REPO_DIR, "test1", "*_debug*.txt"),
+    ]
+    rutas = sorted({r for patron in patrones for r in glob.glob(patron)})
+    resultados = []
+    for ruta in rutas:
+        nombre = os.path.basename(ruta)
+        datos = Ing_Soft_P2.extraer_datos_cfe_del_texto(open(ruta, encoding="utf-8", errors="replace").read(), nombre)
+        for campo in REQUIRED_FIELDS:
+            datos.setdefault(campo, FALTANTE)
+        datos["filename"] = nombre
+        resultados.append(json.dumps(datos, ensure_ascii=False))
+    return resultados
+
+def memoria(construir):
+    tracemalloc.start()
+    objetos = construir()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objetos, actual
+
+def mejor(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos)
+
+def agregar_dicts(dicts):
+    totales = {}
+    for d in dicts:
+        fila = totales.setdefault(d["service_type"], [0.0, 0.0])
+        fila[0] += numero(d["total"]) or 0.0
+        consumo = d.get("consumo") or d.get("consumo_kwh") or d.get("consumo_m3")
+        fila[1] += numero(consumo) or 0.0
+    return totales
+
+def agregar_recibos(recibos):
+    totales = {}
+    for r in recibos:
+        fila = totales.setdefault(r.service_type, [0, 0])
+        if r.total is not None and not isinstance(r.total, str):
+            fila[0] += r.total
+        consumo = r.consumo_total
+        if consumo is not None and not isinstance(consumo, str):
+            fila[1] += consumo
+    return totales
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recibos", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    base = resultados_base()
+    if not base:
+        print("Sin textos de muestra")
+        return
+    textos = [base[i % len(base)] for i in range(args.recibos)]
+
+    dicts, mem_dicts = memoria(lambda: [json.loads(t) for t in textos])
+    recibos, mem_recibos = memoria(lambda: [Recibo.desde_datos(json.loads(t)) for t in textos])
+    # Lo que queda en memoria por recibo: el Recibo ya sin el dict del que salió
+    print(f"Recibos: {len(textos)} ({len(base)} resultados distintos)")
+    print(f"Memoria dicts:   {mem_dicts / 1e6:8.2f} MB  ({mem_dicts / len(textos):6.0f} B/recibo)")
+    print(f"Memoria Recibo:  {mem_recibos / 1e6:8.2f} MB  ({mem_recibos / len(textos):6.0f} B/recibo)  "
+          f"{100 * (1 - mem_recibos / mem_dicts):.0f}% menos")
+
+    t_conversion = mejor(lambda: [Recibo.desde_datos(d) for d in dicts], args.repeticiones)
+    t_dicts = mejor(lambda: agregar_dicts(dicts), args.repeticiones)
+    t_recibos = mejor(lambda: agregar_recibos(recibos), args.repeticiones)
+    print(f"Conversión a Recibo (una vez):  {t_conversion * 1e6 / len(textos):6.2f} us/recibo")
+    print(f"Agregación sobre dicts:         {t_dicts * 1e6 / len(textos):6.2f} us/recibo")
+    print(f"Agregación sobre Recibo:        {t_recibos * 1e6 / len(textos):6.2f} us/recibo  "
+          f"({t_dicts / t_recibos:.1f}x)")
+
+    t_json_dicts = mejor(lambda: [json.dumps(d, ensure_ascii=False) for d in dicts], args.repeticiones)
+    t_json_recibos = mejor(lambda: [json.dumps(r.a_dict(), ensure_ascii=False) for r in recibos], args.repeticiones)
+    print(f"JSON desde dicts:               {t_json_dicts * 1e6 / len(textos):6.2f} us/recibo")
+    print(f"JSON desde Recibo.a_dict():     {t_json_recibos * 1e6 / len(textos):6.2f} us/recibo")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Latencia del render de páginas para OCR por motor (documento.py).
+
+Para cada PDF de muestra renderiza las páginas que usa el OCR de CFE con
+cada renderizador disponible y reporta la mediana por página:
+- pdfium: pypdfium2 dentro del proceso, directo a un arreglo numpy.
+- poppler: pdftoppm por pdf2image (un subproceso y un PPM por llamada),
+  como se renderizaba antes. Se omite si no hay poppler instalado
+  (POPPLER_PATH o pdftoppm en el PATH).
+
+Con los dos motores compara además los píxeles: diferencia media por
+píxel y proporción de píxeles que difieren en más de 32 niveles.
+
+Uso:
+    python benchmarks/bench_render.py [carpeta_pdfs ...] [--dpis 200,300] [--repeticiones 3]
+"""
+import os
+import sys
+import time
+import glob
+import shutil
+import argparse
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.append(BACKEND_DIR)
+
+import numpy as np
+from Ing_Soft_P2 import PAGINAS_CFE_OCR
+from documento import DocumentoPDF, RENDERIZADORES, POPPLER_PATH, rasterizar_paginas
+
+def disponibles():
+    """Renderizadores que se pueden usar en esta máquina"""
+    motores = {}
+    try:
+        motores["pdfium"] = RENDERIZADORES["pdfium"]()
+    except ImportError:
+        print("pdfium: pypdfium2 no está instalado")
+    if shutil.which("pdftoppm", path=POPPLER_PATH):
+        motores["poppler"] = RENDERIZADORES["poppler"]()
+    else:
+        print("poppler: pdftoppm no encontrado (POPPLER_PATH o PATH), se omite")
+    return motores
+
+def medir(doc, dpi, renderizador, repeticiones):
+    """(segundos por página, páginas) del mejor de `repeticiones` renders"""
+    mejor = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        paginas = rasterizar_paginas(doc, PAGINAS_CFE_OCR, dpi=dpi, renderizador=renderizador)
+        transcurrido = time.perf_counter() - t0
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor / max(1, len(paginas)), paginas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("carpetas", nargs="*", default=[os.path.join(REPO_DIR, "test1"),
+                                                         os.path.join(REPO_DIR, "Recibos", "CFE")])
+    parser.add_argument("--dpis", default="200,300")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    motores = disponibles()
+    pdfs = sorted(p for carpeta in args.carpetas for p in glob.glob(os.path.join(carpeta, "*.pdf")))
+    if not pdfs or not motores:
+        print("No hay PDFs o renderizadores para medir")
+        return
+    dpis = sorted({int(d) for d in args.dpis.split(',')})
+
+    print(f"{len(pdfs)} PDFs, páginas {PAGINAS_CFE_OCR} (mediana por página, mejor de {args.repeticiones})")
+    for dpi in dpis:
+        tiempos = {nombre: [] for nombre in motores}
+        diferencias, distintos = [], []
+        for pdf in pdfs:
+            doc = DocumentoPDF.desde_ruta(pdf)
+            renders = {}
+            for nombre, renderizador in motores.items():
+                segundos, renders[nombre] = medir(doc, dpi, renderizador, args.repeticiones)
+                tiempos[nombre].append(segundos)
+            if len(renders) == 2:
+                for a, b in zip(renders["pdfium"], renders["poppler"]):
+                    if a.shape != b.shape:
+                        continue
+                    delta = np.abs(a.astype(np.int16) - b.astype(np.int16))
+                    diferencias.append(float(delta.mean()))
+                    distintos.append(float((delta > 32).mean()))
+
+        linea = f"{dpi:4d} DPI:"
+        for nombre, valores in tiempos.items():
+            linea += f"  {nombre} {statistics.median(valores) * 1000:7.1f} ms"
+        if len(tiempos) == 2:
+            linea += f"  (x{statistics.median(tiempos['poppler']) / statistics.median(tiempos['pdfium']):.1f})"
+        print(linea)
+        if diferencias:
+            print(f"          píxeles: diferencia media {statistics.mean(diferencias):.2f} niveles, "
+                  f"{statistics.mean(distintos):.2%} difieren en más de 32")
+
+if __name__ == "__main__":
+    main()
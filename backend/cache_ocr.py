@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import zlib
+import logging
+import sqlite3
+import hashlib
+import threading
+
+log = logging.getLogger(__name__)
+
+# ================================
+# CACHE DE LECTURAS OCR
+# ================================
+# Guarda la salida cruda de readtext (cajas, texto y confianza) por hash de
+# la imagen que se mandó al OCR, y por documento qué imágenes se leyeron
+# (página completa o regiones de una plantilla). Con eso un cambio en los
+# patrones de campos se aplica a recibos ya leídos sin rasterizar ni pasar
+# por EasyOCR: ver `python ingesta.py --reextraer`.
+#
+# A diferencia de la cache de resultados no se invalida con
+# VERSION_EXTRACTOR (la lectura no depende de los patrones) ni expulsa
+# entradas: es el archivo de lecturas del histórico (unos pocos KB por recibo).
+CACHE_OCR = os.environ.get("CACHE_OCR", "1") != "0"
+CACHE_OCR_RUTA = os.environ.get("CACHE_OCR_RUTA", "cache_ocr.db")
+
+# Subirla si cambia cómo se arman las imágenes sin que cambie su
+# configuración (cajas de las plantillas, etapas de preproceso...)
+VERSION_LECTURA = "1"
+
+def _compactar(resultado):
+    """readtext -> [[[x, y] x4], texto, confianza] con enteros y 3 decimales"""
+    return [
+        [[[int(round(float(x))), int(round(float(y)))] for x, y in bbox], texto, round(float(confianza), 3)]
+        for bbox, texto, confianza in resultado
+    ]
+
+class CacheOCR:
+    """Lecturas de EasyOCR por imagen y lecturas de cada documento, en SQLite.
+
+    Las lecturas se guardan como JSON comprimido con zlib. Como la cache de
+    resultados, cada operación abre su propia conexión (timeout=30, WAL)
+    para convivir con los workers del motor de lotes. Si SQLite falla, se
+    registra y se toma como un miss o una escritura omitida: el OCR sigue.
+    """
+
+    def __init__(self, ruta=CACHE_OCR_RUTA):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.ruta = ruta
+
+        conexion = self._conectar()
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS imagenes (
+                    clave TEXT PRIMARY KEY,
+                    lectura BLOB NOT NULL,
+                    creado REAL NOT NULL
+                )
+            """)
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS documentos (
+                    clave TEXT PRIMARY KEY,
+                    lectura TEXT NOT NULL,
+                    creado REAL NOT NULL
+                )
+            """)
+            conexion.commit()
+        finally:
+            conexion.close()
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def _leer(self, consulta, clave):
+        """Primera fila de la consulta, o None (también si SQLite falla)"""
+        try:
+            conexion = self._conectar()
+            try:
+                return conexion.execute(consulta, (clave,)).fetchone()
+            finally:
+                conexion.close()
+        except sqlite3.Error as e:
+            log.warning("No se pudo leer la cache OCR: %s", e)
+            return None
+
+    def _escribir(self, tabla, clave, lectura):
+        try:
+            conexion = self._conectar()
+            try:
+                conexion.execute(
+                    f"INSERT OR REPLACE INTO {tabla} (clave, lectura, creado) VALUES (?, ?, ?)",
+                    (clave, lectura, time.time())
+                )
+                conexion.commit()
+            finally:
+                conexion.close()
+        except sqlite3.Error as e:
+            # Sin la lectura guardada solo se repite el OCR la próxima vez
+            log.error("No se pudo guardar en la cache OCR: %s", e)
+
+    @staticmethod
+    def clave_imagen(imagen, idiomas=()):
+        """Clave de la imagen (numpy) que recibe el OCR: su contenido, forma e idiomas"""
+        h = hashlib.sha256(imagen.tobytes())
+        h.update(f"{imagen.shape}{imagen.dtype}{','.join(idiomas)}".encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def clave_documento(contenido, configuracion):
+        """Clave de un PDF leído con una configuración de OCR (dpi, recorte, preproceso...)"""
+        return f"{hashlib.sha256(contenido).hexdigest()}:{configuracion}:{VERSION_LECTURA}"
+
+    def obtener_imagen(self, clave):
+        """Lista de (bbox, texto, confianza) como readtext, o None"""
+        fila = self._leer("SELECT lectura FROM imagenes WHERE clave = ?", clave)
+        with self._lock:
+            if fila is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [tuple(caja) for caja in json.loads(zlib.decompress(fila[0]))]
+
+    def guardar_imagen(self, clave, resultado):
+        lectura = zlib.compress(json.dumps(_compactar(resultado), ensure_ascii=False).encode("utf-8"))
+        self._escribir("imagenes", clave, lectura)
+
+    def obtener_documento(self, clave):
+        """{"plantilla": nombre o None, "regiones": {región: clave}, "pagina": clave o None}"""
+        fila = self._leer("SELECT lectura FROM documentos WHERE clave = ?", clave)
+        return json.loads(fila[0]) if fila else None
+
+    def guardar_documento(self, clave, lectura):
+        self._escribir("documentos", clave, json.dumps(lectura))
+
+    def estadisticas(self):
+        imagenes = documentos = bytes_lecturas = 0
+        try:
+            conexion = self._conectar()
+            try:
+                imagenes, bytes_lecturas = conexion.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(lectura)), 0) FROM imagenes"
+                ).fetchone()
+                documentos = conexion.execute("SELECT COUNT(*) FROM documentos").fetchone()[0]
+            finally:
+                conexion.close()
+        except sqlite3.Error as e:
+            log.warning("No se pudieron leer las estadísticas de la cache OCR: %s", e)
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "imagenes": imagenes,
+                "documentos": documentos,
+                "bytes_lecturas": bytes_lecturas,
+            }
+
+_cache = None
+_cache_pid = None       # cada proceso hijo lleva sus propios contadores
+_cache_lock = threading.Lock()
+
+def obtener_cache_ocr():
+    """Cache de lecturas OCR del proceso, o None si CACHE_OCR=0"""
+    global _cache, _cache_pid
+    if not CACHE_OCR:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            _cache = CacheOCR()
+            _cache_pid = os.getpid()
+        return _cache
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from Ing_Soft_P2 import VERSION_EXTRACTOR
+
+log = logging.getLogger(__name__)
+
+# Configuración de la cache
+CACHE_RUTA = os.environ.get("CACHE_RUTA", "cache_resultados.db")
+CACHE_MAX_MEMORIA = int(os.environ.get("CACHE_MAX_MEMORIA", "512"))     # entradas en RAM
+CACHE_MAX_MB = float(os.environ.get("CACHE_MAX_MB", "64"))              # tamaño en disco
+
+class CacheResultados:
+    """Cache de resultados de extracción por contenido del PDF.
+
+    La clave es el SHA-256 de los bytes del PDF más la versión del extractor,
+    así un cambio de lógica invalida todo sin borrar archivos. Tiene dos
+    niveles: un LRU en memoria y una tabla SQLite acotada por tamaño que
+    expulsa primero las entradas usadas hace más tiempo.
+
+    Como el almacén, cada operación abre su propia conexión (timeout=30,
+    WAL) para convivir con otros procesos del servidor. La cache es una
+    optimización: si SQLite falla, se registra y la extracción sigue.
+    """
+
+    def __init__(self, ruta=CACHE_RUTA, max_memoria=CACHE_MAX_MEMORIA, max_mb=CACHE_MAX_MB):
+        self.max_memoria = max_memoria
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self.ruta = ruta
+
+        conexion = self._conectar()
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS resultados (
+                    clave TEXT PRIMARY KEY,
+                    datos TEXT NOT NULL,
+                    tamano INTEGER NOT NULL,
+                    accedido REAL NOT NULL
+                )
+            """)
+            conexion.execute("CREATE INDEX IF NOT EXISTS idx_resultados_accedido ON resultados(accedido)")
+            conexion.commit()
+            self._bytes_disco = conexion.execute(
+                "SELECT COALESCE(SUM(tamano), 0) FROM resultados"
+            ).fetchone()[0]
+        finally:
+            conexion.close()
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    @staticmethod
+    def clave(contenido):
+        """Clave de cache para los bytes de un PDF"""
+        return f"{hashlib.sha256(contenido).hexdigest()}:{VERSION_EXTRACTOR}"
+
+    @staticmethod
+    def huella(clave):
+        """SHA-256 del contenido a partir de su clave (sin la versión del extractor)"""
+        return clave.partition(':')[0]
+
+    def _recordar(self, clave, serializado):
+        self._memoria[clave] = serializado
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def obtener(self, clave):
+        """Devuelve una copia del resultado cacheado o None"""
+        with self._lock:
+            serializado = self._memoria.get(clave)
+            if serializado is not None:
+                self._memoria.move_to_end(clave)
+                self.hits_memoria += 1
+                return json.loads(serializado)
+
+            try:
+                conexion = self._conectar()
+                try:
+                    fila = conexion.execute(
+                        "SELECT datos FROM resultados WHERE clave = ?", (clave,)
+                    ).fetchone()
+                    if fila is not None:
+                        conexion.execute(
+                            "UPDATE resultados SET accedido = ? WHERE clave = ?", (time.time(), clave)
+                        )
+                        conexion.commit()
+                finally:
+                    conexion.close()
+            except sqlite3.Error as e:
+                log.warning("No se pudo leer la cache de resultados: %s", e)
+                fila = None
+            if fila is None:
+                self.misses += 1
+                return None
+
+            self._recordar(clave, fila[0])
+            self.hits_disco += 1
+            return json.loads(fila[0])
+
+    def guardar(self, clave, datos):
+        """Guarda un resultado; los resultados con error no se cachean"""
+        if 'error' in datos:
+            return
+
+        serializado = json.dumps(datos, ensure_ascii=False)
+        tamano = len(serializado.encode('utf-8'))
+
+        with self._lock:
+            self._recordar(clave, serializado)
+            try:
+                conexion = self._conectar()
+                try:
+                    anterior = conexion.execute(
+                        "SELECT tamano FROM resultados WHERE clave = ?", (clave,)
+                    ).fetchone()
+                    conexion.execute(
+                        "INSERT OR REPLACE INTO resultados (clave, datos, tamano, accedido) VALUES (?, ?, ?, ?)",
+                        (clave, serializado, tamano, time.time())
+                    )
+                    bytes_disco = self._bytes_disco + tamano - (anterior[0] if anterior else 0)
+                    bytes_disco = self._expulsar(conexion, bytes_disco)
+                    conexion.commit()
+                    self._bytes_disco = bytes_disco
+                finally:
+                    conexion.close()
+            except sqlite3.Error as e:
+                # Queda en memoria; sin disco solo se pierde el hit tras reiniciar
+                log.error("No se pudo guardar en la cache de resultados: %s", e)
+
+    def _expulsar(self, conexion, bytes_disco):
+        """Borra las entradas menos usadas hasta quedar bajo el límite de disco; devuelve los bytes que quedan"""
+        while bytes_disco > self.max_bytes:
+            filas = conexion.execute(
+                "SELECT clave, tamano FROM resultados ORDER BY accedido LIMIT 64"
+            ).fetchall()
+            if not filas:
+                return 0
+            for clave, tamano in filas:
+                conexion.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+                self._memoria.pop(clave, None)
+                bytes_disco -= tamano
+                if bytes_disco <= self.max_bytes:
+                    break
+        return bytes_disco
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.hits_memoria + self.hits_disco + self.misses
+            hits = self.hits_memoria + self.hits_disco
+            return {
+                "hits": hits,
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "hit_rate": round(hits / consultas, 3) if consultas else 0.0,
+                "entradas_memoria": len(self._memoria),
+                "bytes_disco": self._bytes_disco,
+                "version_extractor": VERSION_EXTRACTOR,
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def obtener_cache():
+    """Cache de resultados compartida por todo el proceso del servidor"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheResultados()
+        return _cache
@@ -0,0 +1,219 @@
+import re
+from collections import namedtuple
+from tiempos import etapa
+from recibo import FALTANTE
+
+# Valor de un campo y posición (en el texto que se analizó) donde se encontró.
+# La posición es None para valores por defecto o calculados sin coincidencia.
+Coincidencia = namedtuple("Coincidencia", ["valor", "posicion"])
+
+def colapsar_espacios(texto):
+    """Equivale a re.sub(r'\\s+', ' ', texto) pero varias veces más rápido"""
+    colapsado = ' '.join(texto.split())
+    if texto[:1].isspace():
+        colapsado = ' ' + colapsado
+    if texto[-1:].isspace() and colapsado.strip():
+        colapsado += ' '
+    return colapsado
+
+class ContextoTexto:
+    """Texto a analizar y sus variantes, calculadas una sola vez por recibo"""
+
+    def __init__(self, texto):
+        self.texto = texto
+        self._fuentes = {"texto": texto}
+        self._mayus = {}
+        self._busquedas = {}
+
+    def fuente(self, nombre):
+        """"texto", "mayus" (texto.upper()) o "limpio" (espacios colapsados)"""
+        if nombre not in self._fuentes:
+            if nombre == "mayus":
+                self._fuentes[nombre] = self.texto.upper()
+            elif nombre == "limpio":
+                self._fuentes[nombre] = colapsar_espacios(self.texto)
+            else:
+                raise ValueError(f"Fuente de texto desconocida: {nombre}")
+        return self._fuentes[nombre]
+
+    def mayusculas(self, fuente="texto"):
+        """Versión en mayúsculas de una fuente, para buscar anclas con str.find"""
+        if fuente not in self._mayus:
+            texto = self.fuente(fuente)
+            self._mayus[fuente] = texto if fuente == "mayus" else texto.upper()
+        return self._mayus[fuente]
+
+    @property
+    def mayus(self):
+        return self.mayusculas("texto")
+
+    def contiene(self, anclas, fuente="texto"):
+        mayus = self.mayusculas(fuente)
+        return any(a in mayus for a in anclas)
+
+    def _inicios(self, anclas, fuente, desde=0):
+        """Posiciones (ordenadas) donde empieza alguna de las anclas"""
+        mayus = self.mayusculas(fuente)
+        posiciones = set()
+        for ancla in anclas:
+            pos = mayus.find(ancla, desde)
+            while pos != -1:
+                posiciones.add(pos)
+                pos = mayus.find(ancla, pos + 1)
+        return sorted(posiciones)
+
+    def _anclable(self, anclas, fuente):
+        # upper() puede cambiar la longitud (ej. "ß" -> "SS"); entonces las
+        # posiciones no corresponden y se busca de la forma normal
+        return anclas and len(self.mayusculas(fuente)) == len(self.fuente(fuente))
+
+    def buscar(self, patron, fuente="texto", anclas=()):
+        """re.search memorizado: varios campos pueden compartir el mismo patrón.
+
+        Con `anclas` (literales en mayúsculas con que empieza toda coincidencia)
+        el patrón solo se prueba donde aparece un ancla: mismo resultado que
+        search, sin recorrer el texto carácter por carácter con re.I.
+        """
+        clave = (patron, fuente)
+        if clave not in self._busquedas:
+            texto = self.fuente(fuente)
+            if self._anclable(anclas, fuente):
+                encontrado = None
+                for pos in self._inicios(anclas, fuente):
+                    encontrado = patron.match(texto, pos)
+                    if encontrado:
+                        break
+            else:
+                encontrado = patron.search(texto)
+            self._busquedas[clave] = encontrado
+        return self._busquedas[clave]
+
+    def buscar_todas(self, patron, fuente="texto", anclas=()):
+        """Equivalente a finditer (coincidencias sin traslape) usando anclas"""
+        texto = self.fuente(fuente)
+        if not self._anclable(anclas, fuente):
+            return list(patron.finditer(texto))
+
+        coincidencias = []
+        fin = 0
+        for pos in self._inicios(anclas, fuente):
+            if pos < fin:
+                continue
+            m = patron.match(texto, pos)
+            if m:
+                coincidencias.append(m)
+                fin = max(m.end(), pos + 1)
+        return coincidencias
+
+class Campo:
+    """Especificación declarativa de un campo de recibo.
+
+    - patrones: regex en orden de prioridad, compiladas al crear el campo
+      (cadenas con `flags`, o patrones ya compilados con sus propios flags).
+      Un elemento puede ser una tupla (regex, formato) para usar un formato
+      distinto al del campo en ese patrón.
+    - grupo: grupo de la coincidencia que da el valor.
+    - formato: función (match) -> valor; si devuelve None se prueba el
+      siguiente patrón (sirve para validar rangos).
+    - respaldo: función (contexto, resultados) -> Coincidencia o None, para
+      la lógica que no cabe en una regex; se usa si ningún patrón aplica.
+    - ancla: literal(es) con que EMPIEZA toda coincidencia de los patrones;
+      los patrones solo se prueban donde aparece alguno.
+    - requiere: literal(es) que toda coincidencia contiene en cualquier
+      lugar; si ninguno está en el texto los patrones ni se ejecutan.
+    - fuente: "texto", "mayus" (texto.upper()) o "limpio" (espacios colapsados).
+    - espacial: objeto con extraer(pagina) -> valor o None (espacial.Etiquetado)
+      que se prueba antes que los patrones cuando hay cajas del OCR.
+    """
+
+    __slots__ = ('nombre', 'patrones', 'grupo', 'respaldo', 'anclas', 'requiere', 'fuente', 'defecto',
+                 'espacial')
+
+    def __init__(self, nombre, patrones=(), grupo=1, formato=None, respaldo=None,
+                 ancla=None, requiere=None, fuente="texto", flags=re.I, defecto=FALTANTE,
+                 espacial=None):
+        self.nombre = nombre
+        self.patrones = tuple(self._compilar(p, flags, formato) for p in patrones)
+        self.grupo = grupo
+        self.respaldo = respaldo
+        self.anclas = _literales(ancla)
+        self.requiere = _literales(requiere)
+        self.fuente = fuente
+        self.defecto = defecto
+        self.espacial = espacial
+
+    @staticmethod
+    def _compilar(patron, flags, formato):
+        if isinstance(patron, tuple):
+            patron, formato = patron
+        if not isinstance(patron, re.Pattern):
+            patron = re.compile(patron, flags)
+        return patron, formato
+
+    def extraer(self, ctx, resultados):
+        filtro = self.requiere or self.anclas
+        if self.patrones and (not filtro or ctx.contiene(filtro, self.fuente)):
+            for patron, formato in self.patrones:
+                m = ctx.buscar(patron, self.fuente, self.anclas)
+                if not m:
+                    continue
+                if formato:
+                    valor, posicion = formato(m), m.start()
+                else:
+                    valor, posicion = m.group(self.grupo), m.start(self.grupo)
+                if valor is not None:
+                    return Coincidencia(valor, posicion)
+
+        if self.respaldo:
+            encontrado = self.respaldo(ctx, resultados)
+            if encontrado is not None:
+                return encontrado
+
+        return Coincidencia(self.defecto, None)
+
+class Calculado(Campo):
+    """Campo cuyo valor depende de campos anteriores (sin patrones propios)"""
+
+    def __init__(self, nombre, funcion, defecto=FALTANTE):
+        super().__init__(nombre, respaldo=funcion, defecto=defecto)
+
+def _literales(valor):
+    if not valor:
+        return ()
+    if isinstance(valor, str):
+        valor = (valor,)
+    return tuple(v.upper() for v in valor)
+
+def especificacion(*campos):
+    """Agrupa campos en el orden en que deben evaluarse"""
+    return tuple(campos)
+
+def extraer_campos(texto, campos, pagina=None):
+    """Evalúa los campos sobre el texto y devuelve {nombre: Coincidencia}.
+
+    Los campos se evalúan en orden (un campo puede usar los anteriores). Las
+    variantes del texto (mayúsculas, espacios colapsados) y las búsquedas de
+    patrones compartidos se calculan una sola vez por recibo. Con `pagina`
+    (espacial.PaginaOCR del mismo texto) los campos con lectura espacial la
+    prueban primero y solo los que no se encuentran así pasan a las regex;
+    su posición es None porque no vienen del texto.
+    """
+    with etapa("campos"):
+        ctx = ContextoTexto(texto)
+        resultados = {}
+        for campo in campos:
+            if pagina is not None and campo.espacial is not None:
+                valor = campo.espacial.extraer(pagina)
+                if valor is not None:
+                    resultados[campo.nombre] = Coincidencia(valor, None)
+                    continue
+            resultados[campo.nombre] = campo.extraer(ctx, resultados)
+    return resultados
+
+def etiquetas(campos):
+    """Etiquetas de los campos con lectura espacial, para indexarlas al crear la página"""
+    return tuple(e for campo in campos if campo.espacial is not None for e in campo.espacial.etiquetas)
+
+def valores(resultados):
+    """{nombre: Coincidencia} -> {nombre: valor}"""
+    return {nombre: c.valor for nombre, c in resultados.items()}
@@ -0,0 +1,72 @@
+import os
+import threading
+from collections import namedtuple
+
+# ================================
+# CLASIFICADOR DE SERVICIO
+# ================================
+# Cada servicio registra palabras clave con un peso (las declara su extractor
+# en extractores.py) y se buscan todas sobre el inicio del texto: el nombre
+# de la empresa y el tipo de servicio están en el encabezado de la primera
+# página (en las muestras, en los primeros 500 caracteres). El servicio con
+# más puntaje gana, sin depender del orden en que se registraron, y el costo
+# no crece con el largo del recibo.
+
+# Caracteres del texto que se miran (el resto del recibo no cambia el servicio)
+CLASIFICADOR_CARACTERES = int(os.environ.get("CLASIFICADOR_CARACTERES", "1500"))
+
+# Puntaje mínimo del ganador para no devolver "unknown"
+CLASIFICADOR_MINIMO = float(os.environ.get("CLASIFICADOR_MINIMO", "1"))
+
+# servicio: el ganador o "unknown"; confianza: su fracción del puntaje total
+# (1.0 = ningún otro servicio sumó nada); puntajes: {servicio: puntaje}
+Clasificacion = namedtuple("Clasificacion", ["servicio", "confianza", "puntajes"])
+
+class ClasificadorServicios:
+    """Puntúa un texto contra las palabras clave de cada servicio.
+
+    Cada palabra cuenta una vez aunque se repita. Se busca con `in` sobre el
+    prefijo en mayúsculas: para unas decenas de palabras y ~1.5 KB, la
+    búsqueda en C de cada una es más rápida que un autómata de una pasada
+    (Aho-Corasick) recorrido carácter a carácter en Python o que una
+    alternativa de `re` (ver benchmarks/bench_clasificador.py). Agregar un
+    servicio es llamar a registrar() con sus palabras.
+    """
+
+    def __init__(self, palabras=None, caracteres=CLASIFICADOR_CARACTERES, minimo=CLASIFICADOR_MINIMO):
+        self.caracteres = caracteres
+        self.minimo = minimo
+        self._pesos = {}            # palabra -> [(servicio, peso), ...]
+        self._servicios = []
+        self._palabras = ()         # copia inmutable para clasificar sin lock
+        self._lock = threading.Lock()
+        for servicio, pesos in (palabras or {}).items():
+            self.registrar(servicio, pesos)
+
+    def registrar(self, servicio, pesos):
+        """Agrega palabras clave {palabra: peso} de un servicio (reemplaza el peso si ya estaba)"""
+        with self._lock:
+            if servicio not in self._servicios:
+                self._servicios.append(servicio)
+            for palabra, peso in pesos.items():
+                palabra = palabra.upper()
+                self._pesos[palabra] = [(s, p) for s, p in self._pesos.get(palabra, []) if s != servicio]
+                self._pesos[palabra].append((servicio, peso))
+            self._palabras = tuple((p, tuple(pesos)) for p, pesos in self._pesos.items())
+
+    def clasificar(self, texto):
+        """Clasificacion del texto (solo se miran sus primeros `caracteres`)"""
+        prefijo = texto[:self.caracteres].upper()
+        puntajes = dict.fromkeys(self._servicios, 0)
+        for palabra, pesos in self._palabras:
+            if palabra in prefijo:
+                for servicio, peso in pesos:
+                    puntajes[servicio] += peso
+
+        orden = sorted(puntajes.values(), reverse=True)
+        total = sum(orden)
+        mejor = max(puntajes, key=puntajes.get) if puntajes else None
+        # Un empate arriba no decide nada
+        if mejor is None or orden[0] < self.minimo or (len(orden) > 1 and orden[0] == orden[1]):
+            return Clasificacion("unknown", 0.0, puntajes)
+        return Clasificacion(mejor, round(puntajes[mejor] / total, 3), puntajes)
@@ -0,0 +1,209 @@
+import io
+import os
+import logging
+import threading
+import importlib.util
+from PyPDF2 import PdfReader
+from tiempos import etapa
+
+log = logging.getLogger(__name__)
+
+# ================================
+# RASTERIZACIÓN PARA OCR
+# ================================
+# Las páginas se renderizan a un arreglo numpy uint8 en grises (alto x
+# ancho), que es lo que consumen las plantillas y el preprocesamiento.
+#
+# Motor de render (RENDERIZADOR):
+#   pdfium   pypdfium2 dentro del proceso: sin subprocesos ni PPM intermedio
+#   poppler  pdftoppm por pdf2image (un subproceso por llamada)
+#   auto     pdfium si pypdfium2 está instalado, si no poppler
+RENDERIZADOR = os.environ.get("RENDERIZADOR", "auto")
+
+# Carpeta de los binarios de poppler (pdftoppm); vacío = buscarlos en el PATH
+POPPLER_PATH = os.environ.get("POPPLER_PATH") or None
+
+# DPI del render para OCR; benchmarks/bench_dpi.py mide qué tan bajo se puede ir
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+
+def _rangos_contiguos(paginas):
+    """(1, 2, 3, 5) -> [(1, 3), (5, 5)]: una llamada a poppler por rango"""
+    rangos = []
+    for pagina in sorted(set(paginas)):
+        if rangos and pagina == rangos[-1][1] + 1:
+            rangos[-1] = (rangos[-1][0], pagina)
+        else:
+            rangos.append((pagina, pagina))
+    return rangos
+
+class RenderizadorPdfium:
+    """Render con PDFium (pypdfium2) en el mismo proceso.
+
+    La biblioteca queda cargada durante toda la vida del proceso y cada
+    página se dibuja directo en un bitmap de grises que se copia una vez a
+    numpy. PDFium no admite llamadas concurrentes: los hilos del servidor se
+    turnan con un lock.
+    """
+    nombre = "pdfium"
+
+    def __init__(self):
+        import pypdfium2
+        self._pdfium = pypdfium2
+        self._lock = threading.Lock()
+
+    def renderizar(self, pdf, paginas, dpi):
+        import numpy as np
+        fuente = pdf.contenido if isinstance(pdf, DocumentoPDF) else pdf
+        imagenes = []
+        with self._lock:
+            documento = self._pdfium.PdfDocument(fuente)
+            try:
+                for numero in paginas:
+                    if not 1 <= numero <= len(documento):
+                        continue
+                    pagina = documento[numero - 1]
+                    bitmap = pagina.render(scale=dpi / 72, grayscale=True)
+                    # Copia propia: el buffer del bitmap se libera al cerrarlo
+                    imagenes.append(np.array(bitmap.to_numpy()))
+                    bitmap.close()
+                    pagina.close()
+            finally:
+                documento.close()
+        return imagenes
+
+class RenderizadorPoppler:
+    """Render con pdftoppm vía pdf2image: un subproceso por rango de páginas"""
+    nombre = "poppler"
+
+    def renderizar(self, pdf, paginas, dpi):
+        import numpy as np
+        from pdf2image import convert_from_path, convert_from_bytes
+
+        imagenes = []
+        for primera, ultima in _rangos_contiguos(paginas):
+            # Sin output_folder pdf2image lee el PPM de la tubería, sin temporales
+            opciones = dict(dpi=dpi, first_page=primera, last_page=ultima,
+                            grayscale=True, poppler_path=POPPLER_PATH)
+            if isinstance(pdf, DocumentoPDF):
+                paginas_pil = convert_from_bytes(pdf.contenido, **opciones)
+            else:
+                paginas_pil = convert_from_path(pdf, **opciones)
+            imagenes.extend(np.asarray(img) for img in paginas_pil)
+        return imagenes
+
+RENDERIZADORES = {
+    "pdfium": RenderizadorPdfium,
+    "poppler": RenderizadorPoppler,
+}
+
+_renderizador = None
+_renderizador_pid = None    # un proceso hijo arma el suyo (el lock no sobrevive al fork)
+_renderizador_lock = threading.Lock()
+
+def obtener_renderizador():
+    """Renderizador del proceso según RENDERIZADOR"""
+    global _renderizador, _renderizador_pid
+    with _renderizador_lock:
+        if _renderizador is None or _renderizador_pid != os.getpid():
+            nombre = RENDERIZADOR
+            if nombre == "auto":
+                nombre = "pdfium" if importlib.util.find_spec("pypdfium2") else "poppler"
+            if nombre not in RENDERIZADORES:
+                raise ValueError(f"RENDERIZADOR desconocido: {RENDERIZADOR}")
+            _renderizador = RENDERIZADORES[nombre]()
+            _renderizador_pid = os.getpid()
+            log.debug("Renderizador de PDF: %s", nombre)
+        return _renderizador
+
+def rasterizar_paginas(pdf, paginas=(1,), dpi=OCR_DPI, recorte=None, renderizador=None):
+    """Renderiza solo las páginas pedidas, en escala de grises y en memoria.
+
+    Antes se renderizaba el PDF completo a color y se usaba solo la primera
+    página: un recibo de N páginas costaba N veces memoria y tiempo.
+    `pdf` puede ser una ruta o un DocumentoPDF (se renderiza desde sus bytes).
+    Devuelve arreglos numpy uint8 (alto x ancho); con `recorte` son vistas
+    de la página completa.
+    """
+    renderizador = renderizador or obtener_renderizador()
+    imagenes = renderizador.renderizar(pdf, paginas, dpi)
+
+    if recorte:
+        x0, y0, x1, y1 = recorte
+        imagenes = [
+            img[int(y0 * img.shape[0]):int(y1 * img.shape[0]),
+                int(x0 * img.shape[1]):int(x1 * img.shape[1])]
+            for img in imagenes
+        ]
+
+    return imagenes
+
+# ================================
+# DOCUMENTO PDF
+# ================================
+class DocumentoPDF:
+    """PDF subido, parseado una sola vez y compartido por detección y extractores.
+
+    Guarda los bytes del archivo; el PdfReader, el texto por página y las
+    imágenes renderizadas se calculan la primera vez que alguien los pide y
+    se reutilizan después. No necesita que el archivo exista en disco.
+    """
+
+    def __init__(self, contenido, nombre="documento.pdf", ruta=None):
+        self.contenido = contenido
+        self.nombre = nombre
+        self.ruta = ruta            # solo si el PDF vino de disco
+        self._reader = None
+        self._textos = None
+        self._imagenes = {}
+
+    @classmethod
+    def desde_ruta(cls, ruta, nombre=None):
+        with open(ruta, "rb") as f:
+            return cls(f.read(), nombre or os.path.basename(ruta), ruta=ruta)
+
+    @classmethod
+    def desde_fuente(cls, fuente, nombre):
+        """Desde los bytes de una subida o desde la ruta de un temporal (subidas grandes)"""
+        if isinstance(fuente, (bytes, bytearray)):
+            return cls(bytes(fuente), nombre)
+        return cls.desde_ruta(fuente, nombre)
+
+    @classmethod
+    def abrir(cls, pdf):
+        """Acepta un DocumentoPDF o una ruta (compatibilidad con los extractores)"""
+        if isinstance(pdf, cls):
+            return pdf
+        return cls.desde_ruta(pdf)
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            with etapa("parseo"):
+                self._reader = PdfReader(io.BytesIO(self.contenido))
+        return self._reader
+
+    @property
+    def textos_paginas(self):
+        """Texto de cada página (cadena vacía si la página no tiene capa de texto)"""
+        if self._textos is None:
+            paginas = self.reader.pages
+            with etapa("parseo"):
+                self._textos = [page.extract_text() or "" for page in paginas]
+        return self._textos
+
+    @property
+    def texto(self):
+        """Texto de todas las páginas concatenado"""
+        return "".join(self.textos_paginas)
+
+    @property
+    def num_paginas(self):
+        return len(self.reader.pages)
+
+    def imagenes(self, paginas=(1,), dpi=OCR_DPI, recorte=None):
+        """Páginas renderizadas, cacheadas por (páginas, dpi, recorte)"""
+        clave = (tuple(paginas), dpi, recorte)
+        if clave not in self._imagenes:
+            with etapa("rasterizado"):
+                self._imagenes[clave] = rasterizar_paginas(self, paginas, dpi=dpi, recorte=recorte)
+        return self._imagenes[clave]
@@ -0,0 +1,162 @@
+import re
+import unicodedata
+from bisect import bisect_right
+from collections import namedtuple
+
+# ================================
+# MODELO ESPACIAL DE UNA PÁGINA OCR
+# ================================
+# readtext devuelve cada texto con su caja; unir los textos con "\n" pierde
+# la disposición y obliga a adivinarla con regex multilínea sobre todo el
+# texto. PaginaOCR conserva las cajas en franjas horizontales (una rejilla
+# por filas) y un índice de etiquetas: buscar "NO. DE SERVICIO" es una
+# consulta a un dict y el valor se toma del mismo token, del de su derecha
+# o del de abajo, sin recorrer el resto de la página.
+
+# Texto, caja (x0, y0, x1, y1) en píxeles, confianza y orden de lectura
+Token = namedtuple("Token", ["texto", "x0", "y0", "x1", "y1", "confianza", "orden"])
+
+# Filas (del alto de un token) que ocupa una línea de texto con su interlineado
+INTERLINEADO = 2
+
+# Marcas diacríticas que quedan sueltas tras NFKD (Í -> I + ´)
+_MARCAS = re.compile("[\u0300-\u036f]")
+
+def _sin_acentos(texto):
+    if texto.isascii():
+        return texto
+    return _MARCAS.sub("", unicodedata.normalize("NFKD", texto))
+
+def normalizar(texto):
+    """Mayúsculas, sin acentos y con espacios simples: "Límite  de pago" -> "LIMITE DE PAGO" """
+    return ' '.join(_sin_acentos(texto.upper()).split())
+
+class PaginaOCR:
+    """Tokens de readtext indexados por posición y por etiqueta.
+
+    - franjas: {fila: [tokens]} con filas del alto típico de un token; las
+      consultas por vecindad solo miran las filas cercanas.
+    - etiquetas: {ETIQUETA: [(token, resto)]} en orden de lectura, donde
+      `resto` es lo que sigue a la etiqueta en el mismo token (el OCR suele
+      pegar etiqueta y valor: "TARIFAPDBT", "CUENTA:G2DP..."). Se arma en
+      con las etiquetas que se pasan al crear la página (buscándolas en el
+      texto de la página entera); otras se indexan la primera vez que se piden.
+    """
+
+    def __init__(self, resultado, etiquetas=()):
+        self.tokens = []
+        for orden, (bbox, texto, confianza) in enumerate(resultado):
+            xs = [p[0] for p in bbox]
+            ys = [p[1] for p in bbox]
+            self.tokens.append(Token(texto, min(xs), min(ys), max(xs), max(ys), confianza, orden))
+        # Toda la página se normaliza de una vez; cada token queda en su línea
+        pagina = _sin_acentos("\n".join(t.texto.replace("\n", " ") for t in self.tokens).upper())
+        self._normalizados = [' '.join(linea.split()) for linea in pagina.split("\n")] if self.tokens else []
+
+        altos = sorted(t.y1 - t.y0 for t in self.tokens)
+        self.alto_fila = max(1, altos[len(altos) // 2]) if altos else 1
+        self._franjas = {}
+        for token in self.tokens:
+            self._franjas.setdefault(self._fila(token), []).append(token)
+        for fila in self._franjas.values():
+            fila.sort(key=lambda t: t.x0)
+
+        # Texto normalizado de toda la página y dónde empieza cada token en él
+        self._pagina = "\n".join(self._normalizados)
+        self._inicios = []
+        inicio = 0
+        for normalizado in self._normalizados:
+            self._inicios.append(inicio)
+            inicio += len(normalizado) + 1
+        self._etiquetas = {}
+        self._indexar(etiquetas)
+
+    def _fila(self, token):
+        return int((token.y0 + token.y1) / 2 // self.alto_fila)
+
+    def _indexar(self, etiquetas):
+        """Busca cada etiqueta nueva en el texto de la página (no token por token)"""
+        for etiqueta in etiquetas:
+            if etiqueta in self._etiquetas:
+                continue
+            clave = normalizar(etiqueta)
+            if clave not in self._etiquetas:
+                encontrados = []
+                pos = self._pagina.find(clave)
+                while pos != -1:
+                    i = bisect_right(self._inicios, pos) - 1
+                    inicio = self._inicios[i]
+                    # Dentro de un solo token y solo su primera aparición en él
+                    if (pos + len(clave) <= inicio + len(self._normalizados[i])
+                            and (not encontrados or encontrados[-1][0] is not self.tokens[i])):
+                        encontrados.append((self.tokens[i], self._normalizados[i][pos - inicio + len(clave):]))
+                    pos = self._pagina.find(clave, pos + 1)
+                self._etiquetas[clave] = encontrados
+            self._etiquetas[etiqueta] = self._etiquetas[clave]
+
+    def etiqueta(self, *etiquetas):
+        """[(token, resto)] de las etiquetas pedidas, en orden de lectura"""
+        self._indexar(etiquetas)
+        if len(etiquetas) == 1:
+            return self._etiquetas[etiquetas[0]]
+        return sorted((par for e in etiquetas for par in self._etiquetas[e]), key=lambda par: par[0].orden)
+
+    def derecha_de(self, token, limite=3):
+        """Tokens de la misma línea a la derecha, del más cercano al más lejano"""
+        centro = (token.y0 + token.y1) / 2
+        fila = self._fila(token)
+        vecinos = [t for f in (fila - 1, fila, fila + 1) for t in self._franjas.get(f, ())
+                   if t is not token and t.x0 >= token.x1 - self.alto_fila and t.y0 <= centro <= t.y1]
+        vecinos.sort(key=lambda t: t.x0)
+        return vecinos[:limite]
+
+    def debajo_de(self, token, lineas=3, limite=3):
+        """Tokens de las `lineas` siguientes que se superponen en horizontal, de arriba abajo"""
+        fila = self._fila(token)
+        vecinos = [t for f in range(fila + 1, fila + 1 + lineas * INTERLINEADO) for t in self._franjas.get(f, ())
+                   if t.x0 < token.x1 and t.x1 > token.x0 and t.y0 >= token.y0]
+        vecinos.sort(key=lambda t: (t.y0, t.x0))
+        return vecinos[:limite]
+
+    def texto(self):
+        """Textos en el orden de readtext, uno por línea (lo que analizan las regex)"""
+        return "\n".join(t.texto for t in self.tokens)
+
+class Etiquetado:
+    """Campo que se lee junto a una etiqueta en una PaginaOCR.
+
+    Se prueba `patron` (con match, anclado al inicio) sobre lo que sigue a
+    la etiqueta en su token, y si no, sobre los tokens a su derecha y luego
+    los de abajo. Las etiquetas se recorren en orden de lectura y gana el
+    primer valor válido, como haría re.search sobre el texto unido. Con
+    `formato(m)` devolviendo None se descarta el candidato.
+    """
+    __slots__ = ('etiquetas', 'patron', 'formato', 'grupo', 'derecha', 'debajo')
+
+    def __init__(self, etiquetas, patron, formato=None, grupo=1, derecha=1, debajo=1, flags=re.I):
+        self.etiquetas = (etiquetas,) if isinstance(etiquetas, str) else tuple(etiquetas)
+        self.patron = re.compile(patron, flags)
+        self.formato = formato
+        self.grupo = grupo
+        self.derecha = derecha
+        self.debajo = debajo
+
+    def _candidatos(self, pagina, token, resto):
+        if resto.strip(" :;-.,"):
+            yield resto
+        for vecino in pagina.derecha_de(token, self.derecha):
+            yield vecino.texto.strip()
+        for vecino in pagina.debajo_de(token, limite=self.debajo):
+            yield vecino.texto.strip()
+
+    def extraer(self, pagina):
+        """Valor del campo o None"""
+        for token, resto in pagina.etiqueta(*self.etiquetas):
+            for texto in self._candidatos(pagina, token, resto):
+                m = self.patron.match(texto)
+                if not m:
+                    continue
+                valor = self.formato(m) if self.formato else m.group(self.grupo)
+                if valor is not None:
+                    return valor
+        return None
@@ -0,0 +1,80 @@
+import io
+import csv
+import json
+
+# Filas que se acumulan antes de enviar un bloque al cliente
+FILAS_POR_BLOQUE = 200
+
+NOMBRES_SERVICIO = {
+    'cfe': 'CFE (Luz)',
+    'japam': 'JAPAM (Agua)',
+    'gas': 'Gas',
+}
+
+# (encabezado, función registro -> valor), en el orden de las columnas
+COLUMNAS_CSV = [
+    ('Archivo', lambda r: r.get('filename', '')),
+    ('Servicio', lambda r: NOMBRES_SERVICIO.get(r.get('service_type'), r.get('service_type', ''))),
+    ('Titular', lambda r: r.get('titular', '')),
+    ('N° Servicio', lambda r: r.get('no_servicio', '')),
+    ('Dirección', lambda r: r.get('direccion', '')),
+    ('Cuenta', lambda r: r.get('cuenta', '')),
+    ('N° Medidor', lambda r: r.get('no_medidor', '')),
+    ('Período', lambda r: r.get('periodo', '')),
+    ('Total', lambda r: r.get('total', '')),
+    ('Consumo', lambda r: r.get('consumo') or r.get('consumo_kwh') or r.get('consumo_m3') or ''),
+    ('Tarifa', lambda r: r.get('tarifa', '')),
+    ('Fecha Pago', lambda r: r.get('fecha_pago', '')),
+    ('Fecha Corte', lambda r: r.get('fecha_corte', '')),
+    ('RMU', lambda r: r.get('rmu', '')),
+    ('Calidad', lambda r: r.get('calidad') or r.get('tipo_lectura') or 'BÁSICO'),
+    ('Fecha Subida', lambda r: r.get('fecha_registro', '')),
+    ('Estado', lambda r: 'ERROR' if r.get('error') else 'PROCESADO'),
+]
+
+def generar_csv(registros):
+    """Genera el CSV por bloques a partir de un iterable de recibos.
+
+    csv.writer se encarga de las comillas (comas, comillas y saltos de línea
+    dentro de los valores). El BOM inicial hace que Excel lo abra como UTF-8.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator='\r\n')
+
+    buffer.write('\ufeff')
+    escritor.writerow([encabezado for encabezado, _ in COLUMNAS_CSV])
+    # El encabezado sale de inmediato: la descarga empieza antes de leer la base
+    yield _vaciar(buffer)
+
+    pendientes = 0
+    for registro in registros:
+        escritor.writerow([valor(registro) for _, valor in COLUMNAS_CSV])
+        pendientes += 1
+        if pendientes >= FILAS_POR_BLOQUE:
+            yield _vaciar(buffer)
+            pendientes = 0
+    if pendientes:
+        yield _vaciar(buffer)
+
+def generar_ndjson(registros):
+    """Genera un recibo JSON por línea, por bloques"""
+    bloque = []
+    for registro in registros:
+        bloque.append(json.dumps(registro, ensure_ascii=False))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield "\n".join(bloque) + "\n"
+            bloque = []
+    if bloque:
+        yield "\n".join(bloque) + "\n"
+
+def _vaciar(buffer):
+    texto = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return texto
+
+# formato -> (generador, mimetype, extensión)
+FORMATOS_EXPORTACION = {
+    'csv': (generar_csv, 'text/csv', 'csv'),
+    'ndjson': (generar_ndjson, 'application/x-ndjson', 'ndjson'),
+}
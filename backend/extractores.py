@@ -0,0 +1,149 @@
+import threading
+
+import Ing_Soft_P2
+from clasificador import ClasificadorServicios
+
+# ================================
+# REGISTRO DE EXTRACTORES
+# ================================
+# Cada servicio declara aquí cómo se reconoce y qué le cuesta procesarse.
+# procesar_recibo elige el extractor por el clasificador (o por el nombre
+# del archivo) y el motor de lotes usa el costo para decidir dónde correrlo:
+# los que no usan OCR y son baratos van a hilos del proceso del servidor, el
+# resto al pool de procesos con OCR caliente. Un servicio nuevo es un
+# registrar() más, sin tocar server.py ni procesamiento.py.
+
+# Servicio que se intenta cuando no se reconoce ninguno
+SERVICIO_RESPALDO = "cfe"
+
+class Extractor:
+    """Un extractor de recibos y lo que el pipeline necesita saber de él.
+
+    - extraer(documento) -> datos: recibe un DocumentoPDF.
+    - palabras: {palabra: peso} para el clasificador (5 empresa, 3 tipo de
+      servicio, 1 indicio compartido).
+    - nombres: pistas en el nombre del archivo, si el texto no alcanza.
+    - paginas_ocr: páginas que rasteriza cuando recurre al OCR.
+    - usa_ocr: si puede necesitar el modelo OCR.
+    - costo_ms: tiempo esperado por recibo sin OCR (medido en las muestras).
+    - campos: campos propios además de REQUIRED_FIELDS (se rellenan si faltan).
+    """
+    __slots__ = ('servicio', 'extraer', 'palabras', 'nombres', 'paginas_ocr', 'usa_ocr', 'costo_ms', 'campos')
+
+    def __init__(self, servicio, extraer, palabras, nombres=(), paginas_ocr=(), usa_ocr=False,
+                 costo_ms=100, campos=()):
+        self.servicio = servicio
+        self.extraer = extraer
+        self.palabras = dict(palabras)
+        self.nombres = tuple(n.upper() for n in nombres)
+        self.paginas_ocr = tuple(paginas_ocr)
+        self.usa_ocr = usa_ocr
+        self.costo_ms = costo_ms
+        self.campos = tuple(campos)
+
+    def describir(self):
+        return {
+            "paginas_ocr": list(self.paginas_ocr),
+            "usa_ocr": self.usa_ocr,
+            "costo_ms": self.costo_ms,
+            "campos": list(self.campos),
+        }
+
+class RegistroExtractores:
+    """Extractores por servicio más el clasificador armado con sus palabras"""
+
+    def __init__(self, respaldo=SERVICIO_RESPALDO):
+        self.respaldo = respaldo
+        self.clasificador = ClasificadorServicios()
+        self._extractores = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, extractor):
+        with self._lock:
+            self._extractores[extractor.servicio] = extractor
+        self.clasificador.registrar(extractor.servicio, extractor.palabras)
+
+    def obtener(self, servicio):
+        return self._extractores.get(servicio)
+
+    def extractores(self):
+        """Extractores en orden de registro"""
+        with self._lock:
+            return list(self._extractores.values())
+
+    def por_nombre(self, filename):
+        """Primer extractor con una pista en el nombre del archivo, o None"""
+        nombre = filename.upper()
+        for extractor in self.extractores():
+            if any(pista in nombre for pista in extractor.nombres):
+                return extractor
+        return None
+
+    def detectar(self, texto, filename=""):
+        """(extractor o None, Clasificacion): por el texto y, si no alcanza, por el nombre"""
+        clasificacion = self.clasificador.clasificar(texto)
+        extractor = self.obtener(clasificacion.servicio)
+        if extractor is None and filename:
+            extractor = self.por_nombre(filename)
+        return extractor, clasificacion
+
+    def describir(self):
+        return {e.servicio: e.describir() for e in self.extractores()}
+
+# --------------------------
+# EXTRACTORES DEL PROYECTO
+# --------------------------
+def _extractores_base():
+    return [
+        Extractor(
+            "cfe", Ing_Soft_P2.extraer_info_recibo_cfe,
+            palabras={
+                "CFE": 5, "COMISIÓN FEDERAL DE ELECTRICIDAD": 5, "COMISION FEDERAL DE ELECTRICIDAD": 5,
+                "SUMINISTRO ELÉCTRICO": 3, "SUMINISTRO ELECTRICO": 3, "KWH": 3, "KILOWATT": 3,
+                "ELECTRICIDAD": 2, "ELECTRICA": 2, "ELÉCTRICA": 2,
+                "TARIFA": 1, "MEDIDOR": 1,
+            },
+            nombres=("CFE", "LUZ", "ELECTRICIDAD"),
+            paginas_ocr=Ing_Soft_P2.PAGINAS_CFE_OCR,
+            usa_ocr=Ing_Soft_P2.CFE_MODO != "texto",
+            costo_ms=600,
+            campos=("consumo_kwh", "tipo_lectura"),
+        ),
+        Extractor(
+            "japam", Ing_Soft_P2.extraer_info_recibo_japam,
+            palabras={
+                "JAPAM": 5, "JUNTA DE AGUA": 5,
+                "AGUA POTABLE": 3, "SERVICIO DE AGUA": 3,
+                "METROS CÚBICOS": 2, "METROS CUBICOS": 2,
+                "AGUA": 1, "M3": 1, "CAUDAL": 1, "HIDRANTE": 1,
+            },
+            nombres=("JAPAM", "AGUA"),
+            costo_ms=60,
+            campos=("consumo_m3", "consumo_kwh", "tipo_lectura"),
+        ),
+        Extractor(
+            "gas", Ing_Soft_P2.extraer_info_recibo_gas,
+            palabras={
+                "ENGIE": 5, "TRACTEBEL": 5,
+                "GAS NATURAL": 3, "GAS LP": 3,
+                "PROPANO": 2, "BUTANO": 2, "COMBUSTIBLE": 2,
+                "GAS": 1,
+            },
+            nombres=("GAS", "ENGIE"),
+            costo_ms=60,
+            campos=("consumo_kwh", "tipo_lectura"),
+        ),
+    ]
+
+_registro = None
+_registro_lock = threading.Lock()
+
+def obtener_registro_extractores():
+    """Registro del proceso con los extractores de CFE, JAPAM y gas"""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroExtractores()
+            for extractor in _extractores_base():
+                _registro.registrar(extractor)
+        return _registro
@@ -0,0 +1,42 @@
+import os
+
+# ================================
+# CONFIGURACIÓN DE GUNICORN
+# ================================
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Un proceso con varios hilos por defecto: los trabajos asíncronos (/api/jobs)
+# viven en la memoria del proceso que los creó, así que con más de un worker
+# el balanceador tiene que mandar cada cliente siempre al mismo. El trabajo
+# pesado de los lotes ya corre en el pool de procesos del motor de lotes.
+bind = os.environ.get("SERVIDOR_BIND", "0.0.0.0:8280")
+workers = int(os.environ.get("SERVIDOR_WORKERS", "1"))
+threads = int(os.environ.get("SERVIDOR_HILOS", "8"))
+worker_class = "gthread"
+
+# Carga la app (y el modelo OCR, ver wsgi.py) en el maestro antes del fork
+preload_app = True
+
+# Segundos sin latido antes de matar un worker, y de gracia al apagar (SIGTERM)
+timeout = int(os.environ.get("SERVIDOR_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("SERVIDOR_GRACIA", "30"))
+keepalive = 5
+
+# Procesos del motor de lotes: los núcleos repartidos entre los workers, para
+# que subir SERVIDOR_WORKERS no multiplique los procesos con OCR
+os.environ.setdefault("LOTES_WORKERS", str(max(1, (os.cpu_count() or 2) // max(1, workers))))
+
+# La salida de los registros la maneja registro.py (LOG_NIVEL, LOG_FORMATO)
+accesslog = os.environ.get("SERVIDOR_ACCESSLOG") or None
+
+def post_fork(server, worker):
+    # El hilo del registro no sobrevive al fork: cada worker arma el suyo
+    from registro import configurar_registro
+    configurar_registro()
+
+def worker_exit(server, worker):
+    # Apagado ordenado: terminar el pool de procesos y vaciar la cola de registros
+    from lotes import obtener_motor_lotes
+    from registro import detener_registro
+    obtener_motor_lotes().cerrar()
+    detener_registro()
@@ -0,0 +1,290 @@
+"""
+Ingesta masiva de recibos desde carpetas, reanudable.
+
+Recorre las carpetas indicadas (con subcarpetas), pasa cada PDF por el
+mismo pipeline que /api/batch_upload (motor de lotes: detección del
+servicio, extractor, cache por contenido) repartido en --workers procesos,
+y escribe cada resultado apenas termina en --salida: JSON Lines
+(.jsonl/.ndjson) o CSV (.csv, mismas columnas que /api/export).
+
+El checkpoint (por defecto <salida>.checkpoint) es un JSON por línea con
+la ruta, tamaño, fecha de modificación y estado de cada archivo terminado;
+se escribe después de su resultado. Al volver a correr con la misma salida
+se saltan los archivos ya terminados que no cambiaron, así una corrida
+cortada (Ctrl+C, caída) sigue donde quedó: lo más que puede pasar es un
+recibo repetido en la salida, nunca uno perdido. Los que terminaron con
+error se reintentan solo con --reintentar-errores.
+
+--reextraer vuelve a correr solo la extracción de campos sobre todo el
+archivo: el texto de cada PDF y, para las lecturas OCR, las guardadas en la
+cache OCR (cache_ocr.py), sin rasterizar ni cargar el modelo. Sirve para
+aplicar un cambio en los patrones a los recibos históricos en segundos; los
+resultados reemplazan --salida y se guardan en la cache de resultados.
+
+Uso:
+    python ingesta.py carpeta [carpeta ...] --salida recibos.jsonl [--workers 4]
+    python ingesta.py ../Recibos --salida recibos.csv --lote ingesta-2024   # y al almacén
+    python ingesta.py ../Recibos --salida recibos.jsonl --reintentar-errores
+    python ingesta.py ../Recibos --salida recibos_v2.jsonl --reextraer
+"""
+import os
+import sys
+import csv
+import json
+import time
+import fnmatch
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from lotes import MotorLotes, LOTES_WORKERS
+from documento import DocumentoPDF
+from procesamiento import procesar_recibo, resultado_error
+from cache_resultados import CacheResultados, obtener_cache
+from exportacion import COLUMNAS_CSV
+from recibo import Recibo
+from registro import configurar_registro
+
+log = logging.getLogger(__name__)
+
+# Archivos que se le pasan juntos al motor; también cada cuánto se informa
+# el avance y se asegura el checkpoint en disco
+INGESTA_BLOQUE = int(os.environ.get("INGESTA_BLOQUE", "100"))
+INGESTA_PATRON = os.environ.get("INGESTA_PATRON", "*.pdf")
+
+# --------------------------
+# ARCHIVOS A PROCESAR
+# --------------------------
+def recorrer(carpetas, patron=INGESTA_PATRON):
+    """(ruta absoluta, nombre) de cada archivo que coincide, en orden estable.
+
+    El nombre es la ruta relativa a la carpeta, con la carpeta delante
+    (Recibos/Gas/x.pdf): distingue archivos homónimos de subcarpetas
+    distintas y conserva la pista del servicio que dan los nombres de carpeta.
+    """
+    for carpeta in carpetas:
+        base = os.path.abspath(carpeta)
+        if os.path.isfile(base):
+            yield base, os.path.basename(base)
+            continue
+        raiz = os.path.basename(os.path.normpath(base))
+        for directorio, subcarpetas, nombres in os.walk(base):
+            subcarpetas.sort()
+            for nombre in sorted(nombres):
+                if fnmatch.fnmatch(nombre.lower(), patron.lower()):
+                    ruta = os.path.join(directorio, nombre)
+                    yield ruta, os.path.join(raiz, os.path.relpath(ruta, base)).replace(os.sep, "/")
+
+class Checkpoint:
+    """Archivos ya terminados: {ruta: (tamaño, mtime_ns, estado)}, en un JSON por línea"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.terminados = {}
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        marca = json.loads(linea)
+                    except ValueError:
+                        continue        # la última línea de una corrida cortada
+                    self.terminados[marca["ruta"]] = (marca["tam"], marca["mtime"], marca["estado"])
+        self._archivo = open(ruta, "a", encoding="utf-8")
+
+    def pendiente(self, ruta, estado_archivo, reintentar_errores=False):
+        marca = self.terminados.get(ruta)
+        if marca is None or marca[:2] != (estado_archivo.st_size, estado_archivo.st_mtime_ns):
+            return True
+        return reintentar_errores and marca[2] == "error"
+
+    def marcar(self, ruta, estado_archivo, estado):
+        self.terminados[ruta] = (estado_archivo.st_size, estado_archivo.st_mtime_ns, estado)
+        self._archivo.write(json.dumps({"ruta": ruta, "tam": estado_archivo.st_size,
+                                       "mtime": estado_archivo.st_mtime_ns, "estado": estado}) + "\n")
+        self._archivo.flush()
+
+    def asegurar(self):
+        os.fsync(self._archivo.fileno())
+
+    def cerrar(self):
+        self._archivo.close()
+
+# --------------------------
+# SALIDAS
+# --------------------------
+class SalidaJSONL:
+    """Un recibo JSON por línea, agregado al final del archivo (o en uno nuevo)"""
+
+    def __init__(self, ruta, agregar=True):
+        self._archivo = open(ruta, "a" if agregar else "w", encoding="utf-8")
+
+    def escribir(self, datos):
+        self._archivo.write(json.dumps(datos, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+
+    def asegurar(self):
+        os.fsync(self._archivo.fileno())
+
+    def cerrar(self):
+        self._archivo.close()
+
+class SalidaCSV(SalidaJSONL):
+    """Filas con las columnas de la exportación; BOM y encabezado solo en un archivo nuevo"""
+
+    def __init__(self, ruta, agregar=True):
+        nuevo = not agregar or not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+        self._archivo = open(ruta, "a" if agregar else "w", encoding="utf-8", newline="")
+        self._escritor = csv.writer(self._archivo, lineterminator="\r\n")
+        if nuevo:
+            self._archivo.write("\ufeff")
+            self._escritor.writerow([encabezado for encabezado, _ in COLUMNAS_CSV])
+
+    def escribir(self, datos):
+        self._escritor.writerow([valor(datos) for _, valor in COLUMNAS_CSV])
+        self._archivo.flush()
+
+def abrir_salida(ruta, agregar=True):
+    if ruta.lower().endswith(".csv"):
+        return SalidaCSV(ruta, agregar)
+    return SalidaJSONL(ruta, agregar)
+
+# --------------------------
+# INGESTA
+# --------------------------
+def ingerir(carpetas, salida, checkpoint, workers=LOTES_WORKERS, bloque=INGESTA_BLOQUE,
+            patron=INGESTA_PATRON, reintentar_errores=False, lote=None):
+    """Procesa lo pendiente de las carpetas y devuelve un resumen (dict)"""
+    bloque = max(1, bloque)
+    marcas = Checkpoint(checkpoint)
+    pendientes = []
+    saltados = 0
+    for ruta, nombre in recorrer(carpetas, patron):
+        estado_archivo = os.stat(ruta)
+        if marcas.pendiente(ruta, estado_archivo, reintentar_errores):
+            pendientes.append((ruta, nombre, estado_archivo))
+        else:
+            saltados += 1
+    log.info("Ingesta: %d archivos pendientes, %d ya procesados", len(pendientes), saltados)
+
+    almacen = None
+    if lote:
+        from almacen import obtener_almacen
+        almacen = obtener_almacen()
+
+    escritor = abrir_salida(salida)
+    motor = MotorLotes(workers=workers)
+    resumen = {"pendientes": len(pendientes), "saltados": saltados, "procesados": 0,
+               "errores": 0, "interrumpido": False}
+    inicio = time.perf_counter()
+    try:
+        for desde in range(0, len(pendientes), bloque):
+            trozo = pendientes[desde:desde + bloque]
+
+            # Lo llama el motor en este hilo, en cuanto termina cada archivo
+            def al_terminar(i, datos, clave):
+                ruta, _, estado_archivo = trozo[i]
+                recibo = Recibo.desde_datos(datos)
+                escritor.escribir(recibo.a_dict())
+                if almacen is not None:
+                    almacen.guardar(recibo, lote, sha256=CacheResultados.huella(clave))
+                error = recibo.error is not None
+                marcas.marcar(ruta, estado_archivo, "error" if error else "ok")
+                resumen["procesados"] += 1
+                resumen["errores"] += error
+
+            motor.procesar([(ruta, nombre) for ruta, nombre, _ in trozo], al_terminar=al_terminar)
+            escritor.asegurar()
+            marcas.asegurar()
+
+            transcurrido = time.perf_counter() - inicio
+            log.info("Ingesta: %d/%d recibos (%d con error), %.1f recibos/s",
+                     resumen["procesados"], len(pendientes), resumen["errores"],
+                     resumen["procesados"] / transcurrido if transcurrido else 0.0)
+    except KeyboardInterrupt:
+        resumen["interrumpido"] = True
+        log.warning("Ingesta interrumpida: %d/%d recibos en %s; se reanuda con el mismo comando",
+                    resumen["procesados"], len(pendientes), checkpoint)
+    finally:
+        motor.cerrar(esperar=not resumen["interrumpido"])
+        escritor.cerrar()
+        marcas.cerrar()
+
+    resumen["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resumen
+
+# --------------------------
+# RE-EXTRACCIÓN (sin OCR)
+# --------------------------
+def _inicializar_reextraccion():
+    """Workers de re-extracción: las lecturas OCR solo salen de la cache"""
+    import Ing_Soft_P2
+    Ing_Soft_P2.OCR_SOLO_CACHE = True
+    configurar_registro()
+
+def _reextraer(ruta, nombre):
+    """(clave de la cache de resultados, datos) de un PDF"""
+    try:
+        documento = DocumentoPDF.desde_ruta(ruta, nombre)
+        return CacheResultados.clave(documento.contenido), procesar_recibo(documento)
+    except Exception as e:
+        log.exception("Error re-extrayendo %s", nombre, extra={"archivo": nombre})
+        return None, resultado_error(nombre, str(e))
+
+def reextraer(carpetas, salida, workers=LOTES_WORKERS, patron=INGESTA_PATRON):
+    """Repite la extracción de campos de todo el archivo sin OCR; devuelve un resumen (dict)"""
+    archivos = list(recorrer(carpetas, patron))
+    log.info("Re-extracción: %d archivos", len(archivos))
+    cache = obtener_cache()
+    escritor = abrir_salida(salida, agregar=False)
+    resumen = {"archivos": len(archivos), "procesados": 0, "errores": 0, "interrumpido": False}
+    inicio = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=max(1, workers), initializer=_inicializar_reextraccion)
+    try:
+        rutas, nombres = zip(*archivos) if archivos else ((), ())
+        for clave, datos in pool.map(_reextraer, rutas, nombres, chunksize=8):
+            escritor.escribir(Recibo.desde_datos(datos).a_dict())
+            if clave is not None:
+                cache.guardar(clave, datos)
+            resumen["procesados"] += 1
+            resumen["errores"] += 'error' in datos
+    except KeyboardInterrupt:
+        resumen["interrumpido"] = True
+        log.warning("Re-extracción interrumpida: %d/%d recibos", resumen["procesados"], len(archivos))
+    finally:
+        pool.shutdown(wait=not resumen["interrumpido"], cancel_futures=True)
+        escritor.cerrar()
+
+    resumen["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resumen
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta masiva y reanudable de recibos desde carpetas")
+    parser.add_argument("carpetas", nargs="+", help="Carpetas (se recorren con subcarpetas) o archivos")
+    parser.add_argument("--salida", required=True, help="Resultados: .jsonl/.ndjson o .csv (se agregan al final)")
+    parser.add_argument("--checkpoint", help="Archivos terminados (por defecto <salida>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=LOTES_WORKERS, help="Procesos del motor de lotes")
+    parser.add_argument("--bloque", type=int, default=INGESTA_BLOQUE, help="Archivos por envío al motor")
+    parser.add_argument("--patron", default=INGESTA_PATRON, help="Nombres de archivo a procesar (fnmatch)")
+    parser.add_argument("--reintentar-errores", action="store_true",
+                        help="Vuelve a procesar los que terminaron con error")
+    parser.add_argument("--lote", help="Además guarda los recibos en el almacén con este lote")
+    parser.add_argument("--reextraer", action="store_true",
+                        help="Solo extracción de campos, con las lecturas de la cache OCR (reemplaza --salida)")
+    args = parser.parse_args()
+    if args.reextraer and args.lote:
+        parser.error("--reextraer no guarda en el almacén: no se puede usar con --lote")
+
+    configurar_registro()
+    if args.reextraer:
+        resumen = reextraer(args.carpetas, args.salida, workers=args.workers, patron=args.patron)
+        print(json.dumps(resumen, ensure_ascii=False))
+        return 130 if resumen["interrumpido"] else 0
+
+    resumen = ingerir(args.carpetas, args.salida, args.checkpoint or args.salida + ".checkpoint",
+                      workers=args.workers, bloque=args.bloque, patron=args.patron,
+                      reintentar_errores=args.reintentar_errores, lote=args.lote)
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 130 if resumen["interrumpido"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+import os
+import time
+import logging
+import threading
+import weakref
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+from procesamiento import procesar_recibo_medido, resultado_error, RequiereOCR
+from documento import DocumentoPDF
+from extractores import obtener_registro_extractores
+from cache_resultados import obtener_cache
+from metricas import obtener_metricas
+from registro import configurar_registro
+
+log = logging.getLogger(__name__)
+
+# Configuración del motor de lotes
+LOTES_WORKERS = int(os.environ.get("LOTES_WORKERS", os.cpu_count() or 2))
+LOTES_TIMEOUT = float(os.environ.get("LOTES_TIMEOUT", "180"))  # segundos por archivo
+# Archivos que un worker procesa a la vez: sus páginas para OCR viajan juntas
+# en un lote de EasyOCR (ver ocr_lotes.py). 1 = un archivo por tarea. Cada
+# archivo del grupo tiene su propio LOTES_TIMEOUT.
+LOTES_GRUPO = int(os.environ.get("LOTES_GRUPO", os.environ.get("OCR_LOTE_TAMANO", "4")))
+# Recibos cuyo extractor no usa OCR y cuesta hasta LOTES_COSTO_HILO_MS (según
+# extractores.py y el nombre del archivo) se procesan en LOTES_HILOS hilos
+# del servidor y no ocupan un worker con OCR. 0 = todo al pool de procesos.
+LOTES_HILOS = int(os.environ.get("LOTES_HILOS", "2"))
+LOTES_COSTO_HILO_MS = float(os.environ.get("LOTES_COSTO_HILO_MS", "200"))
+
+# Segundos extra que el motor da a un grupo para devolver sus resultados
+# parciales cuando uno de sus archivos agota el tiempo dentro del worker
+_MARGEN_GRUPO = 5.0
+
+def _texto_timeout(segundos):
+    return f"Tiempo de espera agotado ({segundos:g}s)"
+
+# --------------------------
+# FUNCIONES DEL WORKER (se ejecutan en otro proceso)
+# --------------------------
+# Canal por el que el worker avisa al motor qué tarea empieza (ver _leer_avisos)
+_avisos = None
+
+def _inicializar_worker(avisos=None):
+    """Cada worker arma su registro y calienta su propio lector OCR una sola vez"""
+    global _avisos
+    from Ing_Soft_P2 import precargar_ocr
+    _avisos = avisos
+    configurar_registro()
+    precargar_ocr()
+
+def _procesar_en_worker(fuente, filename):
+    """Procesa un archivo aislando cualquier error en su propio resultado.
+
+    Devuelve (resultado, tiempos por etapa): las métricas se registran en el
+    proceso del servidor, no en el worker.
+    """
+    try:
+        return procesar_recibo_medido(DocumentoPDF.desde_fuente(fuente, filename))
+    except Exception as e:
+        log.exception("Error procesando %s", filename, extra={"archivo": filename})
+        return resultado_error(filename, str(e)), None
+
+def _procesar_grupo_en_worker(tarea, archivos, timeout):
+    """Procesa varios archivos en hilos del mismo worker.
+
+    El texto y la rasterización avanzan en paralelo y las páginas que llegan
+    al OCR se juntan en el agrupador del proceso, así el modelo corre una vez
+    por lote y no una vez por recibo.
+
+    Devuelve (pares, colgado). Cada archivo tiene `timeout` segundos desde
+    que el worker toma la tarea: los que no terminan vuelven como error junto
+    con los resultados de los demás, y colgado=True indica que su hilo sigue
+    ocupado en este proceso. Un grupo de un archivo no usa hilos; su timeout
+    lo vigila el motor.
+    """
+    if _avisos is not None:
+        _avisos.put(tarea)
+    if len(archivos) == 1:
+        return [_procesar_en_worker(*archivos[0])], False
+
+    hilos = ThreadPoolExecutor(max_workers=len(archivos))
+    futuros = [hilos.submit(_procesar_en_worker, *archivo) for archivo in archivos]
+    wait(futuros, timeout=timeout)
+    hilos.shutdown(wait=False)
+    pares = []
+    colgado = False
+    for futuro, (_, filename) in zip(futuros, archivos):
+        if futuro.done():
+            pares.append(futuro.result())
+        else:
+            colgado = True
+            log.warning("%s superó %gs", filename, timeout, extra={"archivo": filename})
+            pares.append((resultado_error(filename, _texto_timeout(timeout)), None))
+    return pares, colgado
+
+# --------------------------
+# RECIBOS BARATOS (hilos del proceso del servidor)
+# --------------------------
+def _procesar_en_hilo(fuente, filename):
+    """Procesa en un hilo del servidor un recibo que no debería necesitar OCR.
+
+    Devuelve ([(resultado, tiempos)], False) como un grupo de un archivo, o
+    None si el extractor que le tocó puede usar OCR (va entonces al pool de
+    procesos).
+    """
+    try:
+        return [procesar_recibo_medido(DocumentoPDF.desde_fuente(fuente, filename), permitir_ocr=False)], False
+    except RequiereOCR:
+        return None
+    except Exception as e:
+        log.exception("Error procesando %s", filename, extra={"archivo": filename})
+        return [(resultado_error(filename, str(e)), None)], False
+
+# --------------------------
+# MOTOR DE LOTES
+# --------------------------
+def borrar_temporales(archivos):
+    """Borra los temporales en disco de [(fuente, filename), ...]; los bytes no dejan nada"""
+    for fuente, _ in archivos:
+        if isinstance(fuente, str) and os.path.exists(fuente):
+            os.remove(fuente)
+
+class MotorLotes:
+    """Reparte PDFs entre un pool de procesos con OCR caliente.
+
+    El pool se crea en el primer lote y se reutiliza entre peticiones, así
+    cada worker carga EasyOCR una sola vez. Cada tarea lleva un grupo de
+    hasta `grupo` archivos para que su OCR se haga en lote. Los recibos
+    baratos sin OCR (gas, JAPAM) van a unos pocos hilos del proceso. Los
+    resultados se devuelven en el orden de envío y cada archivo del pool
+    tiene su propio timeout, contado desde que un worker lo empieza; los
+    errores de un archivo no afectan a los demás.
+
+    El pool es compartido por todas las peticiones: si una lo descarta por
+    un worker colgado, las tareas de las demás que se pierdan al terminarlo
+    se reenvían al pool nuevo en vez de fallar.
+    """
+
+    def __init__(self, workers=LOTES_WORKERS, timeout=LOTES_TIMEOUT, grupo=LOTES_GRUPO,
+                 hilos=LOTES_HILOS, costo_hilo_ms=LOTES_COSTO_HILO_MS):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.grupo = max(1, grupo)
+        self.hilos = max(0, hilos)
+        self.costo_hilo_ms = costo_hilo_ms
+        self._pool = None
+        self._en_curso = {}     # pool -> futuros enviados que no han terminado
+        self._terminados = weakref.WeakSet()   # pools que terminó el motor tras drenarlos
+        self._avisos = {}       # pool -> cola donde sus workers avisan qué tarea empiezan
+        self._avisos_lock = threading.Lock()
+        self._inicios = {}      # tarea -> momento (monotonic) en que un worker la empezó
+        self._tareas = itertools.count()
+        self._hilos = None
+        self._lock = threading.Lock()
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                avisos = multiprocessing.SimpleQueue()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_inicializar_worker,
+                    initargs=(avisos,)
+                )
+                self._en_curso[self._pool] = set()
+                self._avisos[self._pool] = avisos
+            return self._pool
+
+    def _obtener_hilos(self):
+        with self._lock:
+            if self._hilos is None:
+                self._hilos = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="lotes-texto")
+            return self._hilos
+
+    def _va_a_hilo(self, filename):
+        """Por la pista del nombre: extractor sin OCR y más barato que el límite"""
+        if not self.hilos:
+            return False
+        extractor = obtener_registro_extractores().por_nombre(filename)
+        return (extractor is not None and not extractor.usa_ocr
+                and extractor.costo_ms <= self.costo_hilo_ms)
+
+    def _enviar(self, archivos):
+        """Envía un grupo al pool vigente; devuelve (futuro, pool, id de la tarea)"""
+        tarea = next(self._tareas)
+        while True:
+            pool = self._obtener_pool()
+            try:
+                futuro = pool.submit(_procesar_grupo_en_worker, tarea, archivos, self.timeout)
+            except (BrokenProcessPool, RuntimeError):
+                # Roto por un worker caído o ya cerrado: se usa uno nuevo
+                self._retirar_pool(pool)
+                continue
+            with self._lock:
+                en_curso = self._en_curso.get(pool)
+            if en_curso is not None:
+                en_curso.add(futuro)
+                futuro.add_done_callback(en_curso.discard)
+            return futuro, pool, tarea
+
+    def _leer_avisos(self, pools):
+        """Anota cuándo empezó un worker cada tarea que avisó.
+
+        El worker escribe el aviso antes de devolver el resultado, así que
+        leerlo después de wait() siempre encuentra el de las tareas que ya
+        terminaron. La hora es la de la lectura (cada 0.5 s como mucho).
+        """
+        ahora = time.monotonic()
+        with self._avisos_lock:
+            for pool in pools:
+                avisos = self._avisos.get(pool)
+                while avisos is not None and not avisos.empty():
+                    self._inicios.setdefault(avisos.get(), ahora)
+
+    def _retirar_pool(self, pool, colgados=()):
+        """Descarta un pool con workers colgados o caídos.
+
+        Las tareas nuevas van a un pool nuevo al momento. Los procesos del
+        viejo se terminan cuando acaban las tareas que otras peticiones ya
+        tenían en él (como mucho `timeout` segundos); las que no alcancen
+        fallan con el pool y su petición las reenvía.
+        """
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            en_curso = self._en_curso.pop(pool, set()) - set(colgados)
+        threading.Thread(target=self._drenar_y_terminar, args=(pool, en_curso),
+                         name="lotes-drenar", daemon=True).start()
+
+    def _drenar_y_terminar(self, pool, en_curso):
+        wait(en_curso, timeout=self.timeout)
+        self._terminados.add(pool)
+        self._terminar(pool)
+
+    def _terminar(self, pool):
+        # Nadie vuelve a leer sus avisos: un worker terminado a medio escribir
+        # dejaría la cola con un mensaje incompleto
+        with self._avisos_lock:
+            self._avisos.pop(pool, None)
+        # shutdown() no detiene tareas en curso: hay que terminar los procesos.
+        # Sin cancel_futures las tareas encoladas también fallan con
+        # BrokenProcessPool; cancelarlas no despierta a quien las espera.
+        procesos = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False)
+        for proceso in procesos:
+            if proceso.is_alive():
+                proceso.terminate()
+
+    def _agrupar(self, faltantes):
+        """Parte los índices en grupos sin dejar workers ociosos en lotes chicos"""
+        por_worker = -(-len(faltantes) // self.workers)
+        tamano = max(1, min(self.grupo, por_worker))
+        return [faltantes[i:i + tamano] for i in range(0, len(faltantes), tamano)]
+
+    def procesar(self, archivos, al_terminar=None):
+        """Procesa [(fuente, filename), ...] y devuelve los resultados en orden.
+
+        `fuente` son los bytes del PDF o la ruta de un archivo en disco; los
+        bytes viajan tal cual al worker, sin pasar por uploads/.
+
+        Si se indica, al_terminar(indice, resultado, clave) se llama en cuanto
+        cada archivo termina (en orden de finalización), para poder
+        transmitirlos; `clave` es la de la cache de resultados (ver
+        CacheResultados.huella para el SHA-256 del contenido).
+        """
+        if not archivos:
+            return []
+
+        # Los PDFs ya vistos (mismo contenido) salen de la cache sin ir al pool
+        cache = obtener_cache()
+        metricas = obtener_metricas()
+        resultados = [None] * len(archivos)
+        claves = []
+        faltantes = []
+        for i, (fuente, filename) in enumerate(archivos):
+            if isinstance(fuente, (bytes, bytearray)):
+                claves.append(cache.clave(fuente))
+            else:
+                with open(fuente, "rb") as f:
+                    claves.append(cache.clave(f.read()))
+            datos = cache.obtener(claves[i])
+            if datos is None:
+                faltantes.append(i)
+                continue
+            datos['filename'] = filename
+            resultados[i] = datos
+            metricas.registrar_recibo(datos, origen="cache")
+            if al_terminar:
+                al_terminar(i, datos, claves[i])
+
+        if not faltantes:
+            return resultados
+
+        grupos = {}
+        en_hilo = set()
+        pool_de = {}        # futuro -> pool al que se envió
+        tarea_de = {}       # futuro -> id de la tarea (para su aviso de inicio)
+
+        def enviar_al_pool(indices):
+            nuevos = []
+            for grupo in self._agrupar(indices):
+                futuro, pool_de[futuro], tarea_de[futuro] = self._enviar([archivos[i] for i in grupo])
+                grupos[futuro] = grupo
+                nuevos.append(futuro)
+            return nuevos
+
+        # Los baratos sin OCR a los hilos; si al leerlos resultan ser de un
+        # extractor con OCR, vuelven al pool
+        al_pool = []
+        for i in faltantes:
+            if self._va_a_hilo(archivos[i][1]):
+                futuro = self._obtener_hilos().submit(_procesar_en_hilo, *archivos[i])
+                grupos[futuro] = [i]
+                en_hilo.add(futuro)
+            else:
+                al_pool.append(i)
+        if al_pool:
+            enviar_al_pool(al_pool)
+
+        # El reloj de cada tarea arranca cuando su worker avisa que la empezó,
+        # no al enviarla ni al pasar a la cola interna del pool (running()).
+        # Dentro de un grupo el worker corta cada archivo a los `timeout`
+        # segundos; el motor solo espera un poco más por sus parciales.
+        pendientes = set(grupos)
+
+        while pendientes:
+            terminados, pendientes = wait(pendientes, timeout=0.5, return_when=FIRST_COMPLETED)
+            # wait() no ve los futuros cancelados por un shutdown del pool
+            cancelados = {futuro for futuro in pendientes if futuro.cancelled()}
+            terminados |= cancelados
+            pendientes -= cancelados
+            self._leer_avisos({pool_de[futuro] for futuro in pendientes | terminados if futuro in pool_de})
+
+            for futuro in terminados:
+                grupo = grupos[futuro]
+                self._inicios.pop(tarea_de.get(futuro), None)
+                colgado = False
+                try:
+                    resultado_grupo = futuro.result()
+                except Exception as e:
+                    if futuro not in en_hilo:
+                        pool = pool_de[futuro]
+                        # Lo terminó el motor por un worker colgado de otro
+                        # grupo: este grupo no tuvo la culpa y va al pool nuevo
+                        if pool in self._terminados and isinstance(e, (BrokenProcessPool, CancelledError)):
+                            log.warning("Pool reiniciado con %d archivos en curso; se reenvían", len(grupo))
+                            pendientes.update(enviar_al_pool(grupo))
+                            continue
+                        self._retirar_pool(pool)
+                    log.error("Worker falló con %d archivos: %s", len(grupo), e)
+                    resultado_grupo = [(resultado_error(archivos[i][1], f"Worker falló: {e}"), None) for i in grupo], False
+                if resultado_grupo is None:
+                    pendientes.update(enviar_al_pool(grupo))
+                    continue
+                pares, colgado = resultado_grupo
+                if colgado:
+                    # El worker devolvió el grupo pero un hilo suyo sigue ocupado
+                    log.warning("Un archivo de un grupo de %d superó %gs; se reinicia el pool",
+                                len(grupo), self.timeout)
+                    self._retirar_pool(pool_de[futuro])
+                # (resultado, tiempos por etapa); los errores no se cachean
+                for i, (resultado, tiempos) in zip(grupo, pares):
+                    resultados[i] = resultado
+                    cache.guardar(claves[i], resultado)
+                    metricas.registrar_recibo(resultado, tiempos)
+                if al_terminar:
+                    for i in grupo:
+                        al_terminar(i, resultados[i], claves[i])
+
+            # Los hilos no se pueden cortar: el timeout es solo para el pool
+            ahora = time.monotonic()
+            for futuro in list(pendientes - en_hilo):
+                inicio = self._inicios.get(tarea_de[futuro])
+                if inicio is None:
+                    continue
+                limite = self.timeout if len(grupos[futuro]) == 1 else self.timeout + _MARGEN_GRUPO
+                if ahora - inicio > limite:
+                    pendientes.discard(futuro)
+                    self._inicios.pop(tarea_de[futuro], None)
+                    self._retirar_pool(pool_de[futuro], colgados=[futuro])
+                    log.warning("Grupo de %d archivos superó %gs; se reinicia el pool",
+                                len(grupos[futuro]), limite)
+                    for i in grupos[futuro]:
+                        resultados[i] = resultado_error(archivos[i][1], _texto_timeout(self.timeout))
+                        metricas.registrar_recibo(resultados[i])
+                        if al_terminar:
+                            al_terminar(i, resultados[i], claves[i])
+
+        return resultados
+
+    def cerrar(self, esperar=True):
+        """Cierra el pool y los hilos; con esperar=False termina los workers en curso (Ctrl+C)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            hilos, self._hilos = self._hilos, None
+            self._en_curso.clear()
+        if pool is not None:
+            if esperar:
+                pool.shutdown(wait=True, cancel_futures=True)
+                with self._avisos_lock:
+                    self._avisos.pop(pool, None)
+            else:
+                self._terminar(pool)
+        if hilos is not None:
+            hilos.shutdown(wait=esperar, cancel_futures=True)
+
+_motor = None
+_motor_lock = threading.Lock()
+
+def obtener_motor_lotes():
+    """Motor de lotes compartido por todo el proceso del servidor"""
+    global _motor
+    with _motor_lock:
+        if _motor is None:
+            _motor = MotorLotes()
+        return _motor
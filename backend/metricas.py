@@ -0,0 +1,194 @@
+import bisect
+import threading
+
+from Ing_Soft_P2 import es_no_extraido
+from procesamiento import REQUIRED_FIELDS
+from tiempos import ETAPAS
+
+# ================================
+# MÉTRICAS (formato de texto de Prometheus)
+# ================================
+# Contadores e histogramas en memoria del proceso del servidor. Los workers
+# del motor de lotes no registran nada: devuelven los tiempos de cada recibo
+# junto con el resultado y el servidor los registra al recibirlos.
+
+# Límites de los histogramas, en segundos
+LIMITES_ETAPA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LIMITES_RECIBO = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+LIMITES_HTTP = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Campos cuyo "NO EXTRAÍDO" se cuenta por servicio
+CAMPOS_VIGILADOS = [c for c in REQUIRED_FIELDS if c != 'service_type']
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in pares) + "}"
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+class Contador:
+    """Contador monótono por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def valor(self, *valores):
+        with self._lock:
+            return self._valores.get(valores, 0)
+
+    def exponer(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for etiquetas, valor in valores:
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}")
+        return lineas
+
+class Histograma:
+    """Histograma acumulado (buckets `le`, suma y cuenta) por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_ETAPA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(sorted(limites))
+        self._series = {}       # etiquetas -> [cuentas por bucket, suma, cuenta]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        posicion = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def cuenta(self, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            return serie[2] if serie else 0
+
+    def exponer(self):
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for etiquetas, (buckets, suma, cuenta) in series:
+            acumulado = 0
+            for limite, n in zip(self.limites + (float("inf"),), buckets):
+                acumulado += n
+                le = _etiquetas(self.etiquetas, etiquetas, [("le", _numero(limite))])
+                lineas.append(f"{self.nombre}_bucket{le} {acumulado}")
+            base = _etiquetas(self.etiquetas, etiquetas)
+            lineas.append(f"{self.nombre}_sum{base} {_numero(round(suma, 6))}")
+            lineas.append(f"{self.nombre}_count{base} {cuenta}")
+        return lineas
+
+class Medidor:
+    """Valor instantáneo que se lee al exponer: funcion() -> {etiquetas: valor}"""
+
+    def __init__(self, nombre, ayuda, funcion, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.etiquetas = tuple(etiquetas)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        try:
+            valores = self.funcion()
+        except Exception:
+            valores = {}
+        for etiquetas, valor in sorted(valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}")
+        return lineas
+
+# --------------------------
+# MÉTRICAS DEL SERVIDOR
+# --------------------------
+class Metricas:
+    """Métricas del pipeline de recibos y de la API"""
+
+    def __init__(self):
+        self.recibos = Contador(
+            "recibos_procesados_total", "Recibos procesados por servicio, resultado (ok/error) y origen (extraccion/cache)",
+            ("servicio", "resultado", "origen"))
+        self.no_extraidos = Contador(
+            "recibos_campos_no_extraidos_total", "Campos que quedaron sin extraer, por servicio y campo",
+            ("servicio", "campo"))
+        self.duracion_recibo = Histograma(
+            "recibo_duracion_segundos", "Tiempo total de extracción de un recibo", ("servicio",), LIMITES_RECIBO)
+        self.duracion_etapa = Histograma(
+            "recibo_etapa_segundos", "Tiempo de cada etapa del pipeline de un recibo (tiempos.py)",
+            ("etapa",), LIMITES_ETAPA)
+        self.http_duracion = Histograma(
+            "http_duracion_segundos", "Duración de las peticiones HTTP por ruta", ("ruta", "metodo"), LIMITES_HTTP)
+        self.http_solicitudes = Contador(
+            "http_solicitudes_total", "Peticiones HTTP por ruta, método y código", ("ruta", "metodo", "codigo"))
+        self._medidores = []
+
+    def agregar_medidor(self, nombre, ayuda, funcion, etiquetas=()):
+        """Registra un valor que se calcula al exponer (cache, colas, OCR cargado...)"""
+        self._medidores.append(Medidor(nombre, ayuda, funcion, etiquetas))
+
+    def registrar_recibo(self, datos, tiempos=None, origen="extraccion"):
+        """Cuenta un resultado de procesar_recibo; `tiempos` en segundos por etapa más 'total'"""
+        servicio = datos.get("service_type") or "desconocido"
+        resultado = "error" if datos.get("error") else "ok"
+        self.recibos.incrementar(servicio, resultado, origen)
+        if origen != "extraccion":
+            return
+
+        # Un error marca todo como ERROR: no dice nada de campos puntuales
+        if resultado == "ok":
+            for campo in CAMPOS_VIGILADOS:
+                if es_no_extraido(datos.get(campo)):
+                    self.no_extraidos.incrementar(servicio, campo)
+        if tiempos:
+            for etapa in ETAPAS:
+                if etapa in tiempos:
+                    self.duracion_etapa.observar(tiempos[etapa], etapa)
+            if "total" in tiempos:
+                self.duracion_recibo.observar(tiempos["total"], servicio)
+
+    def registrar_http(self, ruta, metodo, codigo, segundos):
+        self.http_duracion.observar(segundos, ruta, metodo)
+        self.http_solicitudes.incrementar(ruta, metodo, str(codigo))
+
+    def exposicion(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        lineas = []
+        for metrica in (self.recibos, self.no_extraidos, self.duracion_recibo, self.duracion_etapa,
+                        self.http_duracion, self.http_solicitudes, *self._medidores):
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+def obtener_metricas():
+    """Métricas compartidas por todo el proceso del servidor"""
+    global _metricas
+    with _metricas_lock:
+        if _metricas is None:
+            _metricas = Metricas()
+        return _metricas
@@ -0,0 +1,112 @@
+import time
+import threading
+
+class _Solicitud:
+    __slots__ = ('imagen', 'resultado', 'error', 'listo')
+
+    def __init__(self, imagen):
+        self.imagen = imagen
+        self.resultado = None
+        self.error = None
+        self.listo = threading.Event()
+
+class AgrupadorOCR:
+    """Junta las imágenes que piden OCR varios recibos y las pasa en un solo lote.
+
+    Cada llamada a leer() encola su imagen y espera. Un hilo dedicado toma
+    hasta `tamano` imágenes (o las que haya tras `espera` segundos desde la
+    primera) y las procesa con readtext_batched: el detector corre en lote y
+    el reconocedor usa lotes de `batch_reconocedor` recortes. Como solo ese
+    hilo usa el lector, el modelo nunca se llama en paralelo desde hilos de
+    Flask o del motor de lotes.
+    """
+
+    def __init__(self, obtener_lector, tamano=4, espera=0.25, batch_reconocedor=8):
+        self._obtener_lector = obtener_lector
+        self.tamano = max(1, tamano)
+        self.espera = max(0.0, espera)
+        self.batch_reconocedor = max(1, batch_reconocedor)
+        self._pendientes = []
+        self._condicion = threading.Condition()
+        self._hilo = None
+        self.lotes = 0
+        self.imagenes = 0
+
+    def leer(self, imagen):
+        """OCR de una imagen (numpy): lista de (bbox, texto, confianza) como readtext"""
+        return self.leer_varias([imagen])[0]
+
+    def leer_varias(self, imagenes):
+        """OCR de varias imágenes de un mismo recibo (p. ej. sus regiones), encoladas juntas"""
+        solicitudes = [_Solicitud(imagen) for imagen in imagenes]
+        with self._condicion:
+            self._iniciar_hilo()
+            self._pendientes.extend(solicitudes)
+            self._condicion.notify_all()
+        for solicitud in solicitudes:
+            solicitud.listo.wait()
+            if solicitud.error is not None:
+                raise solicitud.error
+        return [solicitud.resultado for solicitud in solicitudes]
+
+    def _iniciar_hilo(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._atender, name="ocr-lotes", daemon=True)
+            self._hilo.start()
+
+    def _siguiente_lote(self):
+        with self._condicion:
+            while not self._pendientes:
+                self._condicion.wait()
+            # Esperar a que se llene el lote, como mucho `espera` desde ahora
+            limite = time.monotonic() + self.espera
+            while len(self._pendientes) < self.tamano:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._condicion.wait(restante)
+            lote = self._pendientes[:self.tamano]
+            del self._pendientes[:self.tamano]
+            return lote
+
+    def _atender(self):
+        while True:
+            lote = self._siguiente_lote()
+            try:
+                self._ejecutar(lote)
+            finally:
+                for solicitud in lote:
+                    solicitud.listo.set()
+
+    def _ejecutar(self, lote):
+        try:
+            lector = self._obtener_lector()
+            if lector is None:
+                raise RuntimeError("OCR no disponible")
+        except Exception as e:
+            for solicitud in lote:
+                solicitud.error = e
+            return
+
+        # readtext_batched apila las imágenes: solo se juntan las del mismo tamaño
+        por_forma = {}
+        for solicitud in lote:
+            por_forma.setdefault(solicitud.imagen.shape, []).append(solicitud)
+
+        for grupo in por_forma.values():
+            try:
+                if len(grupo) == 1:
+                    resultados = [lector.readtext(grupo[0].imagen, detail=1, paragraph=False,
+                                                  batch_size=self.batch_reconocedor)]
+                else:
+                    resultados = lector.readtext_batched([s.imagen for s in grupo], detail=1,
+                                                         paragraph=False,
+                                                         batch_size=self.batch_reconocedor)
+                for solicitud, resultado in zip(grupo, resultados):
+                    solicitud.resultado = resultado
+            except Exception as e:
+                for solicitud in grupo:
+                    solicitud.error = e
+
+        self.lotes += 1
+        self.imagenes += len(lote)
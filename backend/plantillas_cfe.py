@@ -0,0 +1,148 @@
+import re
+from collections import namedtuple
+
+# ================================
+# PLANTILLAS DE RECIBOS CFE
+# ================================
+# Las cajas están en fracciones de la página (x0, y0, x1, y1), así valen a
+# cualquier DPI. Se midieron sobre los recibos digitales de Recibos/CFE
+# (página carta de 496 x 609 pt).
+
+# Relación ancho/alto de la página; otra proporción (escaneos, fotos) no usa plantilla
+PROPORCION_PAGINA = 496 / 609
+TOLERANCIA_PROPORCION = 0.02
+
+# Brillo medio (0-255, escala de grises) esperado en una caja de la página
+Firma = namedtuple("Firma", ["caja", "minimo", "maximo"])
+
+# Región a leer con OCR. `lector(lineas)` devuelve directamente los `campos`
+# de la región; sin lector su texto pasa a la especificación CAMPOS_CFE_OCR.
+Region = namedtuple("Region", ["nombre", "caja", "campos", "lector"])
+
+_MONTO = re.compile(r"^[$S]?\s*(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{2})?$")
+_NUMERO = re.compile(r"^\d{1,3}(?:,\d{3})*$")
+_BLOQUE = re.compile(r"^(?:BASICO|INTERMEDIO\d?|EXCEDENTE)\s+(\d{1,3}(?:,\d{3})*)\b", re.I)
+
+def _leer_titular(lineas):
+    """Primera línea del recuadro: titular; el resto: dirección"""
+    if not lineas:
+        return {}
+    datos = {'titular': lineas[0]}
+    if len(lineas) > 1:
+        datos['direccion'] = ' '.join(lineas[1:])
+    return datos
+
+def _leer_total(lineas):
+    """El importe grande del recuadro TOTAL A PAGAR (sin centavos)"""
+    for linea in lineas:
+        m = _MONTO.match(linea.replace(' ', ''))
+        if m:
+            return {'total': m.group(1).replace(',', '')}
+    return {}
+
+def _leer_bloques_kwh(lineas):
+    """Suma de los bloques (Basico, Intermedio, Excedente); sin bloques, el
+    total del periodo en la fila de Energía (kWh)"""
+    bloques = [_BLOQUE.match(linea) for linea in lineas]
+    bloques = [int(m.group(1).replace(',', '')) for m in bloques if m]
+    if bloques:
+        return {'consumo': str(sum(bloques))}
+    for i, linea in enumerate(lineas):
+        if 'KWH' in linea.upper():
+            # Las lecturas pueden quedar en la misma línea o en la siguiente
+            return _leer_total_kwh([linea]) or _leer_total_kwh(lineas[i + 1:i + 2])
+    return {}
+
+def _leer_total_kwh(lineas):
+    """Tabla de una sola fila: la última columna (Totales) es el consumo"""
+    for linea in reversed(lineas):
+        partes = linea.split()
+        if partes and _NUMERO.match(partes[-1]):
+            return {'consumo': partes[-1].replace(',', '')}
+    return {}
+
+class PlantillaCFE:
+    """Diseño de recibo CFE: cómo reconocerlo y qué regiones leer"""
+
+    def __init__(self, nombre, firma, regiones):
+        self.nombre = nombre
+        self.firma = tuple(firma)
+        self.regiones = tuple(regiones)
+
+    def coincide(self, imagen):
+        """Compara el brillo de las cajas de la firma (arreglo uint8 en grises)"""
+        for caja, minimo, maximo in self.firma:
+            brillo = float(recortar(imagen, caja).mean())
+            if not minimo <= brillo <= maximo:
+                return False
+        return True
+
+    def recortes(self, imagen):
+        return [(region, recortar(imagen, region.caja)) for region in self.regiones]
+
+    def fraccion_pixeles(self):
+        """Parte de la página que se manda al OCR"""
+        return sum((x1 - x0) * (y1 - y0) for _, (x0, y0, x1, y1), _, _ in self.regiones)
+
+def recortar(imagen, caja):
+    """Vista (sin copia) de la caja dentro de la página"""
+    x0, y0, x1, y1 = caja
+    alto, ancho = imagen.shape[:2]
+    return imagen[int(y0 * alto):int(y1 * alto), int(x0 * ancho):int(x1 * ancho)]
+
+# Doméstico (tarifas 01, 1C, 1F...): banner de la app a la derecha de los datos
+DOMESTICA = PlantillaCFE("domestica", firma=[
+    Firma((0.05, 0.440, 0.95, 0.455), 0, 160),     # encabezado verde de la tabla de consumo
+    Firma((0.05, 0.345, 0.95, 0.355), 170, 255),
+    Firma((0.47, 0.190, 0.94, 0.420), 0, 180),     # banner
+], regiones=[
+    Region("titular", (0.040, 0.104, 0.460, 0.213), ('titular', 'direccion'), _leer_titular),
+    Region("total", (0.457, 0.104, 0.810, 0.171), ('total',), _leer_total),
+    Region("datos", (0.040, 0.213, 0.460, 0.425), (), None),
+    Region("consumo", (0.040, 0.434, 0.945, 0.531), ('consumo',), _leer_bloques_kwh),
+])
+
+# Comercial (PDBT): datos en dos columnas y tabla de consumo más arriba
+COMERCIAL = PlantillaCFE("comercial", firma=[
+    Firma((0.05, 0.345, 0.95, 0.355), 0, 160),
+    Firma((0.05, 0.440, 0.95, 0.455), 170, 255),
+    Firma((0.47, 0.190, 0.94, 0.420), 190, 255),
+], regiones=[
+    Region("titular", (0.040, 0.104, 0.590, 0.203), ('titular', 'direccion'), _leer_titular),
+    Region("total", (0.590, 0.104, 0.950, 0.165), ('total',), _leer_total),
+    Region("datos", (0.040, 0.203, 0.590, 0.316), (), None),
+    Region("fechas", (0.590, 0.203, 0.950, 0.316), (), None),
+    Region("consumo", (0.040, 0.340, 0.945, 0.395), ('consumo',), _leer_total_kwh),
+])
+
+PLANTILLAS_CFE = (DOMESTICA, COMERCIAL)
+
+def detectar_plantilla(imagen, plantillas=PLANTILLAS_CFE):
+    """Plantilla que corresponde a la página, o None si ninguna aplica"""
+    alto, ancho = imagen.shape[:2]
+    proporcion = ancho / alto
+    if abs(proporcion - PROPORCION_PAGINA) > TOLERANCIA_PROPORCION:
+        return None
+    for plantilla in plantillas:
+        if plantilla.coincide(imagen):
+            return plantilla
+    return None
+
+def lineas_ocr(resultado):
+    """Agrupa las cajas de EasyOCR (bbox, texto, confianza) en líneas de arriba abajo"""
+    cajas = []
+    for bbox, texto, _ in resultado:
+        ys = [p[1] for p in bbox]
+        cajas.append((min(ys), max(ys), min(p[0] for p in bbox), texto.strip()))
+    cajas.sort()
+
+    lineas = []
+    for arriba, abajo, x, texto in cajas:
+        centro = (arriba + abajo) / 2
+        # Misma línea si el centro cae dentro de la altura de la línea actual
+        if lineas and lineas[-1][0] <= centro <= lineas[-1][1]:
+            lineas[-1][2].append((x, texto))
+        else:
+            lineas.append([arriba, abajo, [(x, texto)]])
+
+    return [' '.join(t for _, t in sorted(partes) if t) for _, _, partes in lineas]
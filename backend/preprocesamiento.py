@@ -0,0 +1,144 @@
+import os
+import cv2
+import numpy as np
+
+# ================================
+# PREPROCESAMIENTO PARA OCR
+# ================================
+# Todas las etapas trabajan sobre un solo arreglo uint8 en escala de grises:
+# la imagen PIL se copia una vez a numpy y de ahí en adelante se modifica en
+# su lugar. Con las etapas por defecto el resultado es idéntico, píxel por
+# píxel, a la cadena anterior de PIL (ImageEnhance.Contrast + SHARPEN).
+
+# Orden en que se aplican las etapas (la configuración solo elige cuáles)
+ETAPAS_DISPONIBLES = ("reducir", "enderezar", "contraste", "nitidez", "umbral")
+
+def _leer_etapas(valor):
+    etapas = {e.strip().lower() for e in valor.split(",") if e.strip()}
+    desconocidas = etapas - set(ETAPAS_DISPONIBLES)
+    if desconocidas:
+        raise ValueError(f"Etapas de preprocesamiento desconocidas: {', '.join(sorted(desconocidas))}")
+    return tuple(e for e in ETAPAS_DISPONIBLES if e in etapas)
+
+OCR_PREPROCESO = _leer_etapas(os.environ.get("OCR_PREPROCESO", "contraste,nitidez"))
+OCR_CONTRASTE = float(os.environ.get("OCR_CONTRASTE", "2.0"))
+OCR_ANCHO_MAX = int(os.environ.get("OCR_ANCHO_MAX", "2000"))          # px, etapa "reducir"
+OCR_ENDEREZAR_MAX = float(os.environ.get("OCR_ENDEREZAR_MAX", "5"))   # grados, etapa "enderezar"
+OCR_UMBRAL_BLOQUE = int(os.environ.get("OCR_UMBRAL_BLOQUE", "31"))    # px (impar), etapa "umbral"
+OCR_UMBRAL_C = int(os.environ.get("OCR_UMBRAL_C", "15"))
+
+# Núcleo de ImageFilter.SHARPEN (escala 16)
+_NUCLEO_NITIDEZ = np.array([[-2, -2, -2],
+                            [-2, 32, -2],
+                            [-2, -2, -2]], dtype=np.float32)
+
+def a_gris(imagen):
+    """Imagen PIL o arreglo -> arreglo uint8 2D propio (la única copia del proceso)"""
+    if isinstance(imagen, np.ndarray):
+        if imagen.ndim == 3:
+            return cv2.cvtColor(imagen, cv2.COLOR_RGB2GRAY)
+        return np.array(imagen, dtype=np.uint8)
+    if imagen.mode != 'L':
+        imagen = imagen.convert('L')
+    return np.array(imagen)
+
+def reducir(gris, ancho_max=OCR_ANCHO_MAX):
+    """Reduce páginas más anchas que ancho_max (INTER_AREA conserva el trazo)"""
+    alto, ancho = gris.shape
+    if ancho_max <= 0 or ancho <= ancho_max:
+        return gris
+    escala = ancho_max / ancho
+    return cv2.resize(gris, (ancho_max, max(1, round(alto * escala))), interpolation=cv2.INTER_AREA)
+
+def angulo_inclinacion(gris, max_grados=OCR_ENDEREZAR_MAX, paso=0.25):
+    """Ángulo (grados) que deja horizontales las líneas de texto.
+
+    Perfil de proyección sobre una versión chica de la página: al girarla al
+    ángulo correcto las filas de texto y los huecos entre ellas se separan
+    más y la varianza de las sumas por fila es máxima.
+    """
+    escala = min(1.0, 800 / gris.shape[1])
+    chica = cv2.resize(gris, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    _, tinta = cv2.threshold(chica, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    alto, ancho = tinta.shape
+    centro = (ancho / 2, alto / 2)
+
+    mejor_angulo, mejor_puntaje = 0.0, -1.0
+    for angulo in np.arange(-max_grados, max_grados + paso / 2, paso):
+        matriz = cv2.getRotationMatrix2D(centro, float(angulo), 1.0)
+        girada = cv2.warpAffine(tinta, matriz, (ancho, alto), flags=cv2.INTER_NEAREST)
+        filas = cv2.reduce(girada, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S)
+        puntaje = float(filas.var())
+        # Ante empate se queda el ángulo más cercano a 0
+        if puntaje > mejor_puntaje or (puntaje == mejor_puntaje and abs(angulo) < abs(mejor_angulo)):
+            mejor_angulo, mejor_puntaje = float(angulo), puntaje
+    return mejor_angulo
+
+def enderezar(gris, max_grados=OCR_ENDEREZAR_MAX):
+    """Gira la página si está inclinada (escaneos); las páginas rectas no se tocan"""
+    angulo = angulo_inclinacion(gris, max_grados)
+    if abs(angulo) < 0.1:
+        return gris
+    alto, ancho = gris.shape
+    matriz = cv2.getRotationMatrix2D((ancho / 2, alto / 2), angulo, 1.0)
+    return cv2.warpAffine(gris, matriz, (ancho, alto), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+def contraste(gris, factor=OCR_CONTRASTE):
+    """Igual que ImageEnhance.Contrast: aleja cada píxel de la media, con una LUT en su lugar"""
+    media = np.float32(int(cv2.mean(gris)[0] + 0.5))
+    niveles = np.arange(256, dtype=np.float32)
+    lut = np.clip(media + np.float32(factor) * (niveles - media), 0, 255).astype(np.uint8)
+    cv2.LUT(gris, lut, dst=gris)
+    return gris
+
+def nitidez(gris, franja=256):
+    """Igual que ImageFilter.SHARPEN (redondeo y bordes incluidos), escribiendo en `gris`.
+
+    Se filtra por franjas de filas para que el intermedio int16 no ocupe el
+    doble de la página; cada franja lleva una fila de contexto arriba y abajo.
+    """
+    alto, ancho = gris.shape
+    if alto < 3 or ancho < 3:
+        return gris
+    arriba = gris[0].copy()     # fila original sobre la franja (la anterior ya se escribió)
+    for r0 in range(1, alto - 1, franja):
+        r1 = min(r0 + franja, alto - 1)
+        entrada = gris[r0 - 1:r1 + 1].copy()
+        entrada[0] = arriba
+        arriba = entrada[-2]
+        # Suma entera exacta en int16: 32*255 y -16*255 caben sin desbordar
+        suma = cv2.filter2D(entrada, cv2.CV_16S, _NUCLEO_NITIDEZ)
+        cv2.add(suma, 8, dst=suma)
+        np.right_shift(suma, 4, out=suma)
+        np.clip(suma, 0, 255, out=suma)
+        # PIL deja el marco de 1 px sin filtrar
+        gris[r0:r1, 1:-1] = suma[1:-1, 1:-1]
+    return gris
+
+def umbral(gris, bloque=OCR_UMBRAL_BLOQUE, c=OCR_UMBRAL_C):
+    """Binariza con umbral adaptativo (útil con iluminación despareja en escaneos)"""
+    bloque = max(3, bloque | 1)
+    cv2.adaptiveThreshold(gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                          bloque, c, dst=gris)
+    return gris
+
+_FUNCIONES = {
+    "reducir": reducir,
+    "enderezar": enderezar,
+    "contraste": contraste,
+    "nitidez": nitidez,
+    "umbral": umbral,
+}
+
+def configuracion():
+    """Parámetros que cambian la imagen resultante (parte de la clave de la cache OCR)"""
+    return (f"{','.join(OCR_PREPROCESO)}|{OCR_CONTRASTE}|{OCR_ANCHO_MAX}|{OCR_ENDEREZAR_MAX}|"
+            f"{OCR_UMBRAL_BLOQUE}|{OCR_UMBRAL_C}")
+
+def preprocesar(imagen, etapas=OCR_PREPROCESO):
+    """Aplica las etapas configuradas y devuelve un arreglo uint8 listo para EasyOCR"""
+    gris = a_gris(imagen)
+    for etapa in etapas:
+        gris = _FUNCIONES[etapa](gris)
+    return gris
@@ -0,0 +1,106 @@
+import time
+import logging
+
+from documento import DocumentoPDF
+from tiempos import medir_etapas
+from extractores import obtener_registro_extractores
+from recibo import CAMPOS_REQUERIDOS, FALTANTE
+
+log = logging.getLogger(__name__)
+
+# Campos que toda respuesta debe incluir (se rellenan con "NO EXTRAÍDO")
+REQUIRED_FIELDS = list(CAMPOS_REQUERIDOS)
+
+class RequiereOCR(Exception):
+    """El recibo va a un extractor con OCR y se pidió procesarlo sin OCR"""
+
+# --------------------------
+# DETECTAR TIPO DE SERVICIO (clasificador.py)
+# --------------------------
+def detect_service_type(text):
+    """Servicio del recibo ("cfe", "japam", "gas" o "unknown") por palabras clave"""
+    return obtener_registro_extractores().clasificador.clasificar(text).servicio
+
+# --------------------------
+# DETECTAR POR NOMBRE DE ARCHIVO
+# --------------------------
+def detect_service_type_by_filename(filename):
+    extractor = obtener_registro_extractores().por_nombre(filename)
+    return extractor.servicio if extractor else "unknown"
+
+# --------------------------
+# PROCESAR UN RECIBO (detección + extracción)
+# --------------------------
+def procesar_recibo(documento, permitir_ocr=True):
+    """Detecta el servicio de un PDF y ejecuta su extractor (extractores.py).
+
+    Es el pipeline completo de un archivo, compartido por /api/upload y por
+    el motor de lotes. Recibe un DocumentoPDF (o una ruta): el PDF se parsea
+    una sola vez y el mismo objeto pasa por la detección y el extractor. Con
+    permitir_ocr=False lanza RequiereOCR antes de correr un extractor que
+    puede usar OCR. Las demás excepciones se propagan al llamador.
+    """
+    documento = DocumentoPDF.abrir(documento)
+    filename = documento.nombre
+    registro = obtener_registro_extractores()
+
+    # Texto básico para detección de servicio (queda cacheado en el documento)
+    text = documento.texto
+
+    extractor, clasificacion = registro.detectar(text, filename)
+    log.debug("Servicio detectado en %s: %s (confianza %.2f, puntajes %s)",
+              filename, extractor.servicio if extractor else "unknown",
+              clasificacion.confianza, clasificacion.puntajes)
+
+    desconocido = extractor is None
+    if desconocido:
+        log.debug("Servicio desconocido, intentando con %s...", registro.respaldo)
+        extractor = registro.obtener(registro.respaldo)
+    if extractor is not None and extractor.usa_ocr and not permitir_ocr:
+        raise RequiereOCR(extractor.servicio)
+
+    try:
+        datos = extractor.extraer(documento)
+        datos["service_type"] = extractor.servicio
+    except Exception:
+        if not desconocido:
+            raise
+        datos = {
+            "service_type": "unknown", 
+            "error": "No se pudo identificar el servicio", 
+            "filename": filename,
+            "texto_preview": text[:500]
+        }
+    if desconocido:
+        log.warning("Servicio desconocido: %s", filename, extra={"archivo": filename})
+
+    # Asegurar que todos los campos necesarios (y los propios del extractor) estén presentes
+    for field in REQUIRED_FIELDS + list(extractor.campos if extractor else ()):
+        if field not in datos:
+            datos[field] = FALTANTE
+    
+    datos['filename'] = filename
+    log.info("Recibo %s procesado (%s)", filename, datos['service_type'],
+             extra={"archivo": filename, "servicio": datos['service_type']})
+    return datos
+
+def procesar_recibo_medido(documento, permitir_ocr=True):
+    """procesar_recibo más sus tiempos: ({datos}, {etapa: segundos, 'total': segundos}).
+
+    Las etapas son las de tiempos.py; las que no corrieron no aparecen.
+    """
+    inicio = time.perf_counter()
+    with medir_etapas() as tiempos:
+        datos = procesar_recibo(documento, permitir_ocr)
+    tiempos["total"] = time.perf_counter() - inicio
+    return datos, tiempos
+
+def resultado_error(filename, mensaje):
+    """Respuesta estándar cuando un archivo no se pudo procesar"""
+    return {
+        "error": f"Error procesando archivo: {mensaje}",
+        "service_type": "error",
+        "filename": filename,
+        "titular": "ERROR",
+        "total": "ERROR"
+    }
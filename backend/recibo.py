@@ -0,0 +1,206 @@
+import re
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from operator import attrgetter
+
+# ================================
+# RECIBO TIPADO
+# ================================
+# Los extractores devuelven dicts de textos ("271.81", "13 NOV 25",
+# FALTANTE) y cada consumidor volvía a convertirlos. Recibo se arma una vez por resultado: los montos quedan como
+# Decimal, los consumos como int/Decimal, las fechas como date y cualquier
+# faltante como None. Es el objeto que guardan los trabajos en memoria y el
+# que recibe el almacén; la API lo serializa con `a_dict()`.
+
+# Texto de un campo faltante: el que escriben los extractores (campos.py,
+# Ing_Soft_P2.py) y la API, y el que espera el frontend
+FALTANTE = "NO EXTRAÍDO"
+
+# Valores que significan "sin dato"; la forma sin acento sigue llegando de
+# resultados guardados en la cache o el almacén por versiones anteriores
+VALORES_FALTANTES = frozenset({"NO EXTRAIDO", "NO EXTRAÍDO", "ERROR"})
+
+# Campos que toda respuesta incluye (faltantes como FALTANTE)
+CAMPOS_REQUERIDOS = (
+    'service_type', 'titular', 'direccion', 'no_servicio',
+    'cuenta', 'no_medidor', 'periodo', 'total', 'consumo',
+    'tarifa', 'fecha_pago', 'fecha_corte', 'rmu', 'calidad',
+)
+
+# Campos que se serializan si tienen valor o si el resultado los declara (los
+# propios de cada extractor, que procesar_recibo rellena con FALTANTE)
+CAMPOS_OPCIONALES = (
+    'filename', 'archivo', 'consumo_kwh', 'consumo_m3', 'tipo_lectura',
+    'error', 'texto_preview',
+)
+
+MESES = {'ENE': 1, 'FEB': 2, 'MAR': 3, 'ABR': 4, 'MAY': 5, 'JUN': 6,
+         'JUL': 7, 'AGO': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DIC': 12}
+NOMBRES_MES = {numero: nombre for nombre, numero in MESES.items()}
+_FECHA_TEXTO = re.compile(r"(\d{1,2})\s*(ENE|FEB|MAR|ABR|MAY|JUN|JUL|AGO|SEP|OCT|NOV|DIC)[A-Z]*\.?\s*(\d{2,4})", re.I)
+_FECHA_PUNTOS = re.compile(r"(\d{1,2})[./](\d{1,2})[./](\d{4})")
+
+# --------------------------
+# CONVERSIONES
+# --------------------------
+def _anio(texto):
+    anio = int(texto)
+    return anio + 2000 if anio < 100 else anio
+
+def monto(valor):
+    """'$1,234.50' -> Decimal('1234.50'); el texto original si no es un número"""
+    if isinstance(valor, (Decimal, int)):
+        return Decimal(valor)
+    if isinstance(valor, float):
+        return Decimal(str(valor))
+    try:
+        return Decimal(valor.replace(',', '').replace('$', '').strip())
+    except InvalidOperation:
+        return valor
+
+def cantidad(valor):
+    """'63075' -> 63075, '280.00' -> Decimal('280.00'); el texto original si no es un número"""
+    if isinstance(valor, str):
+        limpio = valor.replace(',', '').strip()
+        if limpio.isdigit():
+            return int(limpio)
+    return monto(valor)
+
+def fecha(valor):
+    """'13 NOV 25' -> date(2025, 11, 13); el texto original si no es una fecha"""
+    if isinstance(valor, date):
+        return valor
+    partes = valor.split()
+    if len(partes) == 3 and partes[1] in MESES and partes[0].isdigit() and partes[2].isdigit():
+        dia, mes, anio = partes
+    else:
+        m = _FECHA_TEXTO.fullmatch(valor.strip())
+        if not m:
+            return valor
+        dia, mes, anio = m.groups()
+    try:
+        return date(_anio(anio), MESES[mes.upper()], int(dia))
+    except ValueError:
+        return valor
+
+def texto_fecha(valor):
+    """date -> '13 NOV 25', el formato de los recibos"""
+    return f"{valor.day:02d} {NOMBRES_MES[valor.month]} {valor.year % 100:02d}"
+
+def _mes_de_fecha(texto):
+    """Mes (AAAA-MM) de la última fecha del texto: el fin del periodo"""
+    if not texto:
+        return None
+    if isinstance(texto, date):
+        return f"{texto.year}-{texto.month:02d}"
+    fechas = _FECHA_PUNTOS.findall(texto)
+    if fechas:
+        _, mes, anio = fechas[-1]
+        if 1 <= int(mes) <= 12:
+            return f"{anio}-{int(mes):02d}"
+    fechas = _FECHA_TEXTO.findall(texto)
+    if fechas:
+        _, mes, anio = fechas[-1]
+        return f"{_anio(anio)}-{MESES[mes.upper()]:02d}"
+    return None
+
+# Campo -> conversión del texto del extractor (los demás quedan como str)
+_CONVERSIONES = {
+    'total': monto,
+    'consumo': cantidad, 'consumo_kwh': cantidad, 'consumo_m3': cantidad,
+    'fecha_pago': fecha, 'fecha_corte': fecha,
+}
+
+# Tipo del valor -> cómo se escribe en la API (los str salen tal cual)
+_SERIALIZAR = {date: texto_fecha, Decimal: str, int: str}
+
+# --------------------------
+# RECIBO
+# --------------------------
+class Recibo:
+    """Resultado de extracción con los campos ya convertidos.
+
+    - total: Decimal; consumo, consumo_kwh, consumo_m3: int o Decimal;
+      fecha_pago, fecha_corte: date. Si el texto no se pudo convertir se
+      conserva tal cual (str) para no perder lo que leyó el extractor.
+    - Faltantes ("NO EXTRAIDO", "NO EXTRAÍDO", "ERROR" o ausentes): None.
+    - extra: claves que no son campos conocidos (fuente_campos...), o None.
+    - declarados: campos opcionales que traía el resultado, aunque faltaran;
+      a_dict los sigue escribiendo (FALTANTE) como los recibió.
+    """
+    __slots__ = CAMPOS_REQUERIDOS + CAMPOS_OPCIONALES + ('extra', 'declarados')
+
+    @classmethod
+    def desde_datos(cls, datos):
+        """Recibo a partir del dict de un extractor (o de la API); un Recibo se devuelve igual"""
+        if isinstance(datos, cls):
+            return datos
+        valores = dict.fromkeys(cls.__slots__)
+        extra = None
+        for nombre, valor in datos.items():
+            if nombre not in valores or nombre in ('extra', 'declarados'):
+                if extra is None:
+                    extra = valores['extra'] = {}
+                extra[nombre] = valor
+            elif valor is not None and not (isinstance(valor, str) and valor in VALORES_FALTANTES):
+                convertir = _CONVERSIONES.get(nombre)
+                valores[nombre] = convertir(valor) if convertir else valor
+        declarados = tuple(nombre for nombre in CAMPOS_OPCIONALES if nombre in datos)
+        valores['declarados'] = _DECLARADOS.setdefault(declarados, declarados)
+        recibo = cls.__new__(cls)
+        for nombre, valor in valores.items():
+            setattr(recibo, nombre, valor)
+        return recibo
+
+    def a_dict(self):
+        """Forma de la API: textos, requeridos y declarados siempre (FALTANTE si no hay), opcionales si hay"""
+        faltante = "ERROR" if self.service_type == "error" else FALTANTE
+        datos = {}
+        for nombre, valor in zip(CAMPOS_REQUERIDOS, _requeridos(self)):
+            if valor is None:
+                valor = faltante
+            elif type(valor) in _SERIALIZAR:
+                valor = _SERIALIZAR[type(valor)](valor)
+            datos[nombre] = valor
+        for nombre, valor in zip(CAMPOS_OPCIONALES, _opcionales(self)):
+            if valor is not None:
+                datos[nombre] = _SERIALIZAR[type(valor)](valor) if type(valor) in _SERIALIZAR else valor
+            elif nombre in self.declarados:
+                datos[nombre] = faltante
+        if self.extra:
+            datos.update(self.extra)
+        return datos
+
+    @property
+    def consumo_total(self):
+        """Primer consumo disponible: consumo, consumo_kwh o consumo_m3"""
+        if self.consumo is not None:
+            return self.consumo
+        if self.consumo_kwh is not None:
+            return self.consumo_kwh
+        return self.consumo_m3
+
+    @property
+    def lectura(self):
+        """'ESTIMADA', 'MEDIDA' o None según tipo_lectura/calidad"""
+        texto = str(self.tipo_lectura or self.calidad or '').upper()
+        if 'ESTIMAD' in texto:
+            return 'ESTIMADA'
+        if 'MEDID' in texto:
+            return 'MEDIDA'
+        return None
+
+    def mes(self, creado):
+        """Mes al que corresponde el recibo: fin del periodo, fecha de pago o subida"""
+        return (_mes_de_fecha(self.periodo) or
+                _mes_de_fecha(self.fecha_pago) or
+                time.strftime("%Y-%m", time.localtime(creado)))
+
+    def __repr__(self):
+        return f"Recibo({self.service_type!r}, {(self.filename or self.archivo)!r}, total={self.total!r})"
+
+_requeridos = attrgetter(*CAMPOS_REQUERIDOS)
+# Tuplas de declarados compartidas entre recibos: casi todos traen las mismas
+_DECLARADOS = {}
+_opcionales = attrgetter(*CAMPOS_OPCIONALES)
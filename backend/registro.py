@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+# ================================
+# REGISTRO (logging)
+# ================================
+# Los módulos usan logging.getLogger(__name__) con mensajes perezosos
+# (log.debug("... %s", x)): con el nivel apagado no se formatea nada. Los
+# procesos que atienden recibos (servidor, workers del motor de lotes,
+# scripts) llaman a configurar_registro() una vez: los registros van a una
+# cola y un hilo aparte los formatea y escribe, así ningún hilo de Flask ni
+# del OCR espera por stdout o disco.
+LOG_NIVEL = os.environ.get("LOG_NIVEL", "INFO").upper()
+LOG_FORMATO = os.environ.get("LOG_FORMATO", "texto")      # "texto" o "json"
+LOG_ARCHIVO = os.environ.get("LOG_ARCHIVO")               # además de stderr, si se indica
+
+# Artefactos de debug (texto OCR por recibo): solo si se piden, en una carpeta
+# propia que conserva los DEBUG_MAX_ARCHIVOS más recientes
+DEBUG_ARTEFACTOS = os.environ.get("DEBUG_ARTEFACTOS", "0") == "1"
+DEBUG_DIR = os.environ.get("DEBUG_DIR", "debug_ocr")
+DEBUG_MAX_ARCHIVOS = int(os.environ.get("DEBUG_MAX_ARCHIVOS", "100"))
+
+LOGGER_ARTEFACTOS = "recibos.artefactos"
+
+# Atributos estándar de LogRecord: lo demás viene de `extra=` y va al JSON
+_ATRIBUTOS_BASE = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `extra=` (archivo, servicio...)"""
+
+    def format(self, record):
+        datos = {
+            "ts": round(record.created, 3),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_BASE and not clave.startswith("_"):
+                datos[clave] = valor
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+class ManejadorArtefactos(logging.Handler):
+    """Escribe cada artefacto en DEBUG_DIR y borra los más viejos pasado el máximo"""
+
+    def __init__(self, carpeta=DEBUG_DIR, maximo=DEBUG_MAX_ARCHIVOS):
+        super().__init__()
+        self.carpeta = carpeta
+        self.maximo = max(1, maximo)
+        self._archivos = None       # rutas del más viejo al más nuevo
+        self._secuencia = 0
+
+    def _existentes(self):
+        os.makedirs(self.carpeta, exist_ok=True)
+        rutas = [os.path.join(self.carpeta, n) for n in os.listdir(self.carpeta)]
+        rutas = [r for r in rutas if os.path.isfile(r)]
+        return deque(sorted(rutas, key=os.path.getmtime))
+
+    def emit(self, record):
+        try:
+            if self._archivos is None:
+                self._archivos = self._existentes()
+            self._secuencia += 1
+            marca = time.strftime("%Y%m%d-%H%M%S", time.localtime(record.created))
+            ruta = os.path.join(self.carpeta, f"{marca}_{self._secuencia:04d}_{record.artefacto}")
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(record.contenido)
+            self._archivos.append(ruta)
+            while len(self._archivos) > self.maximo:
+                viejo = self._archivos.popleft()
+                if os.path.exists(viejo):
+                    os.remove(viejo)
+        except Exception:
+            self.handleError(record)
+
+_listener = None
+_pid = None         # proceso dueño del listener: un fork hereda la cola pero no el hilo
+_lock = threading.Lock()
+
+def _formateador():
+    if LOG_FORMATO == "json":
+        return FormatoJSON()
+    return logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+def configurar_registro(nivel=None):
+    """Instala la cola de logging en el proceso (idempotente)"""
+    global _listener, _pid
+    with _lock:
+        if _listener is not None and _pid == os.getpid():
+            return
+        formateador = _formateador()
+        manejadores = [logging.StreamHandler()]
+        if LOG_ARCHIVO:
+            manejadores.append(logging.FileHandler(LOG_ARCHIVO, encoding="utf-8"))
+        for manejador in manejadores:
+            manejador.setFormatter(formateador)
+
+        # Los artefactos pasan por la misma cola pero solo los escribe su manejador
+        artefactos = ManejadorArtefactos()
+        artefactos.addFilter(lambda r: r.name == LOGGER_ARTEFACTOS)
+        for manejador in manejadores:
+            manejador.addFilter(lambda r: r.name != LOGGER_ARTEFACTOS)
+
+        cola = queue.SimpleQueue()
+        raiz = logging.getLogger()
+        raiz.setLevel(nivel or LOG_NIVEL)
+        raiz.handlers[:] = [QueueHandler(cola)]
+
+        log_artefactos = logging.getLogger(LOGGER_ARTEFACTOS)
+        log_artefactos.setLevel(logging.DEBUG if DEBUG_ARTEFACTOS else logging.CRITICAL + 1)
+
+        _listener = QueueListener(cola, *manejadores, artefactos, respect_handler_level=True)
+        _listener.start()
+        _pid = os.getpid()
+        atexit.register(detener_registro)
+
+def detener_registro():
+    """Vacía la cola (al salir del proceso)"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None and _pid == os.getpid():
+        listener.stop()
+
+def artefactos_activos():
+    """True si hay que armar artefactos de debug (se chequea antes de gastar en ellos)"""
+    return DEBUG_ARTEFACTOS and _listener is not None and _pid == os.getpid()
+
+def guardar_artefacto(nombre, contenido):
+    """Encola un archivo de debug; lo escribe el hilo del registro, no el llamador"""
+    if not artefactos_activos():
+        return
+    nombre = os.path.basename(nombre) or "artefacto.txt"
+    logging.getLogger(LOGGER_ARTEFACTOS).debug("artefacto %s", nombre,
+                                               extra={"artefacto": nombre, "contenido": contenido})
@@ -1,18 +1,52 @@
-from flask import Flask, request, jsonify 
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import os
+import json
+import time
+import logging
+import tempfile
+import threading
 from werkzeug.utils import secure_filename
-from PyPDF2 import PdfReader
-import re
 
-# Importar extractores
-from Ing_Soft_P2 import extraer_info_recibo_cfe, extraer_info_recibo_japam, extraer_info_recibo_gas
+# Importar pipeline de extracción
+from procesamiento import procesar_recibo_medido, resultado_error
+from Ing_Soft_P2 import precargar_ocr, ocr_cargado
+from lotes import obtener_motor_lotes, borrar_temporales
+from trabajos import obtener_gestor_trabajos, ColaLlena
+from cache_resultados import obtener_cache, CacheResultados
+from almacen import obtener_almacen, ALMACEN_MAX_POR_PAGINA
+from exportacion import FORMATOS_EXPORTACION
+from documento import DocumentoPDF
+from recibo import Recibo
+from metricas import obtener_metricas, TIPO_CONTENIDO
+from tiempos import ETAPAS
+from extractores import obtener_registro_extractores
+from registro import configurar_registro
+import Ing_Soft_P2
+
+# Registro por cola (registro.py): nivel con LOG_NIVEL, JSON con LOG_FORMATO=json
+configurar_registro()
+log = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"pdf"}
+# Cargar el modelo OCR al arrancar (1) o en el primer recibo CFE (0)
+OCR_PRECARGAR = os.environ.get("OCR_PRECARGAR", "1") == "1"
+
+# Subidas de lotes y trabajos hasta este tamaño pasan al motor como bytes;
+# las más grandes se escriben en un temporal único de UPLOAD_FOLDER
+SUBIDA_MAX_MEMORIA = int(float(os.environ.get("SUBIDA_MAX_MEMORIA_MB", "4")) * 1024 * 1024)
+
+# Backpressure por proceso: extracciones de /api/upload y lotes simultáneos.
+# Una petición espera hasta SERVIDOR_ESPERA_CUPO segundos por un cupo; si no
+# lo consigue responde 503 con Retry-After en lugar de acumular hilos y memoria.
+SERVIDOR_MAX_EXTRACCIONES = int(os.environ.get("SERVIDOR_MAX_EXTRACCIONES", "2"))
+SERVIDOR_MAX_LOTES = int(os.environ.get("SERVIDOR_MAX_LOTES", "2"))
+SERVIDOR_ESPERA_CUPO = float(os.environ.get("SERVIDOR_ESPERA_CUPO", "5"))
+SERVIDOR_REINTENTO = int(os.environ.get("SERVIDOR_REINTENTO", "10"))   # segundos en Retry-After
 
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB
@@ -23,69 +57,100 @@ if not os.path.exists(UPLOAD_FOLDER):
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def con_tiempos(datos, tiempos, origen):
+    """Copia de la respuesta con el desglose de tiempos (?debug=1); no se cachea ni se guarda"""
+    respuesta = dict(datos)
+    respuesta["tiempos_ms"] = {etapa: round(segundos * 1000, 2) for etapa, segundos in tiempos.items()
+                               if etapa in ETAPAS or etapa == "total"}
+    respuesta["origen"] = origen
+    return respuesta
+
+def guardar_temporal(file):
+    """Guarda el archivo subido en un temporal único (los nombres pueden repetirse)"""
+    fd, filepath = tempfile.mkstemp(suffix=".pdf", dir=UPLOAD_FOLDER)
+    with os.fdopen(fd, "wb") as destino:
+        file.save(destino)
+    return filepath
+
+def leer_subida(file):
+    """Fuente para el motor de lotes: los bytes del archivo o, si es grande, un temporal"""
+    stream = file.stream
+    try:
+        inicio = stream.tell()
+        tamano = stream.seek(0, os.SEEK_END) - inicio
+        stream.seek(inicio)
+    except (AttributeError, OSError):
+        tamano = 0
+    if tamano > SUBIDA_MAX_MEMORIA:
+        return guardar_temporal(file)
+    return file.read()
+
+class Cupos:
+    """Semáforo que además cuenta los cupos ocupados (para /api/metrics)"""
+
+    def __init__(self, total):
+        self.total = max(1, total)
+        self._semaforo = threading.BoundedSemaphore(self.total)
+        self._ocupados = 0
+        self._lock = threading.Lock()
+
+    def tomar(self, espera):
+        if not self._semaforo.acquire(timeout=espera):
+            return False
+        with self._lock:
+            self._ocupados += 1
+        return True
+
+    def liberar(self):
+        with self._lock:
+            self._ocupados -= 1
+        self._semaforo.release()
+
+    def ocupados(self):
+        with self._lock:
+            return self._ocupados
+
+cupos_extraccion = Cupos(SERVIDOR_MAX_EXTRACCIONES)
+cupos_lotes = Cupos(SERVIDOR_MAX_LOTES)
+
+def servidor_ocupado(mensaje):
+    respuesta = jsonify({"error": mensaje})
+    respuesta.headers["Retry-After"] = str(SERVIDOR_REINTENTO)
+    return respuesta, 503
+
 # --------------------------
-# DETECTAR TIPO DE SERVICIO MEJORADO
+# MÉTRICAS
 # --------------------------
-def detect_service_type(text):
-    text_upper = text.upper()
-    
-    # Detección más robusta
-    if 'CFE' in text_upper or 'COMISIÓN FEDERAL DE ELECTRICIDAD' in text_upper:
-        return "cfe"
-    elif 'ELECTRICIDAD' in text_upper or 'ELECTRICA' in text_upper:
-        return "cfe"
-    elif 'KWH' in text_upper or 'KILOWATT' in text_upper:
-        return "cfe"
-    elif 'SUMINISTRO ELÉCTRICO' in text_upper:
-        return "cfe"
-    
-    # JAPAM - Agua
-    elif 'JAPAM' in text_upper or 'JUNTA DE AGUA' in text_upper:
-        return "japam"
-    elif 'AGUA POTABLE' in text_upper or 'SERVICIO DE AGUA' in text_upper:
-        return "japam"
-    elif 'M3' in text_upper and 'AGUA' in text_upper:
-        return "japam"
-    elif 'METROS CÚBICOS' in text_upper and 'CONSUMO' in text_upper:
-        return "japam"
-    
-    # Gas
-    elif 'GAS' in text_upper and ('NATURAL' in text_upper or 'LP' in text_upper or 'PROPANO' in text_upper):
-        return "gas"
-    elif 'ENGIE' in text_upper:
-        return "gas"
-    elif 'TRACTEBEL' in text_upper:
-        return "gas"
-    elif 'COMBUSTIBLE' in text_upper:
-        return "gas"
-    
-    # Si no se detecta claramente, buscar por patrones específicos
-    lines = text_upper.split('\n')
-    for line in lines:
-        if 'CFE' in line:
-            return "cfe"
-        elif 'JAPAM' in line:
-            return "japam"
-        elif 'GAS' in line:
-            return "gas"
-    
-    # Último recurso: buscar palabras clave en todo el texto
-    cfe_keywords = ['CFE', 'ELECTRICIDAD', 'KWH', 'TARIFA', 'MEDIDOR']
-    japam_keywords = ['JAPAM', 'AGUA', 'M3', 'CAUDAL', 'HIDRANTE']
-    gas_keywords = ['GAS', 'ENGIE', 'PROPANO', 'BUTANO', 'COMBUSTIBLE']
-    
-    cfe_count = sum(1 for keyword in cfe_keywords if keyword in text_upper)
-    japam_count = sum(1 for keyword in japam_keywords if keyword in text_upper)
-    gas_count = sum(1 for keyword in gas_keywords if keyword in text_upper)
-    
-    if cfe_count > japam_count and cfe_count > gas_count:
-        return "cfe"
-    elif japam_count > cfe_count and japam_count > gas_count:
-        return "japam"
-    elif gas_count > cfe_count and gas_count > japam_count:
-        return "gas"
-    
-    return "unknown"
+metricas = obtener_metricas()
+metricas.agregar_medidor("cache_resultados", "Contadores de la cache de resultados",
+                         lambda: {(k,): v for k, v in obtener_cache().estadisticas().items()
+                                  if isinstance(v, (int, float)) and not isinstance(v, bool)},
+                         etiquetas=("dato",))
+metricas.agregar_medidor("ocr_cargado", "1 si el modelo OCR está en memoria en este proceso",
+                         lambda: {(): int(ocr_cargado())})
+metricas.agregar_medidor("trabajos_en_cola", "Trabajos asíncronos esperando en la cola",
+                         lambda: {(): obtener_gestor_trabajos().en_cola()})
+metricas.agregar_medidor("cupos_ocupados", "Cupos de extracción (upload) y de lotes en uso en este proceso",
+                         lambda: {("upload",): cupos_extraccion.ocupados(), ("lotes",): cupos_lotes.ocupados()},
+                         etiquetas=("tipo",))
+
+@app.before_request
+def iniciar_reloj():
+    g.inicio_peticion = time.perf_counter()
+
+@app.after_request
+def registrar_peticion(response):
+    inicio = g.get("inicio_peticion")
+    if inicio is not None:
+        # La regla (/api/jobs/<job_id>) y no la URL, para no crear una serie por id
+        ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+        metricas.registrar_http(ruta, request.method, response.status_code, time.perf_counter() - inicio)
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def exponer_metricas():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(metricas.exposicion(), content_type=TIPO_CONTENIDO)
 
 # --------------------------
 # UPLOAD ENDPOINT
@@ -102,84 +167,46 @@ def upload_file():
 
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        contenido = file.read()
+        # ?debug=1 agrega a la respuesta el tiempo de cada etapa
+        debug = request.args.get("debug") == "1"
 
-        try:
-            # Leer texto básico para detección de servicio
-            print(f"\nSubiendo archivo: {filename}")
-            reader = PdfReader(filepath)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-
-            service_type = detect_service_type(text)
-            print(f"Servicio detectado: {service_type}")
-
-            # Si no se detecta, intentar con nombre de archivo
-            if service_type == "unknown":
-                filename_upper = filename.upper()
-                if 'CFE' in filename_upper or 'LUZ' in filename_upper or 'ELECTRICIDAD' in filename_upper:
-                    service_type = "cfe"
-                elif 'JAPAM' in filename_upper or 'AGUA' in filename_upper:
-                    service_type = "japam"
-                elif 'GAS' in filename_upper or 'ENGIE' in filename_upper:
-                    service_type = "gas"
-                print(f"Servicio detectado por nombre de archivo: {service_type}")
-
-            if service_type == "cfe":
-                print("Usando extractor de CFE...")
-                datos = extraer_info_recibo_cfe(filepath)
-                datos["service_type"] = "cfe"
-            elif service_type == "japam":
-                print("Usando extractor de JAPAM...")
-                datos = extraer_info_recibo_japam(filepath)
-            elif service_type == "gas":
-                print("Usando extractor de GAS...")
-                datos = extraer_info_recibo_gas(filepath)
-            else:
-                # Intentar con CFE como fallback
-                print("Servicio desconocido, intentando con CFE...")
-                try:
-                    datos = extraer_info_recibo_cfe(filepath)
-                    datos["service_type"] = "cfe"
-                except:
-                    datos = {
-                        "service_type": "unknown", 
-                        "error": "No se pudo identificar el servicio", 
-                        "filename": filename,
-                        "texto_preview": text[:500]
-                    }
-                print(f"Servicio desconocido: {filename}")
-
-            # Asegurar que todos los campos necesarios estén presentes
-            required_fields = [
-                'service_type', 'titular', 'direccion', 'no_servicio', 
-                'cuenta', 'no_medidor', 'periodo', 'total', 'consumo',
-                'tarifa', 'fecha_pago', 'fecha_corte', 'rmu', 'calidad'
-            ]
-            
-            for field in required_fields:
-                if field not in datos:
-                    datos[field] = "NO EXTRAÍDO"
-            
+        # Mismo PDF ya procesado: responder desde la cache sin guardar ni extraer
+        inicio = time.perf_counter()
+        cache = obtener_cache()
+        clave = cache.clave(contenido)
+        datos = cache.obtener(clave)
+        if datos is not None:
             datos['filename'] = filename
+            log.debug("Resultado en cache: %s", filename)
+            metricas.registrar_recibo(datos, origen="cache")
+            recibo = Recibo.desde_datos(datos)
+            obtener_almacen().guardar(recibo, sha256=CacheResultados.huella(clave))
+            if debug:
+                return jsonify(con_tiempos(recibo.a_dict(), {"total": time.perf_counter() - inicio}, "cache"))
+            return jsonify(recibo.a_dict())
+
+        if not cupos_extraccion.tomar(SERVIDOR_ESPERA_CUPO):
+            return servidor_ocupado("Servidor ocupado: todas las extracciones están en curso")
+        try:
+            # Se parsea una vez en memoria: sin guardar en uploads/ ni releer de disco
+            datos, tiempos = procesar_recibo_medido(DocumentoPDF(contenido, filename))
+            metricas.registrar_recibo(datos, tiempos)
+            cache.guardar(clave, datos)
+            recibo = Recibo.desde_datos(datos)
+            obtener_almacen().guardar(recibo, sha256=CacheResultados.huella(clave))
 
-            os.remove(filepath)
-            print(f"Archivo procesado: {filename}")
-            return jsonify(datos)
+            if debug:
+                return jsonify(con_tiempos(recibo.a_dict(), tiempos, "extraccion"))
+            return jsonify(recibo.a_dict())
 
         except Exception as e:
-            print(f"Error procesando {filename}: {str(e)}")
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            return jsonify({
-                "error": f"Error procesando archivo: {str(e)}",
-                "service_type": "error",
-                "filename": filename,
-                "titular": "ERROR",
-                "total": "ERROR"
-            }), 500
+            log.exception("Error procesando %s", filename, extra={"archivo": filename})
+            error = resultado_error(filename, str(e))
+            metricas.registrar_recibo(error)
+            return jsonify(error), 500
+        finally:
+            cupos_extraccion.liberar()
 
     return jsonify({"error": "Formato inválido. Solo PDF"}), 400
 
@@ -198,11 +225,17 @@ def health():
             "cfe": "Mejorado - Extrae titular, dirección, consumo, etc.",
             "japam": "Mejorado - Extrae datos de agua",
             "gas": "Mejorado - Extrae datos de gas natural/LP"
-        }
+        },
+        "extractores": obtener_registro_extractores().describir(),
+        "ocr": {
+            "disponible": Ing_Soft_P2.OCR_AVAILABLE,
+            "cargado": ocr_cargado()
+        },
+        "cache": obtener_cache().estadisticas()
     })
 
 # --------------------------
-# BATCH UPLOAD ENDPOINT (opcional)
+# BATCH UPLOAD ENDPOINT (pool de procesos)
 # --------------------------
 @app.route('/api/batch_upload', methods=['POST'])
 def batch_upload():
@@ -212,22 +245,36 @@ def batch_upload():
     files = request.files.getlist("files")
     if not files or files[0].filename == "":
         return jsonify({"error": "Archivos inválidos"}), 400
+
+    if not cupos_lotes.tomar(SERVIDOR_ESPERA_CUPO):
+        return servidor_ocupado("Servidor ocupado: hay demasiados lotes en curso; use /api/jobs")
     
-    results = []
-    for file in files:
-        if file and allowed_file(file.filename):
-            # Crear una solicitud individual simualda
-            req = type('Obj', (object,), {'files': {'file': file}})()
-            try:
-                response = upload_file(req)
-                if hasattr(response, 'json'):
-                    results.append(response.json)
-            except:
-                results.append({
+    archivos = []
+    posiciones = []
+    results = [None] * len(files)
+    try:
+        for i, file in enumerate(files):
+            if file and allowed_file(file.filename):
+                archivos.append((leer_subida(file), secure_filename(file.filename)))
+                posiciones.append(i)
+            else:
+                results[i] = {
                     "filename": file.filename,
-                    "error": "Error procesando archivo",
+                    "error": "Formato inválido. Solo PDF",
                     "service_type": "error"
-                })
+                }
+
+        almacen = obtener_almacen()
+
+        def al_terminar(indice, datos, clave):
+            recibo = Recibo.desde_datos(datos)
+            results[posiciones[indice]] = recibo.a_dict()
+            almacen.guardar(recibo, sha256=CacheResultados.huella(clave))
+
+        obtener_motor_lotes().procesar(archivos, al_terminar=al_terminar)
+    finally:
+        borrar_temporales(archivos)
+        cupos_lotes.liberar()
     
     return jsonify({
         "total": len(results),
@@ -236,6 +283,167 @@ def batch_upload():
         "results": results
     })
 
+# --------------------------
+# TRABAJOS ASÍNCRONOS
+# --------------------------
+@app.route('/api/jobs', methods=['POST'])
+def crear_trabajo():
+    files = request.files.getlist("files") or request.files.getlist("file")
+    if not files or files[0].filename == "":
+        return jsonify({"error": "No se encontraron archivos"}), 400
+
+    archivos = []
+    rechazados = []
+    for file in files:
+        if file and allowed_file(file.filename):
+            archivos.append((leer_subida(file), secure_filename(file.filename)))
+        else:
+            rechazados.append(file.filename)
+
+    if not archivos:
+        return jsonify({"error": "Formato inválido. Solo PDF", "rejected": rechazados}), 400
+
+    try:
+        trabajo = obtener_gestor_trabajos().enviar(archivos)
+    except ColaLlena as e:
+        borrar_temporales(archivos)
+        respuesta = jsonify({"error": str(e)})
+        respuesta.headers["Retry-After"] = "30"
+        return respuesta, 429
+
+    datos = trabajo.to_dict(incluir_resultados=False)
+    datos["rejected"] = rechazados
+    datos["status_url"] = f"/api/jobs/{trabajo.id}"
+    datos["stream_url"] = f"/api/jobs/{trabajo.id}/stream"
+    return jsonify(datos), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def estado_trabajo(job_id):
+    trabajo = obtener_gestor_trabajos().obtener(job_id)
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(trabajo.to_dict())
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_trabajo(job_id):
+    """Transmite cada resultado como una línea NDJSON en cuanto termina"""
+    trabajo = obtener_gestor_trabajos().obtener(job_id)
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+
+    def generar():
+        for evento in trabajo.eventos():
+            if evento is None:
+                linea = {"type": "ping"}
+            else:
+                indice, resultado = evento
+                linea = {"type": "result", "index": indice, "result": resultado.a_dict()}
+            yield json.dumps(linea, ensure_ascii=False) + "\n"
+
+        final = trabajo.to_dict(incluir_resultados=False)
+        final["type"] = "done"
+        yield json.dumps(final, ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generar()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --------------------------
+# RECIBOS GUARDADOS
+# --------------------------
+def _fecha_a_timestamp(valor, dias_extra=0):
+    """'AAAA-MM-DD' -> timestamp local del inicio de ese día (+ dias_extra)"""
+    fecha = time.strptime(valor, "%Y-%m-%d")
+    return time.mktime(fecha) + dias_extra * 86400
+
+def filtros_recibos(args):
+    """Filtros del almacén a partir de la query string; ValueError si son inválidos.
+
+    service_type, job_id, no_servicio, titular (prefijo), periodo, mes
+    (AAAA-MM), desde y hasta (AAAA-MM-DD, fecha de subida, ambos incluidos).
+    """
+    desde = args.get("desde")
+    hasta = args.get("hasta")
+    mes = args.get("mes")
+    if mes:
+        time.strptime(mes, "%Y-%m")
+    return {
+        "service_type": args.get("service_type"),
+        "lote": args.get("job_id"),
+        "no_servicio": args.get("no_servicio"),
+        "titular": args.get("titular"),
+        "periodo": args.get("periodo"),
+        "mes": mes,
+        "desde": _fecha_a_timestamp(desde) if desde else None,
+        "hasta": _fecha_a_timestamp(hasta, dias_extra=1) if hasta else None,
+    }
+
+def _error_filtros():
+    return jsonify({"error": "Filtros inválidos: fechas AAAA-MM-DD, mes AAAA-MM"}), 400
+
+@app.route('/api/records', methods=['GET'])
+def listar_recibos():
+    """Recibos guardados, paginados (page, per_page) y filtrados"""
+    try:
+        filtros = filtros_recibos(request.args)
+        pagina = int(request.args.get("page", "1"))
+        por_pagina = int(request.args.get("per_page", "50"))
+    except ValueError:
+        return _error_filtros()
+
+    registros, total = obtener_almacen().listar(pagina=pagina, por_pagina=por_pagina, **filtros)
+    por_pagina = max(1, min(por_pagina, ALMACEN_MAX_POR_PAGINA))
+    return jsonify({
+        "records": registros,
+        "page": max(1, pagina),
+        "per_page": por_pagina,
+        "total": total,
+        "pages": (total + por_pagina - 1) // por_pagina,
+    })
+
+@app.route('/api/records/monthly', methods=['GET'])
+def resumen_mensual_recibos():
+    """Gasto y consumo por servicio y mes, calculados en SQL"""
+    try:
+        filtros = filtros_recibos(request.args)
+    except ValueError:
+        return _error_filtros()
+    return jsonify({"months": obtener_almacen().resumen_mensual(**filtros)})
+
+@app.route('/api/records/summary', methods=['GET'])
+def resumen_recibos():
+    """Totales para el dashboard (por servicio, tipo de lectura, últimos recibos)"""
+    try:
+        filtros = filtros_recibos(request.args)
+    except ValueError:
+        return _error_filtros()
+    return jsonify(obtener_almacen().resumen(**filtros))
+
+# --------------------------
+# EXPORTACIÓN (CSV / NDJSON en streaming)
+# --------------------------
+@app.route('/api/export', methods=['GET'])
+def exportar_recibos():
+    """Descarga los recibos guardados sin armar el archivo completo en memoria.
+
+    Parámetros: formato (csv|ndjson) y los mismos filtros que /api/records.
+    """
+    formato = request.args.get("formato", "csv").lower()
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({"error": f"Formato no soportado: {formato}",
+                        "formatos": sorted(FORMATOS_EXPORTACION)}), 400
+
+    try:
+        filtros = filtros_recibos(request.args)
+    except ValueError:
+        return _error_filtros()
+
+    registros = obtener_almacen().iterar(**filtros)
+    generar, mimetype, extension = FORMATOS_EXPORTACION[formato]
+    nombre = f"recibos_{time.strftime('%Y-%m-%d')}.{extension}"
+    return Response(stream_with_context(generar(registros)), mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="{nombre}"',
+                             "X-Accel-Buffering": "no"})
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("Servidor backend MultiServicio - VERSIÓN MEJORADA")
@@ -244,6 +452,21 @@ if __name__ == '__main__':
     print("   GET  /api/health       - Estado del servidor")
     print("   POST /api/upload       - Subir y extraer PDF individual")
     print("   POST /api/batch_upload - Subir múltiples PDFs")
+    print("   POST /api/jobs         - Encolar PDFs (respuesta inmediata)")
+    print("   GET  /api/jobs/<id>    - Estado y resultados de un trabajo")
+    print("   GET  /api/jobs/<id>/stream - Resultados en NDJSON al terminar cada uno")
+    print("   GET  /api/records      - Recibos guardados (paginados y filtrados)")
+    print("   GET  /api/records/monthly - Gasto y consumo por servicio y mes")
+    print("   GET  /api/records/summary - Totales para el dashboard")
+    print("   GET  /api/export       - Recibos guardados en CSV o NDJSON (streaming)")
+    print("   GET  /api/metrics      - Métricas en formato Prometheus")
     print("="*60 + "\n")
+
+    # Con debug=True el proceso que corre esto solo vigila los archivos y
+    # relanza el servidor en un hijo (WERKZEUG_RUN_MAIN=true): el modelo se
+    # carga solo en ese hijo, que es el que atiende
+    if OCR_PRECARGAR and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        log.info("Precargando modelo OCR...")
+        precargar_ocr()
     
     app.run(debug=True, host="0.0.0.0", port=8280)
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+import sys
+
+# Agregar la ruta actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from almacen import RepositorioSQLite
+
+def recibo(total, filename="CFE.pdf"):
+    return {"service_type": "cfe", "filename": filename, "no_servicio": "076250579019",
+            "periodo": "12 SEP 25 - 13 NOV 25", "total": total, "consumo_kwh": "NO EXTRAÍDO"}
+
+def test_mismo_pdf_actualiza_su_fila(tmp_path):
+    """Volver a subir el mismo PDF (mismo sha256) actualiza la fila en vez de duplicarla"""
+    almacen = RepositorioSQLite(str(tmp_path / "recibos.db"))
+    almacen.guardar(recibo("271.81"), lote="a", sha256="f" * 64)
+    almacen.guardar(recibo("300.00"), lote="b", sha256="f" * 64)
+    almacen.guardar(recibo("99.50", "Otro.pdf"), lote="b", sha256="e" * 64)
+
+    registros, total = almacen.listar()
+    assert total == 2
+    por_archivo = {r["filename"]: r for r in registros}
+    assert por_archivo["CFE.pdf"]["total"] == "300.00"
+    assert por_archivo["CFE.pdf"]["job_id"] == "b"
+    assert por_archivo["CFE.pdf"]["consumo_kwh"] == "NO EXTRAÍDO"
+    assert almacen.resumen_mensual()[0]["total"] == 399.5
+
+def test_sin_sha256_y_errores(tmp_path):
+    """Sin sha256 cada guardado es una fila nueva; los resultados con error no se guardan"""
+    almacen = RepositorioSQLite(str(tmp_path / "recibos.db"))
+    almacen.guardar(recibo("271.81"))
+    almacen.guardar(recibo("271.81"))
+    almacen.guardar({"service_type": "error", "filename": "x.pdf", "error": "falló"}, sha256="d" * 64)
+
+    _, total = almacen.listar()
+    assert total == 2
@@ -0,0 +1,61 @@
+import os
+import sys
+
+# Agregar la ruta actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from espacial import PaginaOCR, Etiquetado
+
+def caja(texto, x0, y0, x1, y1, confianza=0.9):
+    """Resultado de readtext con una caja rectangular"""
+    return ([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], texto, confianza)
+
+# Recibo sintético: etiquetas con el valor a la derecha, debajo o pegado
+RESULTADO = [
+    caja("NO. DE SERVICIO:", 10, 10, 150, 30),
+    caja("076250579019", 160, 12, 280, 30),
+    caja("TOTAL A PAGAR", 10, 60, 140, 80),
+    caja("$1,234", 10, 85, 80, 105),
+    caja("Límite de pago", 300, 60, 430, 80),
+    caja("13 NOV 25", 300, 85, 390, 105),
+    caja("TARIFAPDBT", 10, 240, 120, 260),
+    caja("Otro texto", 500, 300, 600, 320),
+]
+
+def test_derecha_y_debajo():
+    pagina = PaginaOCR(RESULTADO, etiquetas=("NO. DE SERVICIO", "TOTAL A PAGAR"))
+
+    (servicio, resto), = pagina.etiqueta("NO. DE SERVICIO")
+    assert resto == ":"
+    assert [t.texto for t in pagina.derecha_de(servicio)] == ["076250579019"]
+
+    (total, _), = pagina.etiqueta("TOTAL A PAGAR")
+    # A la derecha queda la otra etiqueta de la línea; debajo solo lo que se
+    # superpone en horizontal, no la fecha de la otra columna
+    assert [t.texto for t in pagina.derecha_de(total)] == ["Límite de pago"]
+    assert [t.texto for t in pagina.debajo_de(total)] == ["$1,234"]
+
+def test_etiqueta_sin_acentos_y_pegada():
+    pagina = PaginaOCR(RESULTADO)
+
+    (limite, _), = pagina.etiqueta("LIMITE DE PAGO")
+    assert limite.texto == "Límite de pago"
+    assert [t.texto for t in pagina.debajo_de(limite)] == ["13 NOV 25"]
+
+    (tarifa, resto), = pagina.etiqueta("TARIFA")
+    assert tarifa.texto == "TARIFAPDBT" and resto == "PDBT"
+    assert pagina.etiqueta("NO EXISTE") == []
+
+def test_etiquetado():
+    pagina = PaginaOCR(RESULTADO)
+    assert Etiquetado("NO. DE SERVICIO", r"(\d{10,14})").extraer(pagina) == "076250579019"
+    assert Etiquetado("TOTAL A PAGAR", r"\$?([\d,]+)",
+                      formato=lambda m: m.group(1).replace(',', '')).extraer(pagina) == "1234"
+    assert Etiquetado("TARIFA", r"([A-Z0-9]{1,5})$").extraer(pagina) == "PDBT"
+    assert Etiquetado("TOTAL A PAGAR", r"(\d{10,14})").extraer(pagina) is None
+
+if __name__ == "__main__":
+    test_derecha_y_debajo()
+    test_etiqueta_sin_acentos_y_pegada()
+    test_etiquetado()
+    print("OK")
@@ -5,6 +5,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from Ing_Soft_P2 import extraer_info_recibo_cfe, extraer_info_recibo_gas
+from documento import DocumentoPDF
 
 def test_extractor(pdf_path):
     """Prueba específica para ver qué está extrayendo"""
@@ -12,12 +13,9 @@ def test_extractor(pdf_path):
     print(f"TESTEANDO: {os.path.basename(pdf_path)}")
     print('='*60)
     
-    # Leer texto crudo primero
-    from PyPDF2 import PdfReader
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
+    # Leer texto crudo primero (el documento se reutiliza en el extractor)
+    doc = DocumentoPDF.desde_ruta(pdf_path)
+    text = doc.texto
     
     print("\nTEXTO EXTRAÍDO (primeras 1000 caracteres):")
     print('-'*60)
@@ -27,10 +25,10 @@ def test_extractor(pdf_path):
     # Detectar tipo
     if 'CFE' in text.upper() or 'ELECTRICIDAD' in text.upper():
         print("\nDETECTADO: CFE")
-        resultado = extraer_info_recibo_cfe(pdf_path)
+        resultado = extraer_info_recibo_cfe(doc)
     elif 'ENGIE' in text.upper() or 'TRACTEBEL' in text.upper() or 'GAS' in text.upper():
         print("\nDETECTADO: GAS")
-        resultado = extraer_info_recibo_gas(pdf_path)
+        resultado = extraer_info_recibo_gas(doc)
     else:
         print("\nNO SE PUDO DETECTAR")
         return
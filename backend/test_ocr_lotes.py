@@ -0,0 +1,49 @@
+import os
+import sys
+import multiprocessing
+
+# Agregar la ruta actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import Ing_Soft_P2
+
+class LectorFalso:
+    """Lector con la interfaz de easyocr.Reader que responde sin modelo"""
+
+    def readtext(self, imagen, **kwargs):
+        return [([[0, 0], [1, 0], [1, 1], [0, 1]], f"PID {os.getpid()}", 1.0)]
+
+    def readtext_batched(self, imagenes, **kwargs):
+        return [self.readtext(imagen) for imagen in imagenes]
+
+def _leer_en_worker(salida):
+    """OCR dentro de un proceso hijo (fork), como en un worker del motor de lotes"""
+    resultado = Ing_Soft_P2.obtener_agrupador_ocr().leer(np.zeros((8, 8), dtype=np.uint8))
+    salida.put((os.getpid(), resultado[0][1]))
+
+def test_agrupador_despues_de_fork(monkeypatch):
+    """Un worker creado después de usar el agrupador en el padre no se queda esperando"""
+    monkeypatch.setattr(Ing_Soft_P2, "_reader_ocr", LectorFalso())
+    monkeypatch.setattr(Ing_Soft_P2, "_agrupador_ocr", None)
+    padre = Ing_Soft_P2.obtener_agrupador_ocr()
+    assert padre.leer(np.zeros((8, 8), dtype=np.uint8))[0][1] == f"PID {os.getpid()}"
+
+    contexto = multiprocessing.get_context("fork")
+    salida = contexto.Queue()
+    proceso = contexto.Process(target=_leer_en_worker, args=(salida,), daemon=True)
+    proceso.start()
+    try:
+        pid, texto = salida.get(timeout=10)
+    finally:
+        proceso.terminate()
+        proceso.join()
+
+    assert pid != os.getpid()
+    assert texto == f"PID {pid}"
+    # El padre sigue usando su propio agrupador
+    assert Ing_Soft_P2.obtener_agrupador_ocr() is padre
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,59 @@
+import io
+import os
+import sys
+import json
+import threading
+
+# Agregar la ruta actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import trabajos
+from almacen import RepositorioSQLite
+
+class MotorFalso:
+    """Motor de lotes que termina los archivos en orden inverso, uno por señal"""
+
+    def __init__(self):
+        self.siguiente = threading.Semaphore(0)
+
+    def procesar(self, archivos, al_terminar=None):
+        for i in reversed(range(len(archivos))):
+            assert self.siguiente.acquire(timeout=10)
+            filename = archivos[i][1]
+            al_terminar(i, {"service_type": "cfe", "filename": filename, "total": str(100 + i)},
+                        f"{i:064x}:test")
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    import server
+    motor = MotorFalso()
+    almacen = RepositorioSQLite(str(tmp_path / "recibos.db"))
+    monkeypatch.setattr(trabajos, "obtener_motor_lotes", lambda: motor)
+    monkeypatch.setattr(trabajos, "obtener_almacen", lambda: almacen)
+    monkeypatch.setattr(trabajos, "_gestor", trabajos.GestorTrabajos(workers=1))
+    return server.app.test_client(), motor, almacen
+
+def test_stream_de_trabajo(cliente):
+    """El stream entrega cada resultado al terminar, en orden de finalización, y cierra con 'done'"""
+    cliente, motor, almacen = cliente
+    archivos = {"files": [(io.BytesIO(b"%PDF-1.4"), n) for n in ("a.pdf", "b.pdf", "c.pdf")]}
+    respuesta = cliente.post("/api/jobs", data=archivos, content_type="multipart/form-data")
+    assert respuesta.status_code == 202
+    trabajo = respuesta.get_json()
+
+    lineas = cliente.get(trabajo["stream_url"]).response
+    for esperado in (2, 1, 0):
+        motor.siguiente.release()
+        linea = json.loads(next(lineas))
+        while linea["type"] == "ping":
+            linea = json.loads(next(lineas))
+        assert linea["type"] == "result" and linea["index"] == esperado
+        assert linea["result"]["total"] == str(100 + esperado)
+    final = json.loads(next(lineas))
+    assert final["type"] == "done" and final["completed"] == 3 and final["errors"] == 0
+
+    assert cliente.get(trabajo["status_url"]).get_json()["status"] == "completado"
+    assert almacen.listar()[1] == 3
+    assert cliente.get("/api/jobs/no-existe/stream").status_code == 404
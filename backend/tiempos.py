@@ -0,0 +1,67 @@
+import time
+import threading
+
+# ================================
+# TIEMPOS POR ETAPA
+# ================================
+# Etapas del pipeline de un recibo, en orden:
+#   parseo      PyPDF2: leer el PDF y sacar la capa de texto
+#   rasterizado render de las páginas para OCR
+#   preproceso  mejorar_imagen_para_ocr
+#   ocr         EasyOCR (incluye la espera del lote en ocr_lotes.py)
+#   campos      regex / motor de campos sobre el texto
+ETAPAS = ("parseo", "rasterizado", "preproceso", "ocr", "campos")
+
+# Cada hilo mide su propio recibo (hilos de Flask, grupos del motor de lotes)
+_local = threading.local()
+
+class _Etapa:
+    __slots__ = ("tiempos", "nombre", "inicio")
+
+    def __init__(self, tiempos, nombre):
+        self.tiempos = tiempos
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tiempos[self.nombre] = self.tiempos.get(self.nombre, 0.0) + time.perf_counter() - self.inicio
+        return False
+
+class _SinMedir:
+    """Etapa cuando nadie está midiendo: no toma el reloj"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_SIN_MEDIR = _SinMedir()
+
+def etapa(nombre):
+    """Context manager que suma el tiempo del bloque a `nombre` si el hilo está midiendo"""
+    tiempos = getattr(_local, "tiempos", None)
+    if tiempos is None:
+        return _SIN_MEDIR
+    return _Etapa(tiempos, nombre)
+
+class medir_etapas:
+    """Mide las etapas del bloque en este hilo: `with medir_etapas() as tiempos:`
+
+    `tiempos` es un dict {etapa: segundos} que se llena al salir de cada
+    etapa. Se puede anidar; la medición externa no incluye la interna.
+    """
+
+    def __enter__(self):
+        self._anterior = getattr(_local, "tiempos", None)
+        self.tiempos = {}
+        _local.tiempos = self.tiempos
+        return self.tiempos
+
+    def __exit__(self, *exc):
+        _local.tiempos = self._anterior
+        return False
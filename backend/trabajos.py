@@ -0,0 +1,184 @@
+import os
+import time
+import uuid
+import logging
+import queue
+import threading
+
+from lotes import obtener_motor_lotes, borrar_temporales
+from procesamiento import resultado_error
+from almacen import obtener_almacen
+from cache_resultados import CacheResultados
+from recibo import Recibo
+
+log = logging.getLogger(__name__)
+
+# Configuración de la cola de trabajos
+TRABAJOS_MAX_COLA = int(os.environ.get("TRABAJOS_MAX_COLA", "20"))   # trabajos en espera
+TRABAJOS_WORKERS = int(os.environ.get("TRABAJOS_WORKERS", "2"))      # trabajos simultáneos
+TRABAJOS_TTL = float(os.environ.get("TRABAJOS_TTL", "3600"))         # segundos tras terminar
+
+class ColaLlena(Exception):
+    """No hay espacio en la cola de trabajos"""
+
+# --------------------------
+# TRABAJO
+# --------------------------
+class Trabajo:
+    """Un envío de uno o más PDFs procesado en segundo plano"""
+
+    def __init__(self, archivos):
+        self.id = uuid.uuid4().hex
+        self.archivos = archivos            # [(bytes o ruta, filename), ...]
+        self.estado = "en_cola"             # en_cola -> procesando -> completado
+        self.creado = time.time()
+        self.terminado = None
+        self.resultados = [None] * len(archivos)    # Recibo de cada archivo
+        self.orden = []                     # índices en orden de finalización
+        self._condicion = threading.Condition()
+
+    def registrar(self, indice, resultado):
+        resultado = Recibo.desde_datos(resultado)
+        with self._condicion:
+            self.resultados[indice] = resultado
+            self.orden.append(indice)
+            self._condicion.notify_all()
+
+    def cambiar_estado(self, estado):
+        with self._condicion:
+            self.estado = estado
+            if estado == "completado":
+                self.terminado = time.time()
+            self._condicion.notify_all()
+
+    def eventos(self, espera=15.0):
+        """Genera (indice, Recibo) a medida que terminan los archivos.
+
+        Genera None cuando pasan `espera` segundos sin novedades (sirve como
+        keep-alive para la conexión) y termina cuando el trabajo se completa.
+        """
+        enviados = 0
+        while True:
+            with self._condicion:
+                if enviados == len(self.orden) and self.estado != "completado":
+                    self._condicion.wait(espera)
+                nuevos = self.orden[enviados:]
+                completado = self.estado == "completado"
+
+            if not nuevos and not completado:
+                yield None
+            for indice in nuevos:
+                yield indice, self.resultados[indice]
+            enviados += len(nuevos)
+
+            if completado and enviados == len(self.orden):
+                return
+
+    def to_dict(self, incluir_resultados=True):
+        with self._condicion:
+            datos = {
+                "job_id": self.id,
+                "status": self.estado,
+                "total": len(self.archivos),
+                "completed": len(self.orden),
+                "errors": len([i for i in self.orden if self.resultados[i].error is not None]),
+                "created_at": self.creado,
+                "finished_at": self.terminado,
+            }
+            if incluir_resultados:
+                datos["results"] = [r.a_dict() if r is not None else None for r in self.resultados]
+        return datos
+
+# --------------------------
+# GESTOR DE TRABAJOS
+# --------------------------
+class GestorTrabajos:
+    """Cola acotada de trabajos atendida por hilos que delegan al motor de lotes.
+
+    Los hilos solo coordinan: el OCR corre en el pool de procesos, así que ni
+    los hilos de Flask ni los de la cola quedan ocupados con CPU.
+    """
+
+    def __init__(self, max_cola=TRABAJOS_MAX_COLA, workers=TRABAJOS_WORKERS, ttl=TRABAJOS_TTL):
+        self.ttl = ttl
+        self.workers = max(1, workers)
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._trabajos = {}
+        self._lock = threading.Lock()
+        self._hilos = []
+
+    def _iniciar_hilos(self):
+        with self._lock:
+            if self._hilos:
+                return
+            for n in range(self.workers):
+                hilo = threading.Thread(target=self._atender, name=f"trabajos-{n}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def _atender(self):
+        almacen = obtener_almacen()
+        while True:
+            trabajo = self._cola.get()
+
+            def al_terminar(indice, resultado, clave, trabajo=trabajo):
+                recibo = Recibo.desde_datos(resultado)
+                trabajo.registrar(indice, recibo)
+                almacen.guardar(recibo, lote=trabajo.id, sha256=CacheResultados.huella(clave))
+
+            try:
+                trabajo.cambiar_estado("procesando")
+                obtener_motor_lotes().procesar(trabajo.archivos, al_terminar=al_terminar)
+            except Exception as e:
+                log.exception("Error en trabajo %s", trabajo.id, extra={"trabajo": trabajo.id})
+                for i, (_, filename) in enumerate(trabajo.archivos):
+                    if trabajo.resultados[i] is None:
+                        trabajo.registrar(i, resultado_error(filename, str(e)))
+            finally:
+                borrar_temporales(trabajo.archivos)
+                trabajo.archivos = [(None, filename) for _, filename in trabajo.archivos]
+                trabajo.cambiar_estado("completado")
+                self._cola.task_done()
+
+    def _purgar(self):
+        """Olvida trabajos terminados hace más de TRABAJOS_TTL segundos"""
+        limite = time.time() - self.ttl
+        with self._lock:
+            vencidos = [tid for tid, t in self._trabajos.items()
+                        if t.terminado is not None and t.terminado < limite]
+            for tid in vencidos:
+                del self._trabajos[tid]
+
+    def enviar(self, archivos):
+        """Encola los archivos y devuelve el Trabajo; lanza ColaLlena si no cabe"""
+        self._iniciar_hilos()
+        self._purgar()
+
+        trabajo = Trabajo(archivos)
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+        try:
+            self._cola.put_nowait(trabajo)
+        except queue.Full:
+            with self._lock:
+                del self._trabajos[trabajo.id]
+            raise ColaLlena(f"Cola de trabajos llena ({self._cola.maxsize})")
+        return trabajo
+
+    def obtener(self, job_id):
+        with self._lock:
+            return self._trabajos.get(job_id)
+
+    def en_cola(self):
+        return self._cola.qsize()
+
+_gestor = None
+_gestor_lock = threading.Lock()
+
+def obtener_gestor_trabajos():
+    """Gestor de trabajos compartido por todo el proceso del servidor"""
+    global _gestor
+    with _gestor_lock:
+        if _gestor is None:
+            _gestor = GestorTrabajos()
+        return _gestor
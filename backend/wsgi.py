@@ -0,0 +1,19 @@
+import logging
+
+from server import app, OCR_PRECARGAR
+from Ing_Soft_P2 import precargar_ocr
+
+# ================================
+# PUNTO DE ENTRADA WSGI (producción)
+# ================================
+# gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Con preload_app (gunicorn.conf.py) este módulo se importa una sola vez en
+# el proceso maestro: el modelo OCR se carga aquí, antes del fork, y los
+# workers de gunicorn y los del motor de lotes comparten sus páginas de
+# memoria (copy-on-write) en lugar de cargar cada uno su copia.
+log = logging.getLogger(__name__)
+
+if OCR_PRECARGAR:
+    log.info("Precargando modelo OCR antes de crear los workers...")
+    precargar_ocr()
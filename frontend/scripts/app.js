@@ -31,6 +31,7 @@ class MultiServiceFrontend {
             totalAmounts: { cfe: 0, japam: 0, gas: 0 },
             recentFiles: []
         };
+        this.dashboardFromServer = false; // métricas de los recibos guardados
 
         // Inicialización
         document.addEventListener('DOMContentLoaded', () => {
@@ -189,14 +190,18 @@ class MultiServiceFrontend {
     // -------------------------------------------------
     // DASHBOARD FUNCIONAL
     // -------------------------------------------------
-    updateDashboardMetrics() {
+    async updateDashboardMetrics() {
         console.log("📊 Actualizando métricas del dashboard...");
         
-        // Usar resultados editables si existen, de lo contrario usar processingResults
-        const results = this.editableResults || this.processingResults || [];
-        
-        // Calcular métricas
-        this.calculateDashboardMetrics(results);
+        // Las métricas se calculan en SQL sobre todos los recibos guardados;
+        // sin backend se calculan con los resultados de esta sesión
+        const loaded = await this.loadDashboardFromServer();
+        this.dashboardFromServer = loaded;
+        if (!loaded) {
+            // Usar resultados editables si existen, de lo contrario usar processingResults
+            const results = this.editableResults || this.processingResults || [];
+            this.calculateDashboardMetrics(results);
+        }
         
         // Actualizar UI
         this.updateDashboardUI();
@@ -207,6 +212,56 @@ class MultiServiceFrontend {
         this.showNotification('success', 'Dashboard actualizado');
     }
 
+    async loadDashboardFromServer() {
+        try {
+            const [summaryResponse, monthlyResponse] = await Promise.all([
+                fetch(`${CONFIG.API_BASE}/records/summary`),
+                fetch(`${CONFIG.API_BASE}/records/monthly`)
+            ]);
+            if (!summaryResponse.ok || !monthlyResponse.ok) return false;
+
+            const summary = await summaryResponse.json();
+            const { months } = await monthlyResponse.json();
+
+            const data = {
+                totalFiles: summary.recibos,
+                totalServices: 0,
+                estimatedReadings: summary.lecturas.estimadas,
+                measuredReadings: summary.lecturas.medidas,
+                servicesByType: { cfe: 0, japam: 0, gas: 0 },
+                monthlyConsumption: months.map(m => ({
+                    month: m.mes,
+                    service: m.service_type,
+                    consumption: m.consumo,
+                    amount: m.total
+                })),
+                totalAmounts: { cfe: 0, japam: 0, gas: 0 },
+                recentFiles: summary.recientes.map(r => ({
+                    name: r.filename || '',
+                    service: CONFIG.SERVICE_TYPES[r.service_type]?.name || r.service_type,
+                    date: new Date(r.fecha_registro).toLocaleDateString(),
+                    amount: r.total ?? '0',
+                    serviceType: r.service_type
+                }))
+            };
+
+            Object.entries(summary.por_servicio).forEach(([type, totals]) => {
+                if (type in data.servicesByType) {
+                    data.servicesByType[type] = totals.recibos;
+                    data.totalAmounts[type] = totals.total;
+                    data.totalServices += totals.recibos;
+                }
+            });
+
+            this.dashboardData = data;
+            console.log("📈 Métricas del servidor:", this.dashboardData);
+            return true;
+        } catch (error) {
+            console.warn('No se pudieron cargar las métricas del servidor:', error);
+            return false;
+        }
+    }
+
     calculateDashboardMetrics(results) {
         // Resetear datos
         this.dashboardData = {
@@ -549,6 +604,14 @@ class MultiServiceFrontend {
             this.showNotification('info', 'No hay datos para exportar');
             return;
         }
+
+        // Con backend se descargan los recibos guardados desde /api/export:
+        // el servidor escribe el CSV en streaming y el navegador lo guarda sin
+        // armarlo en memoria. Sin backend queda el resumen de esta sesión.
+        if (this.dashboardFromServer) {
+            this.exportRecordsFromServer();
+            return;
+        }
         
         try {
             const data = [];
@@ -605,11 +668,30 @@ class MultiServiceFrontend {
         }
     }
 
+    exportRecordsFromServer() {
+        const params = new URLSearchParams({ formato: 'csv' });
+        const startDate = document.getElementById('startDate')?.value;
+        const endDate = document.getElementById('endDate')?.value;
+        if (startDate) params.set('desde', startDate);
+        if (endDate) params.set('hasta', endDate);
+
+        const link = document.createElement('a');
+        link.setAttribute('href', `${CONFIG.API_BASE}/export?${params}`);
+        link.style.visibility = 'hidden';
+
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+
+        this.showNotification('success', 'Exportando recibos guardados a CSV');
+    }
+
     // -------------------------------------------------
     // FUNCIONALIDADES PRINCIPALES
     // -------------------------------------------------
 
-    // Función para exportar a CSV
+    // Función para exportar a CSV: son los resultados editados en pantalla,
+    // que no se guardan en el servidor, así que el CSV se arma aquí
     exportToCSV() {
         if (!this.editableResults || this.editableResults.length === 0) {
             this.showNotification('info', 'No hay resultados para exportar');
@@ -192,66 +192,81 @@ class UploadManager {
             loadingMessage.textContent = `Procesando ${this.files.length} archivo(s)...`;
         }
 
-        const results = [];
         const totalFiles = this.files.length;
+        const results = new Array(totalFiles).fill(null);
+        let completed = 0;
+
+        const registerResult = (index, data) => {
+            const file = this.files[index];
+            // Agregar nombre de archivo y mejorar datos
+            results[index] = {
+                ...data,
+                filename: file.name,
+                upload_date: new Date().toISOString(),
+                file_size: this.formatFileSize(file.size),
+                service_detected: this.getServiceTypeFromFilename(file.name)
+            };
+            completed++;
+
+            // Actualizar progreso
+            const progress = (completed / totalFiles) * 100;
+            this.progressFill.style.width = `${progress}%`;
+            this.progressText.textContent = `${completed}/${totalFiles} - ${file.name}`;
+            this.progressText.style.fontWeight = '600';
+
+            if (data.error) {
+                app.showNotification('warning', `Error en ${file.name}: ${data.error}`);
+            } else {
+                console.log(`✅ Procesado: ${file.name}`, results[index]);
+            }
 
-        for (let i = 0; i < totalFiles; i++) {
-            const file = this.files[i];
-            
-            try {
-                // Actualizar progreso
-                const progress = ((i + 1) / totalFiles) * 100;
-                this.progressFill.style.width = `${progress}%`;
-                this.progressText.textContent = `${i + 1}/${totalFiles} - ${file.name}`;
-                this.progressText.style.fontWeight = '600';
-
-                // Crear FormData y enviar
-                const formData = new FormData();
-                formData.append('file', file);
-
-                console.log(`📤 Enviando archivo: ${file.name}`);
-                const response = await fetch(`${CONFIG.API_BASE}/upload`, {
-                    method: 'POST',
-                    body: formData
-                });
-
-                if (!response.ok) {
-                    throw new Error(`Error HTTP ${response.status}`);
-                }
+            // Actualizar UI parcialmente
+            this.updateResultsPreview(results.filter(r => r !== null), completed, totalFiles);
+        };
 
-                const data = await response.json();
-                
-                // Agregar nombre de archivo y mejorar datos
-                const enhancedData = {
-                    ...data,
-                    filename: file.name,
-                    upload_date: new Date().toISOString(),
-                    file_size: this.formatFileSize(file.size),
-                    service_detected: this.getServiceTypeFromFilename(file.name)
-                };
-                
-                results.push(enhancedData);
+        try {
+            // Enviar todos los archivos como un trabajo: el backend responde de inmediato
+            const formData = new FormData();
+            this.files.forEach(file => formData.append('files', file));
+
+            console.log(`📤 Enviando ${totalFiles} archivo(s) como trabajo`);
+            const response = await fetch(`${CONFIG.API_BASE}/jobs`, {
+                method: 'POST',
+                body: formData
+            });
 
-                console.log(`✅ Procesado: ${file.name}`, enhancedData);
+            if (response.status === 429) {
+                const retry = response.headers.get('Retry-After') || '30';
+                throw new Error(`Servidor ocupado, reintenta en ${retry} s`);
+            }
+            if (!response.ok) {
+                throw new Error(`Error HTTP ${response.status}`);
+            }
 
-                // Actualizar UI parcialmente
-                this.updateResultsPreview(results, i + 1, totalFiles);
+            const job = await response.json();
+            this.lastJobId = job.job_id;
+            await this.streamJobResults(job, registerResult);
 
-            } catch (error) {
-                console.error(`❌ Error procesando ${file.name}:`, error);
-                results.push({
+        } catch (error) {
+            console.error('❌ Error procesando lote:', error);
+            app.showNotification('error', `Error en el lote: ${error.message}`);
+        }
+
+        // Archivos sin resultado (error de red o del trabajo)
+        results.forEach((result, index) => {
+            if (result === null) {
+                const file = this.files[index];
+                results[index] = {
                     filename: file.name,
-                    error: error.message,
+                    error: 'Sin respuesta del servidor',
                     service_type: 'error',
                     titular: 'ERROR',
                     total: 'ERROR',
                     upload_date: new Date().toISOString(),
                     file_size: this.formatFileSize(file.size)
-                });
-                
-                app.showNotification('warning', `Error en ${file.name}: ${error.message}`);
+                };
             }
-        }
+        });
 
         // Finalizar
         this.isProcessing = false;
@@ -293,6 +308,35 @@ class UploadManager {
         }
     }
 
+    // Leer los resultados del trabajo en NDJSON a medida que terminan
+    async streamJobResults(job, onResult) {
+        const response = await fetch(`${CONFIG.API_BASE}/jobs/${job.job_id}/stream`);
+        if (!response.ok || !response.body) {
+            throw new Error(`Error HTTP ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+                if (event.type === 'result') {
+                    onResult(event.index, event.result);
+                }
+            }
+        }
+    }
+
     updateResultsPreview(results, current, total) {
         // Actualizar contador durante el procesamiento
         const previewCount = document.getElementById('previewCount');
@@ -368,76 +412,27 @@ class UploadManager {
         }, 500);
     }
 
-    // Exportar resultados a CSV
+    // Exportar resultados a CSV: el backend transmite el archivo desde los recibos guardados
     exportResults() {
         if (!this.processingResults || this.processingResults.length === 0) {
             app.showNotification('info', 'No hay resultados para exportar');
             return;
         }
-
-        // Si estamos usando resultados editables, usar esos
-        const resultsToExport = window.app?.editableResults || this.processingResults;
-        
-        try {
-            const csv = this.convertResultsToCSV(resultsToExport);
-            this.downloadCSV(csv, `recibos_homirent_${new Date().toISOString().split('T')[0]}.csv`);
-            app.showNotification('success', 'CSV exportado correctamente');
-        } catch (error) {
-            app.showNotification('error', 'Error al exportar CSV: ' + error.message);
+        if (!this.lastJobId) {
+            app.showNotification('info', 'No hay un lote procesado para exportar');
+            return;
         }
-    }
 
-    convertResultsToCSV(results) {
-        const headers = [
-            'Archivo', 'Servicio', 'Titular', 'N° Servicio', 'Dirección', 
-            'Cuenta', 'N° Medidor', 'Período', 'Total', 'Consumo',
-            'Tarifa', 'Fecha Pago', 'Fecha Corte', 'RMU', 'Calidad',
-            'Fecha Subida', 'Tamaño Archivo', 'Estado'
-        ];
-        
-        const csvRows = [
-            headers.join(','),
-            ...results.map(result => {
-                const serviceName = CONFIG.SERVICE_TYPES[result.service_type]?.name || result.service_type || '';
-                const consumo = result.consumo || result.consumo_kwh || result.consumo_m3 || '';
-                const calidad = result.calidad || result.tipo_lectura || 'BÁSICO';
-                const estado = result.error ? 'ERROR' : 'PROCESADO';
-                
-                return [
-                    `"${result.filename || ''}"`,
-                    `"${serviceName}"`,
-                    `"${result.titular || ''}"`,
-                    `"${result.no_servicio || ''}"`,
-                    `"${result.direccion || ''}"`,
-                    `"${result.cuenta || ''}"`,
-                    `"${result.no_medidor || ''}"`,
-                    `"${result.periodo || ''}"`,
-                    `"${result.total || ''}"`,
-                    `"${consumo}"`,
-                    `"${result.tarifa || ''}"`,
-                    `"${result.fecha_pago || ''}"`,
-                    `"${result.fecha_corte || ''}"`,
-                    `"${result.rmu || ''}"`,
-                    `"${calidad}"`,
-                    `"${result.upload_date || new Date().toISOString()}"`,
-                    `"${result.file_size || ''}"`,
-                    `"${estado}"`
-                ].join(',');
-            })
-        ];
-
-        return csvRows.join('\n');
+        this.downloadFromServer(`${CONFIG.API_BASE}/export?formato=csv&job_id=${encodeURIComponent(this.lastJobId)}`);
+        app.showNotification('success', 'Descarga de CSV iniciada');
     }
 
-    downloadCSV(csv, filename) {
-        const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' });
+    // Descarga directa: el navegador guarda el archivo a medida que llega
+    downloadFromServer(url) {
         const link = document.createElement('a');
-        const url = URL.createObjectURL(blob);
-        
         link.setAttribute('href', url);
-        link.setAttribute('download', filename);
         link.style.visibility = 'hidden';
-        
+
         document.body.appendChild(link);
         link.click();
         document.body.removeChild(link);